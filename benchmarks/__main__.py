@@ -0,0 +1,174 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+"""Benchmarks for the hot paths of the steps: substitution, parsing, assertions, reporting and requests.
+
+    python -m benchmarks run --output baseline.json
+    python -m benchmarks run --output current.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.1
+
+`compare` exits with status 1, if any benchmark got slower than the baseline by more than the threshold.
+Results depend on the machine, so the baseline has to be measured on the machine, that runs the comparison.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from collections.abc import Callable, Iterator
+from time import perf_counter
+from unittest.mock import patch
+
+from getgauge.python import data_store
+
+from gauge_api_steps.api_steps import (
+    _diff_json,
+    _find_jsonpath_matches_in_response,
+    _find_xpath_matches_in_response,
+    beforescenario,
+    make_request,
+    response_key,
+)
+from gauge_api_steps.reporting import mask_secrets
+from gauge_api_steps.substitute import substitute
+
+from .payloads import item_count, json_payload, placeholder_template, secret_message, xml_payload
+from .server import BenchmarkServer
+
+sizes = {"1KB": 1_000, "100KB": 100_000, "1MB": 1_000_000, "10MB": 10_000_000, "100MB": 100_000_000}
+# diffs are much more expensive than parsing, so they are only measured for small payloads
+max_diff_size = 1_000_000
+
+
+def measure(func: Callable[[], object], min_time: float = 0.2, min_runs: int = 3, max_runs: int = 1000) -> dict[str, float]:
+    times: list[float] = []
+    while len(times) < max_runs and (len(times) < min_runs or sum(times) < min_time):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return {"runs": len(times), "min_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000}
+
+
+def benchmarks(size_names: list[str], server_url: str, server: BenchmarkServer) -> Iterator[tuple[str, Callable[[], object]]]:
+    template, values = placeholder_template(1000)
+    data_store.scenario.update(values)
+    yield "substitute 1000 placeholders", lambda: substitute(template)
+    expressions = ' '.join(f"!{{base64:value-{i}}}" for i in range(200))
+    yield "substitute 200 expressions", lambda: substitute(expressions)
+
+    message, secrets = secret_message(100_000, 100)
+    secrets["mask_secrets"] = ','.join(key for key in secrets)
+    with patch.dict(os.environ, secrets):
+        yield "mask_secrets 100KB with 100 secrets", lambda: mask_secrets(message)
+
+    for size_name in size_names:
+        json_body = json_payload(sizes[size_name])
+        middle = item_count(json_body) // 2
+
+        def find_jsonpath(body: bytes = json_body, index: int = middle) -> object:
+            data_store.scenario[response_key] = {"body": body}
+            return _find_jsonpath_matches_in_response(f"$.items[{index}].name")
+        yield f"jsonpath {size_name}", find_jsonpath
+
+        xml_body = xml_payload(sizes[size_name])
+        xml_middle = item_count(xml_body) // 2
+
+        def find_xpath(body: bytes = xml_body, index: int = xml_middle) -> object:
+            data_store.scenario[response_key] = {"body": body}
+            return _find_xpath_matches_in_response(f"/root/item[{index}]/name")
+        yield f"xpath {size_name}", find_xpath
+
+        if sizes[size_name] <= max_diff_size:
+            expected = json.loads(json_body)
+            actual = json.loads(json_body.replace(b'"item-1"', b'"item-x"'))
+            yield f"diff_json {size_name}", lambda actual=actual, expected=expected: _diff_json(actual, expected)
+
+        server.responses[f"/{size_name}"] = (200, {"Content-Type": "application/json"}, json_body)
+        yield f"make_request {size_name}", lambda url=f"{server_url}/{size_name}": make_request("GET", url)
+
+
+def run(size_names: list[str], name_filter: str | None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as project_dir, BenchmarkServer() as server, patch.dict(os.environ, {
+        "GAUGE_PROJECT_ROOT": project_dir,
+        "session_properties": os.path.join(project_dir, "session.properties"),
+    }):
+        data_store.scenario.clear()
+        beforescenario(None)
+        for name, func in benchmarks(size_names, server.url, server):
+            if name_filter is not None and name_filter not in name:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(func)
+            results[name] = result
+            print(f"{name:<40} {result['median_ms']:>12.3f} ms (min {result['min_ms']:.3f} ms, {result['runs']} runs)")
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    for key in ("python", "platform", "machine", "cpus"):
+        if baseline.get(key) != current.get(key):
+            print(f"The baseline has been measured with another {key}: {baseline.get(key)}, now {current.get(key)}")
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else 1.0
+        marker = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<40} {base['median_ms']:>12.3f} ms -> {result['median_ms']:>12.3f} ms ({ratio - 1:+.1%}){marker}")
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--sizes", default="1KB,100KB,1MB,10MB", help=f"payload sizes, comma-separated. Available: {','.join(sizes)}"
+    )
+    run_parser.add_argument("--filter", default=None, help="only run benchmarks, whose name contains this text")
+    run_parser.add_argument("--output", default=None, help="write the results as JSON into this file")
+    compare_parser = commands.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("baseline", help="results of the run command to compare with, measured on the same machine")
+    compare_parser.add_argument("current", help="results of the run command")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, f.i. 0.1 for 10%%")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        size_names = [size.strip() for size in args.sizes.split(',') if size.strip()]
+        unknown = [size for size in size_names if size not in sizes]
+        if unknown:
+            parser.error(f"unknown sizes {unknown}")
+        results = run(size_names, args.filter)
+        if args.output:
+            with open(args.output, 'w') as o:
+                json.dump(results, o, indent=4)
+        return 0
+    with open(args.baseline) as b, open(args.current) as c:
+        regressions = compare(json.load(b), json.load(c), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmarks are slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,47 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+
+
+def json_payload(size: int) -> bytes:
+    """ A JSON object with an array of items, that is about `size` bytes large. """
+    item_size = len(json.dumps(_json_item(0))) + 2
+    count = max(size // item_size, 1)
+    return json.dumps({"items": [_json_item(i) for i in range(count)]}).encode()
+
+
+def xml_payload(size: int) -> bytes:
+    """ An XML document with a list of items, that is about `size` bytes large. """
+    item_size = len(_xml_item(0))
+    count = max(size // item_size, 1)
+    return f"<root>{''.join(_xml_item(i) for i in range(count))}</root>".encode()
+
+
+def item_count(payload: bytes) -> int:
+    return payload.count(b'"id":') or payload.count(b'<id>')
+
+
+def placeholder_template(count: int) -> tuple[str, dict[str, str]]:
+    """ A template with `count` placeholders and the values for them. """
+    values = {f"placeholder_{i}": f"value-{i}" for i in range(count)}
+    template = ' '.join(f"${{{key}}}" for key in values)
+    return template, values
+
+
+def secret_message(size: int, secrets: int) -> tuple[str, dict[str, str]]:
+    """ A message of about `size` characters, that contains each of the `secrets` several times. """
+    values = {f"secret_{i}": f"s3cr3t-{i:04d}" for i in range(secrets)}
+    words = [f"word {value}" for value in values.values()]
+    line = ' '.join(words) + '\n'
+    return (line * max(size // len(line), 1)), values
+
+
+def _json_item(i: int) -> dict:
+    return {"id": i, "name": f"item-{i}", "tags": ["a", "b", "c"], "value": i * 1.5, "active": i % 2 == 0}
+
+
+def _xml_item(i: int) -> str:
+    return f"<item><id>{i}</id><name>item-{i}</name><tags><tag>a</tag><tag>b</tag></tags><value>{i * 1.5}</value></item>"
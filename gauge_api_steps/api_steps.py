@@ -8,22 +8,50 @@ from types import NoneType
 import numexpr
 import json
 import os
+import random
 import re
+import time
 
 from colorama import Fore
+from concurrent.futures import Future, ThreadPoolExecutor
 from diff_match_patch import diff_match_patch
-from getgauge.python import data_store, step, after_scenario, before_scenario, ExecutionContext
+from getgauge.python import (
+    data_store, step, after_scenario, after_step, after_suite, before_scenario, before_step, ExecutionContext
+)
 from http.client import HTTPResponse
-from io import BytesIO
 from jsonpath_ng.ext import parse as parse_json_path
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
 from lxml import etree
+from time import perf_counter
 from typing import Any, Iterable
 from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, OpenerDirector, Request, build_opener
-from urllib.error import HTTPError
-from .file_util import assert_file_is_in_project
-from .reporting import print_and_report, report_request_info, report_response_info
-from .session import load_session_properties, save_session_properties, store_in_session
-from .substitute import substitute
+from urllib.error import HTTPError, URLError
+from .async_engine import close_engine, http_engine, start_request
+from .body import ResponseBody, response_body
+from .cassette import http_mode, record_response, replay_response
+from .compression import CompressedBody, compression_threshold, content_encoding
+from .cookies import load_cookies, save_cookies
+from .file_util import append_line, assert_file_is_in_project, flush_appended
+from .history import clear_response_history, remember_response, save_response_as, saved_response
+from .http_cache import ConditionalRequestHandler, cache_response, cached_response, http_cache_enabled
+from .http_trace import close_trace, trace_enabled, trace_entry, trace_request
+from .latency import latency_histogram, latency_stats, latency_summary, record_latency, run_latencies, scenario_latencies
+from .multipart import MultipartBody
+from .oauth2 import client_credentials_token, mask_tokens, token_cache_file
+from .profiling import (
+    hot_spot_table, profiled, profiling_enabled, start_profiling, step_finished, step_started, stop_profiling,
+    write_profile_report
+)
+from .rate_limit import acquire_rate_limit, adapt_rate
+from .reporting import flush_step_report, print_and_report, report_request_info, report_response_info, start_step_report
+from .session import load_session_properties, save_session_properties, session_file_key, store_in_session
+from .snapshot import compare_snapshot, normalize_snapshot
+from .substitute import seed_random, substitute
+from .transport import (
+    BufferedResponse, PhaseTimeout, TimedHTTPHandler, TimedHTTPSHandler, Timeouts, response_timings, retry_after_seconds
+)
+from .xml_compare import diff_xml, normalize_text, xml_equals, xml_whitespace
 
 
 opener_key = "_opener"
@@ -34,32 +62,94 @@ body_key = "_body"
 response_key = "_response"
 headers_key = "_headers"
 sent_request_headers_key = "_sent_request_headers"
+load_test_key = "_load_test"
+poll_key = "_poll"
+cookie_jar_key = "_cookie_jar"
+pending_requests_key = "_pending_requests"
+form_key = "_form"
+compression_key = "_compression"
+
+# compiled JSON schema validators by file path, together with the file modification time they were compiled from
+_schema_validators: dict[str, tuple[int, Validator]] = {}
+
+_size_units = {
+    "B": 1,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3,
+    "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3,
+}
+_size_pattern = re.compile(r'(\d+(?:\.\d+)?)\s*(B|[KMG]i?B)\b', re.IGNORECASE)
 
 
 @before_scenario
 def beforescenario(context: ExecutionContext) -> None:
+    start_profiling()
+    seed_random()
     session_file_param = os.environ.get("session_properties", "env/default/session.properties")
     session_file = substitute(session_file_param)
     load_session_properties(session_file)
     class DynamicRedirectHandler(HTTPRedirectHandler):
 
         def http_error_302(self, req, fp, code, msg, headers):
-            # the property can be changed within a scenario, so both os.environ and data_store need to be considered.
-            env_follow = os.environ.get("follow_redirects", "false")
-            follow_redirects = data_store.scenario.get("follow_redirects", env_follow).lower() in ("true", "1")
-            if follow_redirects:
+            if _follow_redirects():
                 return super().http_error_302(req, fp, code, msg, headers)
             else:
                 raise HTTPError(req.full_url, code, msg, headers, fp)
         http_error_301 = http_error_303 = http_error_307 = http_error_302
-    opener: OpenerDirector = build_opener(HTTPCookieProcessor(), DynamicRedirectHandler())
+
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            new_req = super().redirect_request(req, fp, code, msg, headers, newurl)
+            if new_req is not None and hasattr(req, 'timeouts'):
+                new_req.timeouts = req.timeouts
+            return new_req
+    cookie_jar = load_cookies(data_store.scenario[session_file_key])
+    opener: OpenerDirector = build_opener(
+        HTTPCookieProcessor(cookie_jar), DynamicRedirectHandler(),
+        TimedHTTPHandler(), TimedHTTPSHandler(), ConditionalRequestHandler()
+    )
     data_store.scenario[opener_key] = opener
+    data_store.scenario[cookie_jar_key] = cookie_jar
 
 
 @after_scenario
 def afterscenario(context: ExecutionContext) -> None:
     save_session_properties()
+    save_cookies(data_store.scenario.get(cookie_jar_key))
+    flush_appended()
+    clear_response_history()
+    for *_, future in data_store.scenario.pop(pending_requests_key, {}).values():
+        future.cancel()
     print_and_report(f"after scenario {context}")
+    if _report_latency() and len(scenario_latencies()) > 0:
+        print_and_report(latency_summary(scenario_latencies()))
+    for profile_report in stop_profiling():
+        print_and_report(profile_report)
+
+
+@after_suite
+def aftersuite(context: ExecutionContext) -> None:
+    if _report_latency() and len(run_latencies()) > 0:
+        print_and_report(latency_summary(run_latencies()))
+    if profiling_enabled():
+        print_and_report(hot_spot_table())
+        profile_report_file = os.environ.get("profile_report")
+        if profile_report_file:
+            write_profile_report(assert_file_is_in_project(profile_report_file))
+    close_engine()
+    dropped = close_trace()
+    if dropped > 0:
+        print_and_report(f"{dropped} requests have not been traced, because the trace queue was full")
+
+
+@before_step
+def beforestep(context: ExecutionContext) -> None:
+    step_started()
+    start_step_report()
+
+
+@after_step
+def afterstep(context: ExecutionContext) -> None:
+    flush_step_report()
+    step_finished(context.step.text)
 
 
 @step("Response CSRF header <header>")
@@ -98,6 +188,15 @@ def load_from_file(file_param, placeholder_param) -> None:
     data_store.scenario[placeholder_name] = content
 
 
+@step("Use OAuth2 client credentials from <token_url> as <placeholder>")
+def use_oauth2_client_credentials(token_url_param: str, placeholder_param: str) -> None:
+    token_url = substitute(token_url_param)
+    placeholder = substitute(placeholder_param)
+    access_token, expires_at = client_credentials_token(token_url, token_cache_file(), _send_token_request)
+    data_store.scenario[placeholder] = access_token
+    print_and_report(f"OAuth2 token of {token_url} expires in {expires_at - time.time():.0f} s")
+
+
 @step("Print <message>")
 def print_message(message_param: str) -> None:
     message = substitute(message_param)
@@ -125,9 +224,9 @@ def print_headers() -> None:
     for header_name, header_value in headers.items():
         print_and_report(f"    {header_name}: {header_value}")
     print_and_report("Response headers:\n")
-    response_headers = data_store.scenario[response_key]["headers"]
-    for header in response_headers:
-        print_and_report(f"    {header[0]}: {header[1]}")
+    for header_name, header_values in _response_header_index().items():
+        for header_value in _received_header_values(header_values):
+            print_and_report(f"    {header_name}: {header_value}")
 
 
 @step("Print status")
@@ -138,24 +237,22 @@ def print_status() -> None:
 
 @step("Print body")
 def print_body() -> None:
-    body: bytes = data_store.scenario.get(response_key, {}).get("body")
+    response = data_store.scenario.get(response_key, {})
     print_and_report("Response body:")
-    if body is not None and len(body) > 0:
+    if response.get("body") is not None and len(response["body"]) > 0:
+        body = response_body(response)
         try:
-            json_loaded = json.loads(body.decode())
-            pretty = json.dumps(json_loaded, indent=4)
+            pretty = json.dumps(body.json(), indent=4)
             print_and_report(f"\n{pretty}".replace('\n', '\n    '))
         except (json.decoder.JSONDecodeError, UnicodeDecodeError):
-            print_and_report(body.decode('unicode_escape'))
+            print_and_report(body.preview(None))
 
 
 @step("Append to <file>: <value>")
 def append_to_file(file_param: str, value_param: str) -> None:
     file_name = substitute(file_param)
-    file_path = assert_file_is_in_project(file_name)
     value = substitute(value_param)
-    with open(file_path, 'a') as f:
-        f.write(f"{value}\n")
+    append_line(file_name, value)
 
 
 @step("With header <header>: <value>")
@@ -172,6 +269,28 @@ def add_body(body_param: str) -> None:
     data_store.scenario[body_key] = body
 
 
+@step("With compressed body <encoding>")
+def add_body_compression(encoding_param: str) -> None:
+    encoding = substitute(encoding_param)
+    data_store.scenario[compression_key] = content_encoding(encoding)
+
+
+@step("With form field <name>: <value>")
+def add_form_field(name_param: str, value_param: str) -> None:
+    name = substitute(name_param)
+    value = substitute(value_param)
+    data_store.scenario.setdefault(form_key, []).append((name, value, None))
+
+
+@step("With file part <name>: <file>")
+def add_file_part(name_param: str, file_param: str) -> None:
+    name = substitute(name_param)
+    file_path = assert_file_is_in_project(substitute(file_param))
+    if not os.path.isfile(file_path):
+        raise AssertionError(f"File {file_path} does not exist")
+    data_store.scenario.setdefault(form_key, []).append((name, None, file_path))
+
+
 @step("Simulate response body: <value>")
 def simulate_response(body_param: str) -> None:
     body = substitute(body_param)
@@ -182,36 +301,124 @@ def simulate_response(body_param: str) -> None:
 def make_request(method_param: str, url_param: str) -> None:
     method = substitute(method_param)
     url = substitute(url_param)
-    headers = data_store.scenario.pop(headers_key, {})
-    if request_csrf_header_key in data_store.scenario and csrf_value_key in data_store.scenario:
-        req_csrf_header = data_store.scenario[request_csrf_header_key]
-        headers[req_csrf_header] = data_store.scenario[csrf_value_key]
-    body = data_store.scenario.pop(body_key, None)
-    if isinstance(body, str):
-        body = body.encode()
+    headers, body = _pop_request_data()
+    req = Request(url=url, method=method, headers=headers, data=body)
+    _send_request(req, f"{method} {url_param}")
+
+
+@step("Start request <method> <url> as <name>")
+def start_request_as(method_param: str, url_param: str, name_param: str) -> None:
+    method = substitute(method_param)
+    url = substitute(url_param)
+    name = substitute(name_param)
+    headers, body = _pop_request_data()
     req = Request(url=url, method=method, headers=headers, data=body)
-    data_store.scenario[sent_request_headers_key] = req.headers
     report_request_info(req)
-    with _open(req) as r:
-        resp: HTTPResponse|HTTPError = r
-        resp_headers = resp.getheaders()
-        resp_body = resp.read()
-        report_response_info(resp, resp_body)
-        data_store.scenario[response_key] = {
-            "body": resp_body,
-            "headers": resp_headers,
-            "status": resp.status,
-            "reason": resp.reason
-        }
-        if response_csrf_header_key in data_store.scenario:
-            resp_csrf_header = data_store.scenario[response_csrf_header_key]
-            for h in resp_headers:
-                if h[0] == resp_csrf_header:
-                    store_in_session(csrf_value_key, h[1])
-                    break
-        if hasattr(req, 'redirect_dict'):
-            redirects_count = json.dumps(req.redirect_dict, indent=4)
-            print_and_report(f"Redirections count (not in order): {redirects_count}")
+    pending_requests = data_store.scenario.setdefault(pending_requests_key, {})
+    pending_requests[name] = (req, f"{method} {url_param}", time.time(), perf_counter(), _open_async(req))
+
+
+@step("Await <name>")
+def await_request(name_param: str) -> None:
+    name = substitute(name_param)
+    pending = data_store.scenario.get(pending_requests_key, {}).pop(name, None)
+    if pending is None:
+        raise AssertionError(f"No request has been started as {name}")
+    req, request_template, started, start, future = pending
+    try:
+        with _async_response(req, future) as r:
+            waited = _rate_limit_wait(req)
+            _store_response(req, request_template, r, started + waited, start + waited)
+    except PhaseTimeout as e:
+        raise _timeout_failure(req, e) from e
+
+
+@step("Poll <method> <url> until jsonpath <jsonpath> = <json_value> within <seconds>")
+def poll_until_jsonpath_equals(
+        method_param: str, url_param: str, jsonpath_param: str, json_value_param: str, seconds_param: str) -> None:
+    method = substitute(method_param)
+    url = substitute(url_param)
+    jsonpath = substitute(jsonpath_param)
+    value = substitute(json_value_param)
+    timeout = float(substitute(seconds_param))
+    value_json = _parse_expected_json(value)
+    initial_delay = float(os.environ.get("poll_initial_delay", "0.5"))
+    max_delay = float(os.environ.get("poll_max_delay", "10"))
+    headers, body = _pop_request_data()
+    start = perf_counter()
+    deadline = start + timeout
+    attempts = 0
+    while True:
+        attempts += 1
+        req = Request(url=url, method=method, headers=dict(headers), data=body)
+        _send_request(req, f"{method} {url_param}")
+        matched = _jsonpath_equals_in_response(jsonpath, value_json)
+        elapsed = perf_counter() - start
+        data_store.scenario[poll_key] = {"attempts": attempts, "elapsed": elapsed}
+        if matched:
+            print_and_report(f"Polling succeeded after {attempts} attempts in {elapsed:.2f} s")
+            return
+        remaining = deadline - perf_counter()
+        if remaining <= 0:
+            raise AssertionError(
+                f"Assertion failed: {jsonpath} did not become {value} within {timeout} s after {attempts} attempts"
+            )
+        backoff = min(initial_delay * 2 ** (attempts - 1), max_delay)
+        delay = random.uniform(backoff / 2, backoff)
+        retry_after_values = _response_header_index().get("retry-after")
+        if retry_after_values:
+            retry_after = retry_after_seconds(retry_after_values[0])
+            delay = retry_after if retry_after is not None else delay
+        time.sleep(min(delay, remaining))
+
+
+@step("Load test <method> <url> with <requests> requests at concurrency <concurrency>")
+def load_test(method_param: str, url_param: str, requests_param: str, concurrency_param: str) -> None:
+    method = substitute(method_param)
+    url = substitute(url_param)
+    num_requests = int(substitute(requests_param))
+    concurrency = int(substitute(concurrency_param))
+    headers, body = _pop_request_data()
+
+    def send(_: int) -> tuple[float, bool]:
+        req = Request(url=url, method=method, headers=dict(headers), data=body)
+        start = perf_counter()
+        try:
+            with _open(req) as resp:
+                resp.read()
+                failed = resp.status is None or resp.status >= 400
+        except OSError:
+            failed = True
+        return (perf_counter() - start - _rate_limit_wait(req)) * 1000, failed
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(num_requests)))
+    elapsed = perf_counter() - start
+    latencies = [millis for millis, _ in results]
+    errors = sum(1 for _, failed in results if failed)
+    stats = latency_stats(latencies, errors, elapsed)
+    data_store.scenario[load_test_key] = stats
+    stats_str = '\n'.join(
+        f"    {name}: {value:.2f}" if isinstance(value, float) else f"    {name}: {value}" for name, value in stats.items()
+    )
+    print_and_report(f"Load test {method} {url} with {num_requests} requests at concurrency {concurrency}:\n{stats_str}")
+    print_and_report(f"Latency histogram:\n{latency_histogram(latencies)}")
+
+
+@step("Assert load test <stat> <expr>")
+def assert_load_test(stat_param: str, expr_param: str) -> None:
+    stat = substitute(stat_param)
+    expr = substitute(expr_param)
+    stats = data_store.scenario.get(load_test_key)
+    if stats is None:
+        raise AssertionError("Assertion failed: No load test has been run")
+    if stat not in stats:
+        raise AssertionError(f"{stat} is not a valid load test statistic. Valid: {', '.join(stats.keys())}")
+    # latencies are in milliseconds, throughput in requests per second and error rate in percent.
+    expr_value = re.sub(r'(\d)\s*(ms|%|/s)', r'\1', expr)
+    if not _eval_comparison(f"{stats[stat]:.3f}", expr_value):
+        raise AssertionError(f"Assertion failed: load test {stat} of {stats[stat]:.2f} is not {expr}")
 
 
 @step("Assert status <status_code>")
@@ -221,29 +428,56 @@ def assert_response_status(status_code_param: str) -> None:
     response = data_store.scenario[response_key]
     actual = response['status']
     if status_code != actual:
-        raise AssertionError(f"Assertion failed: Expected status code {status_code}, got {actual} - {response['reason']}\n{response['body']}")
+        raise AssertionError(
+            f"Assertion failed: Expected status code {status_code}, got {actual} - {response['reason']}\n"
+            f"{response_body(response).preview()}"
+        )
 
 
 @step("Assert header <header>: <value>")
 def assert_header(header_param: str, value_param: str) -> None:
-    expected_header = substitute(header_param).upper()
+    expected_header = substitute(header_param)
     expected_value = substitute(value_param)
-    response = data_store.scenario[response_key]
-    headers = response['headers']
-    for header in headers:
-        header_name = header[0].upper()
-        header_value = header[1]
-        if expected_header != header_name:
-            continue
-        header_value = header[1]
-        if expected_value == header_value:
-            return
-        header_values = header[1].split(',')
-        for header_value in header_values:
-            header_value = header_value.strip()
-            if expected_value == header_value:
-                return
-    raise AssertionError(f"Assertion failed: Expected header {expected_header}: {expected_value} not found")
+    header_values = _response_header_index().get(expected_header.lower(), [])
+    if expected_value not in header_values:
+        raise AssertionError(f"Assertion failed: Expected header {expected_header}: {expected_value} not found")
+
+
+@step("Assert header <header> matches <regex>")
+def assert_header_matches(header_param: str, regex_param: str) -> None:
+    expected_header = substitute(header_param)
+    regex = substitute(regex_param)
+    pattern = re.compile(regex)
+    header_values = _response_header_index().get(expected_header.lower(), [])
+    if not any(pattern.search(header_value) for header_value in header_values):
+        raise AssertionError(f"Assertion failed: No value of header {expected_header} matches '{regex}', found {header_values}")
+
+
+@step("Assert header <header> value <expr>")
+def assert_header_value(header_param: str, expr_param: str) -> None:
+    expected_header = substitute(header_param)
+    expr = substitute(expr_param)
+    header_values = _response_header_index().get(expected_header.lower())
+    if not header_values:
+        raise AssertionError(f"Assertion failed: Expected header {expected_header} not found")
+    header_value = header_values[0]
+    value = _replace_sizes(header_value)
+    if not is_numeric(value):
+        raise AssertionError(f"Assertion failed: Header {expected_header}: {header_value} is not numeric")
+    if not _eval_comparison(value, _replace_sizes(expr)):
+        raise AssertionError(f"Assertion failed: Header {expected_header}: {header_value} is not {expr}")
+
+
+@step("Assert response time <expr>")
+def assert_response_time(expr_param: str) -> None:
+    expr = substitute(expr_param)
+    timings = data_store.scenario[response_key].get("timings")
+    if timings is None:
+        raise AssertionError("Assertion failed: No response time recorded")
+    total = timings["total"]
+    if not _eval_comparison(f"{total:.3f}", expr):
+        phases = ', '.join(f"{phase}: {millis:.1f}" for phase, millis in timings.items())
+        raise AssertionError(f"Assertion failed: Response time of {total:.1f} ms is not {expr} ({phases})")
 
 
 @step("Assert jsonpath <jsonpath> exists")
@@ -319,10 +553,7 @@ def assert_response_jsonpath_equals(jsonpath_param: str, json_value_param: str)
     jsonpath = substitute(jsonpath_param)
     value = substitute(json_value_param)
     match = _find_jsonpath_match_in_response(jsonpath)
-    if os.environ.get("lenient_json_str_comparison", "false").lower() in ("true", "1"):
-        if (not value.strip().startswith(('[', '{', '"',))) and (not is_numeric(value.strip())) and (value.strip() not in ('null','true','false',)):
-            value  = f'"{value}"'
-    value_json = json.loads(value)
+    value_json = _parse_expected_json(value)
     if match != value_json:
         diff = _diff_json(match, value_json)
         print_and_report(diff)
@@ -333,17 +564,16 @@ def assert_response_jsonpath_equals(jsonpath_param: str, json_value_param: str)
 def assert_response_xpath_equals(xpath_param: str, xml_value_param: str) -> None:
     xpath = substitute(xpath_param)
     value = substitute(xml_value_param)
+    whitespace = xml_whitespace()
     match = _find_xpath_match_in_response(xpath)
-    match_str: str
     if isinstance(match, etree._Element):
-        value_xml = etree.XML(value)
-        match_str = match.xpath("string(.)")
-        equal = _xml_elements_equal(match, value_xml)
-    else:
-        match = _text_from_xml(match)
-        match_str = match
-        equal = match == value
-    if not equal:
+        if not xml_equals(match, value, whitespace):
+            differences = '\n'.join(diff_xml(match, value, whitespace))
+            print_and_report(f"Differences at {xpath}:\n{differences}")
+            raise AssertionError("Assertion failed: Expected value does not match")
+        return
+    match_str = _text_from_xml(match)
+    if normalize_text(match_str, whitespace) != normalize_text(value, whitespace):
         print_and_report(f"Expected:\n{value}\nGot:\n{match_str}")
         raise AssertionError("Assertion failed: Expected value does not match")
 
@@ -390,7 +620,7 @@ def assert_response_xpath_type(xpath_param: str, xml_type_param: str) -> None:
     matches = _find_xpath_matches_in_response(xpath)
     num_matches = len(matches)
     if num_matches > 1:
-        raise AssertionError(f"Assertion failed: multiple matches for {xpath} in {data_store.scenario[response_key]['body'].decode()}")
+        raise AssertionError(f"Assertion failed: multiple matches for {xpath} in {_response_body().preview()}")
     if xml_type == "empty" and num_matches == 0:
         return
     match = matches[0]
@@ -414,6 +644,41 @@ def assert_response_xpath_type(xpath_param: str, xml_type_param: str) -> None:
     raise AssertionError(f"Assertion failed: {match_str_short} is not of type {xml_type}")
 
 
+@step("Assert response matches schema <file>")
+def assert_response_matches_schema(file_param: str) -> None:
+    file_name = substitute(file_param)
+    file_path = assert_file_is_in_project(file_name)
+    validator = _schema_validator(file_path)
+    resp_json = _response_body().json()
+    violations = [f"    {_json_pointer(error.absolute_path)}: {error.message}" for error in validator.iter_errors(resp_json)]
+    if len(violations) > 0:
+        violations.sort()
+        violations_str = '\n'.join(violations)
+        raise AssertionError(f"Assertion failed: Response does not match schema {file_name}\n{violations_str}")
+
+
+@step("Assert response matches snapshot <name>")
+def assert_response_matches_snapshot(name_param: str) -> None:
+    name = substitute(name_param)
+    resp_json = normalize_snapshot(_response_body().json())
+    result, snapshot_json = compare_snapshot(name, resp_json)
+    if result == "written":
+        print_and_report(f"Snapshot {name} has been written")
+    elif result == "missing":
+        raise AssertionError(f"Assertion failed: Snapshot {name} is missing, run with snapshot_update=true to write it")
+    elif result == "mismatch":
+        print_and_report(_diff_json(resp_json, snapshot_json))
+        raise AssertionError(f"Assertion failed: Response does not match snapshot {name}")
+
+
+@step("Assert body matches <regex>")
+def assert_body_matches(regex_param: str) -> None:
+    regex = substitute(regex_param)
+    body = _response_body()
+    if body.search(regex) is None:
+        raise AssertionError(f"Assertion failed: Body does not match '{regex}': {body.preview()}")
+
+
 @step("Save jsonpath <jsonpath> as <key>")
 def save_response_jsonpath(jsonpath_param: str, key_param: str) -> None:
     jsonpath = substitute(jsonpath_param)
@@ -432,6 +697,24 @@ def save_response_xpath(xpath_param: str, key_param: str) -> None:
     store_in_session(key, match_primitive)
 
 
+@step("Save body regex <regex> group <group> as <key>")
+def save_body_regex(regex_param: str, group_param: str, key_param: str) -> None:
+    regex = substitute(regex_param)
+    group = substitute(group_param)
+    key = substitute(key_param)
+    body = _response_body()
+    match = body.search(regex)
+    if match is None:
+        raise AssertionError(f"Assertion failed: Body does not match '{regex}': {body.preview()}")
+    try:
+        value = match.group(int(group) if group.isdigit() else group)
+    except IndexError as e:
+        raise AssertionError(f"'{regex}' has no group {group}") from e
+    if value is None:
+        raise AssertionError(f"Group {group} of '{regex}' is not part of the match")
+    store_in_session(key, value.decode(body.charset) if isinstance(value, bytes) else value)
+
+
 @step("Save file <download>")
 def save_file(download_param) -> None:
     download = substitute(download_param)
@@ -441,6 +724,21 @@ def save_file(download_param) -> None:
         d.write(response_body)
 
 
+@step("Save response as <name>")
+def save_response(name_param: str) -> None:
+    name = substitute(name_param)
+    response = data_store.scenario.get(response_key)
+    if response is None:
+        raise AssertionError(f"There is no response to save as {name}")
+    save_response_as(name, response)
+
+
+@step("Use response <name>")
+def use_response(name_param: str) -> None:
+    name = substitute(name_param)
+    data_store.scenario[response_key] = saved_response(name)
+
+
 @step("Base64-encode <text> as <placeholder>")
 def base64_encode(text_param: str, placeholder_param: str) -> None:
     print_and_report('Deprecated Step: Use placeholder substitutions like "!{base64:text}" or "!{base64urlsafe:text}" directly in Step parameters')
@@ -463,32 +761,281 @@ def base64_decode(text_param: str, placeholder_param: str) -> None:
     store_in_session(placeholder, asString)
 
 
-def _open(req: Request) -> HTTPResponse|HTTPError:
+def _pop_request_data() -> tuple[dict[str, str], bytes | MultipartBody | CompressedBody | None]:
+    """ Takes the headers and body, that have been prepared for the next request, including the CSRF header.
+    Form fields and file parts are sent as multipart/form-data body. The body is compressed, if requested.
+    """
+    headers = data_store.scenario.pop(headers_key, {})
+    if request_csrf_header_key in data_store.scenario and csrf_value_key in data_store.scenario:
+        req_csrf_header = data_store.scenario[request_csrf_header_key]
+        headers[req_csrf_header] = data_store.scenario[csrf_value_key]
+    body = data_store.scenario.pop(body_key, None)
+    if isinstance(body, str):
+        body = body.encode()
+    form = data_store.scenario.pop(form_key, None)
+    if form is not None:
+        if body is not None:
+            raise AssertionError("A request cannot have a body and form parts at the same time")
+        body = MultipartBody(form)
+        if not any(name.lower() == "content-type" for name in headers):
+            headers["Content-Type"] = body.content_type
+        headers["Content-Length"] = str(len(body))
+    encoding = data_store.scenario.pop(compression_key, None)
+    threshold = compression_threshold()
+    has_encoding = any(name.lower() == "content-encoding" for name in headers)
+    if encoding is None and threshold is not None and body is not None and len(body) > threshold and not has_encoding:
+        encoding = "gzip"
+    if encoding is not None and body is not None:
+        body = CompressedBody(body, encoding)
+        headers["Content-Encoding"] = body.encoding
+        headers["Content-Length"] = str(len(body))
+        print_and_report(f"Request body: {body}")
+    return headers, body
+
+
+@profiled
+def _send_request(req: Request, request_template: str) -> None:
+    """ Sends the request and stores the response in the scenario. """
+    report_request_info(req)
+    started = time.time()
+    start = perf_counter()
+    try:
+        with _open(req) as r:
+            waited = _rate_limit_wait(req)
+            _store_response(req, request_template, r, started + waited, start + waited)
+    except PhaseTimeout as e:
+        raise _timeout_failure(req, e) from e
+
+
+def _send_token_request(req: Request) -> tuple[int, bytes]:
+    """ Sends the request like any other request, but without storing the response in the scenario.
+    The token is not reported.
+    """
+    try:
+        with _open(req) as resp:
+            status = resp.status
+            resp_headers = resp.getheaders()
+            resp_body = _read_response_body(resp, getattr(req, 'timeouts', None))
+    except PhaseTimeout as e:
+        raise _timeout_failure(req, e) from e
+    if http_mode() == "record":
+        # the cassette is part of the project, so the tokens must not be written into it
+        record_response(req, status, resp.reason, resp_headers, mask_tokens(resp_body))
+    return status, resp_body
+
+
+def _store_response(
+        req: Request, request_template: str, resp: HTTPResponse|HTTPError|BufferedResponse,
+        started: float, start: float) -> None:
+    """ Reads the response and stores it in the scenario. """
+    data_store.scenario[sent_request_headers_key] = req.headers
+    resp_headers = resp.getheaders()
+    download_start = perf_counter()
+    resp_body = _read_response_body(resp, getattr(req, 'timeouts', None))
+    end = perf_counter()
+    if http_mode() == "record":
+        # the 304 is recorded as it has been sent, the replay takes the body from the cache again
+        record_response(req, resp.status, resp.reason, resp_headers, resp_body)
+    from_cache = False
+    if http_cache_enabled() and req.get_method() == "GET":
+        if resp.status == 304:
+            cached = cached_response(req, resp_headers)
+            if cached is not None:
+                resp_headers, resp_body = cached
+                from_cache = True
+        elif resp.status == 200:
+            cache_response(req, resp_headers, resp_body)
+    timings = response_timings(resp)
+    timings.setdefault("download", (end - download_start) * 1000)
+    timings.setdefault("total", (end - start) * 1000)
+    record_latency(request_template, timings["total"])
+    header_index = _index_headers(resp_headers)
+    content_types = header_index.get("content-type")
+    body = ResponseBody(resp_body, content_types[0] if content_types else None)
+    report_response_info(resp, body)
+    data_store.scenario[response_key] = {
+        "body": resp_body,
+        "body_view": body,
+        "headers": resp_headers,
+        "header_index": header_index,
+        "status": resp.status,
+        "reason": resp.reason,
+        "timings": timings,
+        "from_cache": from_cache
+    }
+    remember_response(data_store.scenario[response_key])
+    if response_csrf_header_key in data_store.scenario:
+        resp_csrf_header = data_store.scenario[response_csrf_header_key]
+        csrf_values = header_index.get(resp_csrf_header.lower())
+        if csrf_values:
+            store_in_session(csrf_value_key, csrf_values[0])
+    if trace_enabled():
+        trace_request(trace_entry(
+            started, req.get_method(), req.full_url, dict(req.header_items()), len(req.data or b''),
+            resp.status, resp.reason, resp_headers, len(resp_body), timings, getattr(req, 'redirect_dict', {}), from_cache
+        ))
+    if hasattr(req, 'redirect_dict'):
+        redirects_count = json.dumps(req.redirect_dict, indent=4)
+        print_and_report(f"Redirections count (not in order): {redirects_count}")
+
+
+def _open(req: Request) -> HTTPResponse|HTTPError|BufferedResponse:
+    if http_mode() == "replay":
+        return replay_response(req)
+    if http_engine() == "asyncio":
+        return _async_response(req, _open_async(req))
     opener: OpenerDirector = data_store.scenario[opener_key]
+    # the wait for the rate limit counts neither against the timeouts nor as response time
+    req.rate_limit_wait = acquire_rate_limit(req.full_url)
+    req.timeouts = _timeouts()
+    try:
+        resp = opener.open(req)
+    except HTTPError as r:
+        resp = r
+    except URLError as e:
+        # urllib wraps errors, that occur before the request has been sent
+        if isinstance(e.reason, PhaseTimeout):
+            raise e.reason from e
+        raise
+    adapt_rate(req.full_url, resp.status, resp.getheaders())
+    return resp
+
+
+def _open_async(req: Request) -> Future:
+    """ Sends the request with the asyncio engine. The future results in the response. """
+    if http_mode() == "replay":
+        future = Future()
+        try:
+            future.set_result(replay_response(req))
+        except AssertionError as e:
+            future.set_exception(e)
+        return future
+    ConditionalRequestHandler().http_request(req)
+    # the wait for the rate limit counts neither against the timeouts nor as response time
+    req.rate_limit_wait = acquire_rate_limit(req.full_url)
+    req.timeouts = _timeouts()
+    return start_request(req, data_store.scenario[cookie_jar_key], _follow_redirects(), req.timeouts)
+
+
+def _async_response(req: Request, future: Future) -> HTTPError|BufferedResponse:
+    """ Waits for the response of a request, that has been sent with `_open_async`. """
     try:
-        return opener.open(req)
+        resp = future.result()
     except HTTPError as r:
-        return r
+        resp = r
+    if http_mode() != "replay":
+        # not in a callback of the future, because it would block the event loop while it waits for the state file
+        adapt_rate(req.full_url, resp.status, resp.getheaders())
+    return resp
+
+
+def _rate_limit_wait(req: Request) -> float:
+    """ The seconds, that the request waited for the rate limit of its host before it was sent. """
+    return getattr(req, 'rate_limit_wait', 0.0)
+
+
+def _read_response_body(resp: HTTPResponse|HTTPError|BufferedResponse, timeouts: Timeouts | None) -> bytes:
+    """ Reads the body in chunks, so that the total timeout is checked during the download. """
+    if timeouts is None or timeouts.deadline is None or isinstance(resp, BufferedResponse):
+        try:
+            return resp.read()
+        except TimeoutError as e:
+            if timeouts is None or isinstance(e, PhaseTimeout):
+                raise
+            raise timeouts.error("read") from e
+    chunks = []
+    try:
+        while chunk := resp.read(64 * 1024):
+            chunks.append(chunk)
+            timeouts.check()
+    except TimeoutError as e:
+        if isinstance(e, PhaseTimeout):
+            raise
+        raise timeouts.error(timeouts.phase("read")[0]) from e
+    return b''.join(chunks)
+
+
+def _timeout_failure(req: Request, timeout: PhaseTimeout) -> AssertionError:
+    return AssertionError(f"Timeout: {req.get_method()} {req.full_url} was aborted after the {timeout}")
+
+
+def _scenario_property(name: str, default: str | None = None) -> str | None:
+    # the property can be changed within a scenario, so both os.environ and data_store need to be considered.
+    return data_store.scenario.get(name, os.environ.get(name, default))
+
+
+def _follow_redirects() -> bool:
+    return _scenario_property("follow_redirects", "false").lower() in ("true", "1")
+
+
+def _timeouts() -> Timeouts | None:
+    seconds = [_scenario_property(name) for name in ("connect_timeout", "read_timeout", "total_timeout")]
+    if not any(seconds):
+        return None
+    return Timeouts(*(float(s) if s else None for s in seconds))
+
+
+def _parse_expected_json(value: str) -> Any:
+    if os.environ.get("lenient_json_str_comparison", "false").lower() in ("true", "1"):
+        stripped = value.strip()
+        if not stripped.startswith(('[', '{', '"')) and not is_numeric(stripped) and stripped not in ('null', 'true', 'false'):
+            value  = f'"{value}"'
+    return json.loads(value)
+
+
+def _jsonpath_equals_in_response(jsonpath: str, value_json: Any) -> bool:
+    try:
+        matches = _find_jsonpath_matches_in_response(jsonpath)
+    except ValueError:
+        # the response is not JSON (yet), f.i. an error page
+        return False
+    return len(matches) == 1 and matches[0].value == value_json
 
 
 def _find_jsonpath_match_in_response(jsonpath: str) -> Any:
     matches = _find_jsonpath_matches_in_response(jsonpath)
     if len(matches) == 0:
-        raise AssertionError(f"Assertion failed: No value found at {jsonpath} in {data_store.scenario[response_key]['body'].decode()}")
+        raise AssertionError(f"Assertion failed: No value found at {jsonpath} in {_response_body().preview()}")
     if len(matches) > 1:
-        raise AssertionError(f"Assertion failed: multiple matches for {jsonpath} in {data_store.scenario[response_key]['body'].decode()}")
+        raise AssertionError(f"Assertion failed: multiple matches for {jsonpath} in {_response_body().preview()}")
     return matches[0].value
 
 
+@profiled
 def _find_jsonpath_matches_in_response(jsonpath: str) -> Iterable[Any]:
-    resp: bytes = data_store.scenario[response_key]['body']
-    resp_str = resp.decode()
-    resp_json = json.loads(resp_str)
+    resp_json = _response_body().json()
     jsonpath_expression = parse_json_path(jsonpath)
     match = jsonpath_expression.find(resp_json)
     return match
 
 
+def _response_body() -> ResponseBody:
+    return response_body(data_store.scenario[response_key])
+
+
+def _report_latency() -> bool:
+    return os.environ.get("report_latency", "false").strip().lower() in ("true", "1")
+
+
+def _schema_validator(file_path: str) -> Validator:
+    mtime = os.stat(file_path).st_mtime_ns
+    cached = _schema_validators.get(file_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(file_path, 'r') as f:
+        schema = json.load(f)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    validator = validator_class(schema, format_checker=validator_class.FORMAT_CHECKER)
+    _schema_validators[file_path] = (mtime, validator)
+    return validator
+
+
+def _json_pointer(path: Iterable[str | int]) -> str:
+    tokens = [str(token).replace('~', '~0').replace('/', '~1') for token in path]
+    return '#/' + '/'.join(tokens) if len(tokens) > 0 else '#'
+
+
 def _diff_json(match_json: bool|int|float|str|list|dict|None, expected_json: bool|int|float|str|list|dict|None) -> str:
     match_str = json.dumps(match_json, indent=4, sort_keys=True)
     expected_str = json.dumps(expected_json, indent=4, sort_keys=True)
@@ -512,37 +1059,68 @@ def _diff_json(match_json: bool|int|float|str|list|dict|None, expected_json: boo
 def _find_xpath_match_in_response(xpath: str) -> etree._Element | str | int | float:
     matches = _find_xpath_matches_in_response(xpath)
     if len(matches) == 0:
-        raise AssertionError(f"Assertion failed: No value found at {xpath} in {data_store.scenario[response_key]['body'].decode()}")
+        raise AssertionError(f"Assertion failed: No value found at {xpath} in {_response_body().preview()}")
     if len(matches) > 1:
-        raise AssertionError(f"Assertion failed: multiple matches for {xpath} in {data_store.scenario[response_key]['body'].decode()}")
+        raise AssertionError(f"Assertion failed: multiple matches for {xpath} in {_response_body().preview()}")
     return matches[0]
 
 
+@profiled
 def _find_xpath_matches_in_response(xpath: str) -> Iterable[etree._Element] | Iterable[str] | Iterable[int] | Iterable[float]:
-    resp: bytes = data_store.scenario[response_key]['body']
-    file_like_body = BytesIO(resp)
-    tree: etree._ElementTree = etree.parse(file_like_body)
-    root: etree._Element = tree.getroot()
-    _clear_namespaces(root)
+    root = _response_body().xml()
     match = root.xpath(xpath)
     return match if isinstance(match, list) else [match]
 
 
-def _clear_namespaces(elem: etree._Element) -> None:
-    # lxml with xpath cannot properly handle default namespaces.
-    # In our case, we probably do not need namespace handling, as we only look at single files, which are mostly pretty simple.
-    elem.tag = re.sub("{.*}", "", elem.tag)
-    for child in elem.getchildren():
-        _clear_namespaces(child)
+def _eval_matches_length(matches: int, expr: str) -> None:
+    if not _eval_comparison(str(matches), expr):
+        raise AssertionError(f"found {matches} matches, which is not {expr}")
 
 
-def _eval_matches_length(matches: int, expr: str) -> None:
-    full_expr = f"{matches}{expr}"
+def _eval_comparison(value: str, expr: str) -> bool:
+    full_expr = f"{value}{expr}"
     result = numexpr.evaluate(full_expr).tolist()
     if not isinstance(result, bool):
         raise AssertionError(f"'{full_expr} = {result}' is not a boolean expression")
-    if result is False:
-        raise AssertionError(f"found {matches} matches, which is not {expr}")
+    return result
+
+
+def _replace_sizes(text: str) -> str:
+    """ Replaces data sizes like 1MB or 2.5 KiB with the number of bytes, so that they can be used in expressions. """
+    return _size_pattern.sub(lambda m: str(int(float(m.group(1)) * _size_units[m.group(2).upper()])), text)
+
+
+def _index_headers(headers: Iterable[tuple[str, str]]) -> dict[str, list[str]]:
+    """ Maps lower-case header names to all their values. The single parts of comma-separated values are also listed. """
+    index: dict[str, list[str]] = {}
+    for header_name, header_value in headers:
+        header_values = index.setdefault(header_name.lower(), [])
+        header_value = header_value.strip()
+        header_values.append(header_value)
+        if ',' in header_value:
+            header_values.extend(part.strip() for part in header_value.split(','))
+    return index
+
+
+def _received_header_values(header_values: list[str]) -> list[str]:
+    """ The values of an indexed header without the parts of comma-separated values, that follow each of them. """
+    received = []
+    values = iter(header_values)
+    for header_value in values:
+        received.append(header_value)
+        if ',' in header_value:
+            for _ in header_value.split(','):
+                next(values)
+    return received
+
+
+def _response_header_index() -> dict[str, list[str]]:
+    response = data_store.scenario[response_key]
+    header_index = response.get("header_index")
+    if header_index is None:
+        header_index = _index_headers(response.get("headers", []))
+        response["header_index"] = header_index
+    return header_index
 
 
 def _text_from_xml(match: etree._Element | str | int | float) -> str:
@@ -552,16 +1130,6 @@ def _text_from_xml(match: etree._Element | str | int | float) -> str:
         return str(match)
 
 
-def _xml_elements_equal(e1: etree._Element, e2: etree._Element) -> bool:
-    """ https://stackoverflow.com/questions/7905380/testing-equivalence-of-xml-etree-elementtree """
-    if e1.tag != e2.tag: return False
-    if e1.text != e2.text: return False
-    if e1.tail != e2.tail: return False
-    if e1.attrib != e2.attrib: return False
-    if len(e1) != len(e2): return False
-    return all(_xml_elements_equal(c1, c2) for c1, c2 in zip(e1, e2))
-
-
 def is_numeric(value: str) -> bool:
     try:
         float(value)
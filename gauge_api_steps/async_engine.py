@@ -0,0 +1,322 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import asyncio
+import os
+import ssl
+import sys
+import threading
+from concurrent.futures import Future
+from http.cookiejar import CookieJar
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import SplitResult, urljoin, urlsplit
+from urllib.request import HTTPRedirectHandler, Request
+
+from .transport import BufferedResponse, Timeouts, forget_address, resolve_address
+
+_redirect_codes = (301, 302, 303, 307, 308)
+# requests with other methods are not sent again, because the server might have processed them already
+_idempotent_methods = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE")
+# the same limits as urllib's HTTPRedirectHandler
+_max_repeats = 4
+_max_redirections = 10
+_read_size = 64 * 1024
+_user_agent = f"Python-urllib/{sys.version_info.major}.{sys.version_info.minor}"
+
+_engine: "AsyncEngine | None" = None
+_engine_lock = threading.Lock()
+
+
+class AsyncEngine:
+    """ An HTTP/1.1 client on an event loop, that runs in a background thread for the whole runner process.
+    Connections are kept alive and reused per scheme, host and port.
+    The number of concurrent connections per host is limited by the property `max_connections_per_host`.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._idle: dict[tuple[str, str, int], list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._limits: dict[tuple[str, str, int], asyncio.Semaphore] = {}
+        self._max_connections = int(os.environ.get("max_connections_per_host", "10"))
+        self._ssl_context = ssl.create_default_context()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="gauge-api-steps-asyncio", daemon=True)
+        self._thread.start()
+
+    def submit(self, req: Request, cookie_jar: CookieJar, follow_redirects: bool, timeouts: Timeouts | None = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._fetch_in_time(req, cookie_jar, follow_redirects, timeouts), self.loop)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._close_idle(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    async def _fetch_in_time(
+            self, req: Request, cookie_jar: CookieJar, follow_redirects: bool, timeouts: Timeouts | None) -> BufferedResponse:
+        if timeouts is None or timeouts.deadline is None:
+            return await self.fetch(req, cookie_jar, follow_redirects, timeouts)
+        try:
+            remaining = timeouts.deadline - perf_counter()
+            return await asyncio.wait_for(self.fetch(req, cookie_jar, follow_redirects, timeouts), remaining)
+        except TimeoutError as e:
+            raise timeouts.error("total") from e
+
+    async def fetch(
+            self, req: Request, cookie_jar: CookieJar, follow_redirects: bool,
+            timeouts: Timeouts | None = None) -> BufferedResponse:
+        """ Sends the request and follows redirects like urllib, if `follow_redirects` is set. """
+        start = perf_counter()
+        original = req
+        while True:
+            cookie_jar.add_cookie_header(req)
+            resp = await self._send(req, timeouts or Timeouts())
+            cookie_jar.extract_cookies(resp, req)
+            if not follow_redirects or resp.status not in _redirect_codes:
+                break
+            new_req = _redirect_request(req, resp)
+            if new_req is None:
+                break
+            visited = original.redirect_dict = getattr(original, 'redirect_dict', {})
+            if visited.get(new_req.full_url, 0) >= _max_repeats or len(visited) >= _max_redirections:
+                resp.timings["total"] = (perf_counter() - start) * 1000
+                # the same error as urllib's HTTPRedirectHandler
+                raise HTTPError(req.full_url, resp.status, HTTPRedirectHandler.inf_msg + resp.reason, resp.info(), resp)
+            visited[new_req.full_url] = visited.get(new_req.full_url, 0) + 1
+            req = new_req
+        resp.timings["total"] = (perf_counter() - start) * 1000
+        return resp
+
+    async def _send(self, req: Request, timeouts: Timeouts) -> BufferedResponse:
+        url = urlsplit(req.full_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        key = (url.scheme, url.hostname, port)
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self._max_connections))
+        async with limit:
+            return await self._exchange(req, url, key, timeouts)
+
+    async def _exchange(
+            self, req: Request, url: SplitResult, key: tuple[str, str, int], timeouts: Timeouts) -> BufferedResponse:
+        head = _request_head(req, url)
+        timings: dict[str, float] = {}
+        while True:
+            reader, writer = self._idle_connection(key)
+            reused = reader is not None
+            if not reused:
+                reader, writer = await self._connect(key, timeouts, timings)
+            try:
+                sent = perf_counter()
+                writer.write(head)
+                if isinstance(req.data, bytes):
+                    writer.write(req.data)
+                elif req.data is not None:
+                    for chunk in req.data:
+                        writer.write(chunk)
+                        await writer.drain()
+                await writer.drain()
+                phase, seconds = timeouts.phase("read")
+                status_line = await asyncio.wait_for(reader.readline(), seconds)
+                if not status_line:
+                    raise ConnectionResetError("the connection has been closed by the server")
+            except TimeoutError as e:
+                writer.close()
+                raise timeouts.error(phase) from e
+            except ConnectionError:
+                writer.close()
+                if reused and req.get_method() in _idempotent_methods:
+                    # the server has closed the idle connection in the meantime
+                    continue
+                raise
+            except BaseException:
+                # f.i. cancelled by the total timeout
+                writer.close()
+                raise
+            break
+        try:
+            # the read timeout applies to each read, the total timeout is applied to the whole exchange
+            version, status, reason = _parse_status_line(status_line)
+            headers = await _read_headers(reader, timeouts.read)
+            while 100 <= status < 200:
+                version, status, reason = _parse_status_line(await asyncio.wait_for(reader.readline(), timeouts.read))
+                headers = await _read_headers(reader, timeouts.read)
+            timings["ttfb"] = (perf_counter() - sent) * 1000
+            download_start = perf_counter()
+            body, keep_alive = await _read_body(reader, req.get_method(), version, status, headers, timeouts.read)
+        except TimeoutError as e:
+            writer.close()
+            raise timeouts.error("read") from e
+        except BaseException:
+            writer.close()
+            raise
+        timings["download"] = (perf_counter() - download_start) * 1000
+        if keep_alive:
+            self._idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+        resp = BufferedResponse(req.full_url, status, reason, headers, body)
+        resp.timings = timings
+        return resp
+
+    def _idle_connection(
+            self, key: tuple[str, str, int]) -> tuple[asyncio.StreamReader | None, asyncio.StreamWriter | None]:
+        """ An idle connection to the host, that has not been closed by the server yet, or (None, None). """
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None, None
+
+    async def _connect(
+            self, key: tuple[str, str, int], timeouts: Timeouts, timings: dict[str, float]
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        scheme, host, port = key
+        https = scheme == "https"
+        start = perf_counter()
+        addr_infos = await self.loop.run_in_executor(None, resolve_address, host, port)
+        resolved = perf_counter()
+        timings["dns"] = (resolved - start) * 1000
+        phase, seconds = timeouts.phase("connect")
+        error = None
+        # like socket.create_connection, all resolved addresses are tried
+        for _, _, _, _, sockaddr in addr_infos:
+            try:
+                connection = await asyncio.wait_for(asyncio.open_connection(
+                    sockaddr[0], port, ssl=self._ssl_context if https else None, server_hostname=host if https else None
+                ), seconds)
+                timings["connect"] = (perf_counter() - resolved) * 1000
+                return connection
+            except TimeoutError:
+                error = timeouts.error(phase)
+            except OSError as e:
+                error = e
+        # the address might have changed
+        forget_address(host, port)
+        raise error
+
+    async def _close_idle(self) -> None:
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+def http_engine() -> str:
+    engine = os.environ.get("http_engine", "urllib").strip().lower()
+    if engine not in ("urllib", "asyncio"):
+        raise ValueError(f"http_engine must be urllib or asyncio, not {engine}")
+    return engine
+
+
+def start_request(req: Request, cookie_jar: CookieJar, follow_redirects: bool, timeouts: Timeouts | None = None) -> Future:
+    """ Sends the request on the event loop of the runner process. The future results in a BufferedResponse. """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AsyncEngine()
+    return _engine.submit(req, cookie_jar, follow_redirects, timeouts)
+
+
+def close_engine() -> None:
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.close()
+
+
+def _request_head(req: Request, url: SplitResult) -> bytes:
+    path = url.path or '/'
+    if url.query:
+        path = f"{path}?{url.query}"
+    headers = {
+        "Host": url.netloc.rpartition('@')[2],
+        "User-Agent": _user_agent,
+        "Accept-Encoding": "identity",
+        "Connection": "keep-alive",
+    }
+    if req.data is not None:
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        headers["Content-Length"] = str(len(req.data))
+    names = {name.lower(): name for name in headers}
+    for name, value in req.header_items():
+        headers.pop(names.get(name.lower(), name), None)
+        headers[name] = value
+    lines = [f"{req.get_method()} {path} HTTP/1.1"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('iso-8859-1')
+
+
+def _parse_status_line(line: bytes) -> tuple[str, int, str]:
+    parts = line.decode('iso-8859-1').strip().split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise ConnectionError(f"invalid HTTP status line {line!r}")
+    return parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+
+async def _read_headers(reader: asyncio.StreamReader, read_timeout: float | None = None) -> list[tuple[str, str]]:
+    headers = []
+    while (line := await asyncio.wait_for(reader.readline(), read_timeout)) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('iso-8859-1').partition(':')
+        headers.append((name.strip(), value.strip()))
+    return headers
+
+
+async def _read_body(
+        reader: asyncio.StreamReader, method: str, version: str, status: int, headers: list[tuple[str, str]],
+        read_timeout: float | None = None) -> tuple[bytes, bool]:
+    """ Reads the body of a response and tells, if the connection can be used for another request.
+    The read timeout applies to each read of at most 64 KiB, like to each socket read of urllib, not to the whole body.
+    """
+    index = {name.lower(): value for name, value in headers}
+    connection = index.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if method == "HEAD" or status in (204, 304):
+        return b'', keep_alive
+    if "chunked" in index.get("transfer-encoding", "").lower():
+        chunks = []
+        while (size := int((await asyncio.wait_for(reader.readline(), read_timeout)).split(b';')[0].strip(), 16)) > 0:
+            chunks.append(await _read_exactly(reader, size, read_timeout))
+            await asyncio.wait_for(reader.readline(), read_timeout)
+        await _read_headers(reader, read_timeout)
+        return b''.join(chunks), keep_alive
+    if "content-length" in index:
+        return await _read_exactly(reader, int(index["content-length"]), read_timeout), keep_alive
+    parts = []
+    while part := await asyncio.wait_for(reader.read(_read_size), read_timeout):
+        parts.append(part)
+    return b''.join(parts), False
+
+
+async def _read_exactly(reader: asyncio.StreamReader, size: int, read_timeout: float | None) -> bytes:
+    parts = []
+    remaining = size
+    while remaining > 0:
+        part = await asyncio.wait_for(reader.read(min(remaining, _read_size)), read_timeout)
+        if not part:
+            raise asyncio.IncompleteReadError(b''.join(parts), size)
+        parts.append(part)
+        remaining -= len(part)
+    return b''.join(parts)
+
+
+def _redirect_request(req: Request, resp: BufferedResponse) -> Request | None:
+    """ The request to the redirect location, like urllib's HTTPRedirectHandler would create it.
+    None, if it cannot be redirected.
+    """
+    location = next((value for name, value in resp.headers if name.lower() in ("location", "uri")), None)
+    if location is None:
+        return None
+    new_url = urljoin(req.full_url, location.replace(' ', '%20'))
+    if urlsplit(new_url).scheme not in ("http", "https"):
+        return None
+    method = req.get_method()
+    if not (method in ("GET", "HEAD") or resp.status in (301, 302, 303) and method == "POST"):
+        return None
+    headers = {name: value for name, value in req.headers.items() if name.lower() not in ("content-length", "content-type")}
+    return Request(new_url, method="HEAD" if method == "HEAD" else "GET", headers=headers,
+                   origin_req_host=req.origin_req_host, unverifiable=True)
@@ -0,0 +1,128 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import codecs
+import functools
+import json
+import mmap
+import os
+import re
+from functools import cached_property
+from io import BytesIO
+from typing import Any
+
+from lxml import etree
+
+_charset_pattern = re.compile(r'charset\s*=\s*"?([^";\s]+)"?', re.IGNORECASE)
+_non_ascii = re.compile(rb'[^\x00-\x7f]')
+
+
+class ResponseBody:
+    """ Views on the raw bytes of a response body, that are decoded and parsed at most once.
+    The raw bytes are not copied. They can also be a memory-mapped file.
+    """
+
+    def __init__(self, raw: bytes | mmap.mmap, content_type: str | None = None):
+        self.raw = raw
+        self.charset = _charset(content_type)
+
+    @cached_property
+    def text(self) -> str:
+        return str(self.raw, self.charset)
+
+    @cached_property
+    def _json(self) -> Any:
+        return json.loads(self.text)
+
+    @cached_property
+    def _xml(self) -> etree._Element:
+        root = etree.parse(BytesIO(self.raw)).getroot()
+        _clear_namespaces(root)
+        return root
+
+    def json(self) -> Any:
+        return self._json
+
+    def xml(self) -> etree._Element:
+        """ The root element of the XML document without namespaces. """
+        return self._xml
+
+    def preview(self, limit: int | None = -1) -> str:
+        """ The text of the body, truncated after `limit` characters. The default limit is the property `body_preview_length`.
+        Bytes, that cannot be decoded, are replaced.
+        """
+        if limit == -1:
+            limit = int(os.environ.get("body_preview_length", "1000"))
+        if limit is None or len(self.raw) <= limit:
+            try:
+                return self.text
+            except UnicodeDecodeError:
+                return str(self.raw, self.charset, errors='replace')
+        if "text" in self.__dict__:
+            preview = self.text[0:limit]
+        else:
+            preview = self.raw[0:limit].decode(self.charset, errors='replace')
+        return f"{preview}... ({len(self.raw)} bytes)"
+
+    def search(self, regex: str) -> re.Match[bytes] | re.Match[str] | None:
+        """ Searches the body. `^` and `$` match at the start and end of lines.
+        If both the regex and the body are ASCII, the raw bytes are searched without decoding them, which matches the same.
+        Otherwise, the text is searched, so that f.i. `\\w` and `.` match non-ASCII characters.
+        """
+        if regex.isascii() and self._is_ascii:
+            return _bytes_pattern(regex).search(self.raw)
+        return _text_pattern(regex).search(self.text)
+
+    @cached_property
+    def _is_ascii(self) -> bool:
+        return _is_ascii_compatible(self.charset) and _non_ascii.search(self.raw) is None
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+
+def response_body(response: dict) -> ResponseBody:
+    """ The body view of a stored response. It is cached in the response, as long as the body stays the same. """
+    body: ResponseBody | None = response.get("body_view")
+    if body is None or body.raw is not response["body"]:
+        content_type = next((value for name, value in response.get("headers", []) if name.lower() == "content-type"), None)
+        body = ResponseBody(response["body"], content_type)
+        response["body_view"] = body
+    return body
+
+
+@functools.lru_cache(maxsize=128)
+def _bytes_pattern(regex: str) -> re.Pattern[bytes]:
+    return re.compile(regex.encode('ascii'), re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=128)
+def _text_pattern(regex: str) -> re.Pattern[str]:
+    return re.compile(regex, re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=32)
+def _is_ascii_compatible(charset: str) -> bool:
+    """ Whether ASCII text is encoded as the same bytes, which is not the case f.i. for UTF-16. """
+    return "\n ~azAZ09".encode(charset) == b"\n ~azAZ09"
+
+
+def _charset(content_type: str | None) -> str:
+    match = _charset_pattern.search(content_type or "")
+    if match is None:
+        return "utf-8"
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return "utf-8"
+
+
+def _clear_namespaces(elem: etree._Element) -> None:
+    # lxml with xpath cannot properly handle default namespaces.
+    # In our case, we probably do not need namespace handling, as we only look at single files, which are mostly pretty simple.
+    if isinstance(elem.tag, str):
+        elem.tag = re.sub("{.*}", "", elem.tag)
+    for child in elem.getchildren():
+        _clear_namespaces(child)
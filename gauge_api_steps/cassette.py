@@ -0,0 +1,117 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import base64
+import hashlib
+import json
+import mmap
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from urllib.request import Request
+
+from .compression import CompressedBody
+from .file_util import assert_file_is_in_project
+from .multipart import MultipartBody
+from .reporting import mask_secrets
+from .transport import BufferedResponse
+
+# memory-mapped cassette files by path, with (modification time, size), map and index of key to (start, end) of the entry
+_cassettes: dict[str, tuple[tuple[int, int], mmap.mmap | None, dict[str, tuple[int, int]]]] = {}
+_cookie_value = re.compile(r'^([^=;]*=)[^;]*')
+
+
+def http_mode() -> str:
+    mode = os.environ.get("http_mode", "passthrough").strip().lower()
+    if mode not in ("record", "replay", "passthrough"):
+        raise ValueError(f"unsupported http_mode {mode}. Valid: record, replay, passthrough")
+    return mode
+
+
+def cassette_key(method: str, url: str, body: bytes | MultipartBody | CompressedBody | None) -> str:
+    """ Normalizes method, URL and body of a request into a key, that identifies recorded responses.
+    Scheme and host are lower-cased and query parameters are sorted. The body is represented by its hash.
+    Secrets in the URL are masked, because the key is written to the cassette.
+    """
+    parts = urlsplit(url)
+    params = [(mask_secrets(name), mask_secrets(value)) for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+    query = urlencode(sorted(params), safe='*')
+    netloc = mask_secrets(parts.netloc).lower()
+    normalized_url = urlunsplit((parts.scheme.lower(), netloc, mask_secrets(parts.path) or '/', query, ''))
+    body_hash = body.digest() if isinstance(body, (MultipartBody, CompressedBody)) else hashlib.sha256(body or b'').hexdigest()
+    return f"{method.upper()} {normalized_url} {body_hash}"
+
+
+def record_response(req: Request, status: int, reason: str, headers: list[tuple[str, str]], body: bytes) -> None:
+    """ Appends the response to the cassette file. Secrets and the values of cookies are masked before they are written. """
+    cassette_file = _cassette_file()
+    os.makedirs(os.path.dirname(cassette_file), exist_ok=True)
+    try:
+        body = mask_secrets(body.decode()).encode()
+    except UnicodeDecodeError:
+        pass
+    entry = {
+        "status": status,
+        "reason": reason,
+        "headers": [_recorded_header(name, value) for name, value in headers],
+        "body": base64.b64encode(body).decode(),
+    }
+    key = cassette_key(req.get_method(), req.full_url, req.data)
+    with open(cassette_file, 'a') as c:
+        c.write(f"{key}\t{json.dumps(entry, separators=(',', ':'))}\n")
+
+
+def replay_response(req: Request) -> BufferedResponse:
+    """ Serves a recorded response from the cassette file without any network access. """
+    cassette_file = _cassette_file()
+    mm, index = _load_cassette(cassette_file)
+    key = cassette_key(req.get_method(), req.full_url, req.data)
+    position = index.get(key)
+    if mm is None or position is None:
+        raise AssertionError(f"No recorded response for {req.get_method()} {mask_secrets(req.full_url)} in {cassette_file}")
+    entry = json.loads(mm[position[0]:position[1]])
+    headers = [(name, value) for name, value in entry["headers"]]
+    return BufferedResponse(req.full_url, entry["status"], entry["reason"], headers, base64.b64decode(entry["body"]))
+
+
+def _recorded_header(name: str, value: str) -> tuple[str, str]:
+    if name.lower() == "set-cookie":
+        # cookies are credentials, even if they are not listed in mask_secrets
+        value = _cookie_value.sub(r'\1********', value, count=1)
+    return name, mask_secrets(value)
+
+
+def _cassette_file() -> str:
+    cassette_file = os.environ.get("http_cassette", "cassettes/http.cassette")
+    return assert_file_is_in_project(cassette_file)
+
+
+def _load_cassette(cassette_file: str) -> tuple[mmap.mmap | None, dict[str, tuple[int, int]]]:
+    if not os.path.exists(cassette_file):
+        return None, {}
+    stat = os.stat(cassette_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _cassettes.get(cassette_file)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    if cached is not None and cached[1] is not None:
+        cached[1].close()
+    mm = None
+    index = {}
+    if stat.st_size > 0:
+        with open(cassette_file, 'rb') as c:
+            mm = mmap.mmap(c.fileno(), 0, access=mmap.ACCESS_READ)
+        # entries are lines of "<key>\t<json>". Later recordings of the same key win.
+        position = 0
+        size = len(mm)
+        while position < size:
+            tab = mm.find(b'\t', position)
+            end = mm.find(b'\n', position)
+            end = size if end < 0 else end
+            if 0 <= tab < end:
+                index[mm[position:tab].decode()] = (tab + 1, end)
+            position = end + 1
+    _cassettes[cassette_file] = (version, mm, index)
+    return mm, index
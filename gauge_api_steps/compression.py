@@ -0,0 +1,122 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import hashlib
+import os
+import zlib
+from collections.abc import Iterator
+from typing import Protocol
+
+from .multipart import MultipartBody
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+_chunk_size = 1024 ** 2
+_default_levels = {"gzip": 6, "deflate": 6, "br": 5, "zstd": 3}
+_aliases = {"brotli": "br", "zstandard": "zstd"}
+
+
+class _Compressor(Protocol):
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class _BrotliCompressor:
+
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressedBody:
+    """ A request body, that has been compressed chunk by chunk, without copying the raw body or reading its files at once.
+    The compressed chunks are kept, so that the length is known in advance and the body can be sent several times.
+    """
+
+    def __init__(self, body: bytes | MultipartBody, encoding: str, level: int | None = None):
+        self.body = body
+        self.encoding = content_encoding(encoding)
+        compressor = _compressor(self.encoding, level)
+        self.chunks: list[bytes] = []
+        for chunk in _raw_chunks(body):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                self.chunks.append(compressed)
+        self.chunks.append(compressor.flush())
+        self.raw_length = len(body)
+        self.content_length = sum(len(chunk) for chunk in self.chunks)
+
+    def digest(self) -> str:
+        """ A hash of the raw content. """
+        if isinstance(self.body, MultipartBody):
+            return self.body.digest()
+        return hashlib.sha256(self.body).hexdigest()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+    def __len__(self) -> int:
+        return self.content_length
+
+    def __str__(self) -> str:
+        return f"{self.raw_length} bytes compressed with {self.encoding} to {self.content_length} bytes"
+
+
+def content_encoding(encoding: str) -> str:
+    """ The Content-Encoding of a supported compression.
+    Brotli and Zstandard need the optional packages `brotli` and `zstandard`.
+    """
+    encoding = encoding.strip().lower()
+    encoding = _aliases.get(encoding, encoding)
+    if encoding not in _default_levels:
+        raise AssertionError(f"Unsupported compression {encoding}. Valid: {', '.join(_default_levels)}")
+    if encoding == "br" and brotli is None or encoding == "zstd" and zstandard is None:
+        raise AssertionError(f"Compression {encoding} requires the package {'brotli' if encoding == 'br' else 'zstandard'}")
+    return encoding
+
+
+def compression_threshold() -> int | None:
+    """ Bodies larger than the property `compress_request_body_over` are compressed with gzip,
+    if no compression has been chosen.
+    """
+    threshold = os.environ.get("compress_request_body_over")
+    return int(threshold) if threshold else None
+
+
+def _compressor(encoding: str, level: int | None) -> _Compressor:
+    if level is None:
+        level_prop = os.environ.get("request_compression_level")
+        level = int(level_prop) if level_prop else _default_levels[encoding]
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS)
+    if encoding == "br":
+        return _BrotliCompressor(level)
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+def _raw_chunks(body: bytes | MultipartBody) -> Iterator[bytes]:
+    if isinstance(body, MultipartBody):
+        yield from body
+        return
+    view = memoryview(body)
+    for start in range(0, len(view), _chunk_size):
+        yield view[start:start + _chunk_size]
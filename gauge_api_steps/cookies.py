@@ -0,0 +1,73 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+from http.cookiejar import Cookie, CookieJar, LWPCookieJar
+
+from getgauge.python import data_store
+
+from .file_util import locked_file
+
+persisted_cookies_key = "_persisted_cookies"
+
+
+def persist_cookies() -> bool:
+    return os.environ.get("persist_cookies", "false").lower() in ("true", "1")
+
+
+def cookie_file(session_file_path: str) -> str:
+    """ The cookies are persisted next to the session properties, f.i. in `env/default/session.cookies`. """
+    return f"{os.path.splitext(session_file_path)[0]}.cookies"
+
+
+def load_cookies(session_file_path: str) -> CookieJar:
+    """ A new cookie jar for the scenario.
+    If cookies are persisted, it contains the cookies of former scenarios, that have not expired.
+    """
+    if not persist_cookies():
+        return CookieJar()
+    cookie_jar = LWPCookieJar(cookie_file(session_file_path))
+    with locked_file(cookie_jar.filename):
+        if os.path.exists(cookie_jar.filename):
+            cookie_jar.load(ignore_discard=True)
+    data_store.scenario[persisted_cookies_key] = _cookie_values(cookie_jar)
+    return cookie_jar
+
+
+def save_cookies(cookie_jar: CookieJar | None) -> None:
+    """ Merges the cookies, that have changed in the scenario, into the cookie file.
+    Cookies of other runners, which have been saved in the meantime, are kept, unless the scenario has changed them as well.
+    """
+    loaded: dict | None = data_store.scenario.pop(persisted_cookies_key, None)
+    if loaded is None or not isinstance(cookie_jar, LWPCookieJar):
+        return
+    cookie_jar.clear_expired_cookies()
+    current = _cookie_values(cookie_jar)
+    if current == loaded:
+        return
+    with locked_file(cookie_jar.filename):
+        merged = LWPCookieJar(cookie_jar.filename)
+        if os.path.exists(merged.filename):
+            merged.load(ignore_discard=True)
+        for domain, path, name in loaded.keys() - current.keys():
+            # the cookie has been deleted or has expired in the scenario
+            try:
+                merged.clear(domain, path, name)
+            except KeyError:
+                pass
+        for cookie in cookie_jar:
+            if loaded.get(_cookie_key(cookie)) != current[_cookie_key(cookie)]:
+                merged.set_cookie(cookie)
+        tmp = f"{merged.filename}.tmp"
+        merged.save(tmp, ignore_discard=True)
+        os.replace(tmp, merged.filename)
+
+
+def _cookie_key(cookie: Cookie) -> tuple[str, str, str]:
+    return cookie.domain, cookie.path, cookie.name
+
+
+def _cookie_values(cookie_jar: CookieJar) -> dict[tuple[str, str, str], tuple[str | None, int | None]]:
+    return {_cookie_key(cookie): (cookie.value, cookie.expires) for cookie in cookie_jar}
@@ -3,11 +3,131 @@
 # SPDX-License-Identifier: MIT
 #
 
+import atexit
 import os
+import threading
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+# buffered lines of files, which are appended to, are written at the end of a scenario, or when the buffer is full
+_max_buffered_chars = 1024 ** 2
+_append_buffers: dict[str, list[str]] = {}
+_buffered_chars: dict[str, int] = {}
+_append_lock = threading.Lock()
+# files, which are appended to, stay open until the process ends
+_append_files: dict[str, IO] = {}
+# validated file paths by file name and project root
+_project_files: dict[tuple[str, str], str] = {}
+
 
 def assert_file_is_in_project(file_name: str) -> str:
+    """ The real path of a file inside the project. Buffered lines of the file are written, so that it can be read. """
     file_path = os.path.realpath(file_name)
     project_root = os.path.realpath(os.environ.get("GAUGE_PROJECT_ROOT"))
     if not file_path.startswith(project_root):
         raise AssertionError(f"file must be inside {project_root}, but found in {file_path}")
+    flush_appended(file_path)
     return file_path
+
+
+def append_line(file_name: str, line: str) -> None:
+    """ Appends the line to a file inside the project. Lines are buffered until `flush_appended` is called. """
+    key = (file_name, os.environ.get("GAUGE_PROJECT_ROOT", ""))
+    file_path = _project_files.get(key)
+    if file_path is None:
+        file_path = assert_file_is_in_project(file_name)
+        _project_files[key] = file_path
+    with _append_lock:
+        _append_buffers.setdefault(file_path, []).append(f"{line}\n")
+        _buffered_chars[file_path] = _buffered_chars.get(file_path, 0) + len(line) + 1
+        if _buffered_chars[file_path] >= _max_buffered_chars:
+            _write_appended(file_path)
+
+
+def flush_appended(file_path: str | None = None) -> None:
+    """ Writes the buffered lines of the file, or of all files. """
+    if file_path is not None and file_path not in _append_buffers:
+        return
+    with _append_lock:
+        for path in [file_path] if file_path is not None else list(_append_buffers):
+            if path in _append_buffers:
+                _write_appended(path)
+
+
+def close_appended() -> None:
+    """ Writes the buffered lines of all files and closes them. """
+    flush_appended()
+    with _append_lock:
+        for f in _append_files.values():
+            f.close()
+        _append_files.clear()
+
+
+@contextmanager
+def locked_file(file_path: str) -> Iterator[None]:
+    """ Holds an exclusive lock on the file for parallel runners and threads.
+    The lock is taken on a separate `.lock` file, so that the file itself can be replaced while it is locked.
+    """
+    with open(f"{file_path}.lock", 'a+') as lock:
+        _lock(lock)
+        try:
+            yield
+        finally:
+            _unlock(lock)
+
+
+def _write_appended(file_path: str) -> None:
+    lines = _append_buffers.pop(file_path)
+    _buffered_chars.pop(file_path, None)
+    f = _append_file(file_path)
+    # parallel runners, that append to the same file, do not interleave their lines
+    _lock(f)
+    try:
+        f.write(''.join(lines))
+        f.flush()
+    finally:
+        _unlock(f)
+
+
+def _append_file(file_path: str) -> IO:
+    """ The open file, unless it has been removed or replaced since it was opened. """
+    f = _append_files.get(file_path)
+    if f is not None:
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(file_path)):
+                return f
+        except OSError:
+            pass
+        f.close()
+    f = open(file_path, 'a')
+    _append_files[file_path] = f
+    return f
+
+
+def _lock(f: IO) -> None:
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f: IO) -> None:
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+atexit.register(close_appended)
@@ -0,0 +1,159 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import mmap
+import os
+import tempfile
+from collections import deque
+
+from getgauge.python import data_store
+
+history_key = "_response_history"
+
+
+class _Entry:
+    """ A retained response. The history keeps its own copy of the response dict,
+    so that spilling the body does not change the responses of the scenario.
+    """
+
+    def __init__(self, response: dict):
+        self.response = {k: v for k, v in response.items() if k != "body_view"}
+        self.body_file: str | None = None
+        self.mappings: list[mmap.mmap] = []
+
+
+class ResponseHistory:
+    """ The last responses of a scenario and the responses, that have been saved by name.
+    When the bodies of the retained responses exceed the byte budget, the oldest bodies are moved into temporary files.
+    """
+
+    def __init__(self, max_responses: int, max_bytes: int):
+        self.max_responses = max(max_responses, 1)
+        self.max_bytes = max_bytes
+        self.responses: deque[_Entry] = deque()
+        self.saved: dict[str, _Entry] = {}
+        self._latest: dict | None = None
+
+    def add(self, response: dict) -> None:
+        entry = _Entry(response)
+        self.responses.append(entry)
+        self._latest = response
+        while len(self.responses) > self.max_responses:
+            self._release(self.responses.popleft())
+        self._spill(entry)
+
+    def save(self, name: str, response: dict) -> None:
+        if response is self._latest and self.responses:
+            entry = self.responses[-1]
+        else:
+            entry = _Entry(response)
+        replaced = self.saved.get(name)
+        self.saved[name] = entry
+        if replaced is not None and replaced is not entry:
+            self._release(replaced)
+        self._spill(entry)
+
+    def get(self, name: str) -> dict:
+        """ Returns a copy of a saved response with its body.
+        `~1` is the previous response, `~2` the one before, and so on.
+        Bodies in temporary files, that are larger than the property `body_mmap_threshold`, are memory-mapped instead of read.
+        """
+        if name.startswith('~') and name[1:].isdigit():
+            position = int(name[1:])
+            if position >= len(self.responses):
+                raise AssertionError(f"Only {len(self.responses)} responses are in the history, {name} is not available")
+            entry = self.responses[-1 - position]
+        elif name in self.saved:
+            entry = self.saved[name]
+        else:
+            raise AssertionError(f"No response has been saved as {name}. Saved responses: {', '.join(self.saved)}")
+        restored = dict(entry.response)
+        if entry.body_file is not None:
+            body = _load_body(entry.body_file)
+            if isinstance(body, mmap.mmap):
+                entry.mappings.append(body)
+            restored["body"] = body
+        return restored
+
+    def clear(self) -> None:
+        for entry in self._retained():
+            _remove_body_file(entry)
+        self.responses.clear()
+        self.saved.clear()
+        self._latest = None
+
+    def _retained(self) -> list[_Entry]:
+        """ All retained entries, oldest first. """
+        retained = list(self.responses)
+        retained.extend(e for e in self.saved.values() if not _contains(retained, e))
+        return retained
+
+    def _release(self, entry: _Entry) -> None:
+        if not _contains(self._retained(), entry):
+            _remove_body_file(entry)
+
+    def _spill(self, current: _Entry) -> None:
+        in_memory = [e for e in self._retained() if e is not current and isinstance(e.response.get("body"), bytes)]
+        in_memory_bytes = sum(len(e.response["body"]) for e in in_memory)
+        for entry in in_memory:
+            if in_memory_bytes <= self.max_bytes:
+                break
+            fd, entry.body_file = tempfile.mkstemp(prefix="gauge-api-steps-", suffix=".body")
+            with os.fdopen(fd, 'wb') as b:
+                b.write(entry.response["body"])
+            in_memory_bytes -= len(entry.response.pop("body"))
+
+
+def remember_response(response: dict) -> None:
+    """ Adds the response to the history of the scenario. """
+    _response_history().add(response)
+
+
+def save_response_as(name: str, response: dict) -> None:
+    _response_history().save(name, response)
+
+
+def saved_response(name: str) -> dict:
+    return _response_history().get(name)
+
+
+def clear_response_history() -> None:
+    """ Removes the temporary files of the scenario. """
+    history: ResponseHistory | None = data_store.scenario.pop(history_key, None)
+    if history is not None:
+        history.clear()
+
+
+def _response_history() -> ResponseHistory:
+    history = data_store.scenario.get(history_key)
+    if history is None:
+        history = ResponseHistory(
+            int(os.environ.get("response_history_size", "10")),
+            int(os.environ.get("response_history_bytes", str(50 * 1024 ** 2)))
+        )
+        data_store.scenario[history_key] = history
+    return history
+
+
+def _contains(entries: list[_Entry], entry: _Entry) -> bool:
+    return any(e is entry for e in entries)
+
+
+def _load_body(body_file: str) -> bytes | mmap.mmap:
+    with open(body_file, 'rb') as b:
+        if os.fstat(b.fileno()).st_size <= int(os.environ.get("body_mmap_threshold", str(1024 ** 2))):
+            return b.read()
+        # the mapping stays valid, when the file is closed
+        return mmap.mmap(b.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _remove_body_file(entry: _Entry) -> None:
+    # a file cannot be removed on Windows, while it is mapped
+    for mapping in entry.mappings:
+        mapping.close()
+    entry.mappings.clear()
+    if entry.body_file is not None and os.path.exists(entry.body_file):
+        os.remove(entry.body_file)
+    entry.body_file = None
@@ -0,0 +1,75 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+from collections import OrderedDict
+from urllib.request import BaseHandler, Request
+
+# cached GET responses of the runner process by URL and credentials, least recently used first
+_entries: OrderedDict[tuple[str, str | None], tuple[list[tuple[str, str]], bytes]] = OrderedDict()
+
+
+class ConditionalRequestHandler(BaseHandler):
+    """ Adds If-None-Match and If-Modified-Since headers to GET requests, for which a response has been cached. """
+
+    def http_request(self, req: Request) -> Request:
+        if not http_cache_enabled() or req.get_method() != "GET":
+            return req
+        if req.has_header("If-none-match") or req.has_header("If-modified-since"):
+            return req
+        entry = _entries.get(_cache_key(req))
+        if entry is None:
+            return req
+        validators = _validators(entry[0])
+        if "etag" in validators:
+            req.add_unredirected_header("If-None-Match", validators["etag"])
+        if "last-modified" in validators:
+            req.add_unredirected_header("If-Modified-Since", validators["last-modified"])
+        return req
+
+    https_request = http_request
+
+
+def http_cache_enabled() -> bool:
+    return os.environ.get("http_cache", "false").strip().lower() in ("true", "1")
+
+
+def cache_response(req: Request, headers: list[tuple[str, str]], body: bytes) -> None:
+    """ Caches a response, if it has an ETag or Last-Modified header.
+    Responses to requests with different Authorization headers are cached separately.
+    """
+    if len(_validators(headers)) == 0:
+        return
+    key = _cache_key(req)
+    _entries[key] = (headers, body)
+    _entries.move_to_end(key)
+    max_entries = int(os.environ.get("http_cache_size", "256"))
+    while len(_entries) > max_entries:
+        _entries.popitem(last=False)
+
+
+def cached_response(req: Request, not_modified_headers: list[tuple[str, str]]) -> tuple[list[tuple[str, str]], bytes] | None:
+    """ Returns headers and body of the cached response for a 304 Not Modified response.
+    The cached headers are updated with the headers of the 304 response.
+    """
+    key = _cache_key(req)
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    _entries.move_to_end(key)
+    cached_headers, body = entry
+    updated_names = {name.lower() for name, _ in not_modified_headers}
+    headers = [(name, value) for name, value in cached_headers if name.lower() not in updated_names]
+    headers.extend(not_modified_headers)
+    _entries[key] = (headers, body)
+    return headers, body
+
+
+def _cache_key(req: Request) -> tuple[str, str | None]:
+    return req.full_url, req.get_header("Authorization")
+
+
+def _validators(headers: list[tuple[str, str]]) -> dict[str, str]:
+    return {name.lower(): value for name, value in headers if name.lower() in ("etag", "last-modified")}
@@ -0,0 +1,183 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import atexit
+import json
+import os
+import re
+import threading
+from datetime import UTC, datetime
+from http.client import responses
+from queue import Full, Queue
+
+from .file_util import assert_file_is_in_project
+from .reporting import mask_secrets
+
+_writer: "_TraceWriter | None" = None
+_writer_lock = threading.Lock()
+_redacted = "********"
+_default_redacted_headers = "Authorization,Proxy-Authorization,Cookie,Set-Cookie"
+
+
+class _TraceWriter(threading.Thread):
+    """ Writes trace entries from a bounded queue in the background, so that tracing does not delay the steps.
+    Entries are written as newline-delimited JSON as they come.
+    For HAR files, they are written to a newline-delimited JSON file next to it, which is converted when the writer is closed.
+    """
+
+    def __init__(self, trace_file: str, max_queue_size: int):
+        super().__init__(name="gauge-api-steps-trace", daemon=True)
+        self.trace_file = trace_file
+        self.har = trace_file.lower().endswith(".har")
+        self.entries_file = f"{trace_file}.ndjson" if self.har else trace_file
+        self.queue: Queue[dict | None] = Queue(max_queue_size)
+        self.dropped = 0
+
+    def submit(self, entry: dict) -> None:
+        try:
+            self.queue.put_nowait(entry)
+        except Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        with open(self.entries_file, 'w' if self.har else 'a') as t:
+            while (entry := self.queue.get()) is not None:
+                t.write(json.dumps(entry, separators=(',', ':')))
+                t.write('\n')
+                if self.queue.empty():
+                    t.flush()
+        if self.har:
+            _write_har(self.entries_file, self.trace_file)
+            os.remove(self.entries_file)
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.join()
+
+
+def trace_enabled() -> bool:
+    return bool(os.environ.get("trace_file"))
+
+
+def trace_request(entry: dict) -> None:
+    """ Queues an entry for the trace file. The entry is dropped, if the queue is full. """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                trace_file = _trace_file()
+                os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+                writer = _TraceWriter(trace_file, int(os.environ.get("trace_queue_size", "10000")))
+                writer.start()
+                atexit.register(close_trace)
+                _writer = writer
+    _writer.submit(entry)
+
+
+def trace_entry(
+        started: float, method: str, url: str, request_headers: dict[str, str], request_size: int,
+        status: int, reason: str, response_headers: list[tuple[str, str]], response_size: int,
+        timings: dict[str, float], redirects: dict[str, int], from_cache: bool) -> dict:
+    """ The entry for the trace. Credential headers are redacted, other secrets are masked. """
+    redacted_headers = _redacted_headers()
+    return {
+        "started": datetime.fromtimestamp(started, UTC).isoformat(),
+        "method": method,
+        "url": mask_secrets(url),
+        "request_headers": [_trace_header(name, value, redacted_headers) for name, value in request_headers.items()],
+        "request_size": request_size,
+        "status": status,
+        "reason": reason,
+        "response_headers": [_trace_header(name, value, redacted_headers) for name, value in response_headers],
+        "response_size": response_size,
+        "timings": timings,
+        "redirects": redirects,
+        "from_cache": from_cache,
+    }
+
+
+def close_trace() -> int:
+    """ Writes all queued entries and closes the trace file. Returns the number of dropped entries. """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is None:
+        return 0
+    writer.close()
+    return writer.dropped
+
+
+def _redacted_headers() -> frozenset[str]:
+    names = os.environ.get("trace_redacted_headers", _default_redacted_headers)
+    return frozenset(name.lower() for name in re.split(r'[\s,;]+', names) if name)
+
+
+def _trace_header(name: str, value: str, redacted_headers: frozenset[str]) -> tuple[str, str]:
+    return (name, _redacted if name.lower() in redacted_headers else mask_secrets(value))
+
+
+def _trace_file() -> str:
+    trace_file = assert_file_is_in_project(os.environ["trace_file"])
+    (root, ext) = os.path.splitext(trace_file)
+    if ext.lower() == ".har":
+        # parallel runners cannot share a HAR file, so each process writes its own
+        return f"{root}-{os.getpid()}{ext}"
+    return trace_file
+
+
+def _write_har(entries_file: str, har_file: str) -> None:
+    """ Converts the entries one by one, so that they are never loaded at once. """
+    creator = json.dumps({"name": "gauge-api-steps", "version": "1"})
+    tmp = f"{har_file}.tmp"
+    with open(entries_file) as entries, open(tmp, 'w') as h:
+        h.write(f'{{"log": {{"version": "1.2", "creator": {creator}, "entries": [')
+        for i, line in enumerate(entries):
+            if i > 0:
+                h.write(',')
+            h.write(json.dumps(_har_entry(json.loads(line))))
+        h.write(']}}')
+    os.replace(tmp, har_file)
+
+
+def _har_entry(entry: dict) -> dict:
+    timings = entry["timings"]
+    content_type = next((value for name, value in entry["response_headers"] if name.lower() == "content-type"), "")
+    location = next((value for name, value in entry["response_headers"] if name.lower() == "location"), "")
+    return {
+        "startedDateTime": entry["started"],
+        "time": timings.get("total", 0.0),
+        "request": {
+            "method": entry["method"],
+            "url": entry["url"],
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": [{"name": name, "value": value} for name, value in entry["request_headers"]],
+            "queryString": [],
+            "headersSize": -1,
+            "bodySize": entry["request_size"],
+        },
+        "response": {
+            "status": entry["status"],
+            "statusText": entry["reason"] or responses.get(entry["status"], ""),
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": [{"name": name, "value": value} for name, value in entry["response_headers"]],
+            "content": {"size": entry["response_size"], "mimeType": content_type},
+            "redirectURL": location,
+            "headersSize": -1,
+            "bodySize": entry["response_size"],
+        },
+        "cache": {},
+        "timings": {
+            "dns": timings.get("dns", -1),
+            # the connect time of HAR includes the TLS handshake
+            "connect": timings["connect"] + timings.get("tls", 0.0) if "connect" in timings else -1,
+            "ssl": timings.get("tls", -1),
+            "send": 0,
+            "wait": timings.get("ttfb", 0.0),
+            "receive": timings.get("download", 0.0),
+        },
+        "comment": json.dumps({"redirects": entry["redirects"], "from_cache": entry["from_cache"]}),
+    }
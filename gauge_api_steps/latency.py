@@ -0,0 +1,90 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import math
+from bisect import bisect_left
+
+from getgauge.python import data_store
+
+latencies_key = "_latencies"
+
+# latencies of the whole run in this runner process, by request template
+_run_latencies: dict[str, list[float]] = {}
+
+# upper bounds of the histogram buckets in milliseconds
+_histogram_bounds = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def record_latency(request_template: str, millis: float) -> None:
+    """ Records the latency of a request for the scenario and for the whole run.
+    The request template is the method and the URL before placeholder substitution, f.i. `GET ${base_url}/users/${id}`,
+    so that calls to the same endpoint are grouped together.
+    """
+    data_store.scenario.setdefault(latencies_key, {}).setdefault(request_template, []).append(millis)
+    _run_latencies.setdefault(request_template, []).append(millis)
+
+
+def scenario_latencies() -> dict[str, list[float]]:
+    return data_store.scenario.get(latencies_key, {})
+
+
+def run_latencies() -> dict[str, list[float]]:
+    return _run_latencies
+
+
+def latency_summary(latencies: dict[str, list[float]]) -> str:
+    lines = ["Latency summary (ms):"]
+    for request_template, values in sorted(latencies.items()):
+        ordered = sorted(values)
+        lines.append(
+            f"    {request_template}: n={len(ordered)}"
+            f" p50={percentile(ordered, 50):.1f}"
+            f" p95={percentile(ordered, 95):.1f}"
+            f" p99={percentile(ordered, 99):.1f}"
+            f" max={ordered[-1]:.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """ Nearest-rank percentile of values, that are sorted in ascending order. """
+    if len(ordered) == 0:
+        return 0.0
+    rank = math.ceil(p / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def latency_stats(latencies: list[float], errors: int, elapsed_seconds: float) -> dict[str, float]:
+    """ Statistics of a load test. Latencies are in milliseconds. """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors * 100 / count if count > 0 else 0.0,
+        "throughput": count / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+        "min": ordered[0] if count > 0 else 0.0,
+        "mean": sum(ordered) / count if count > 0 else 0.0,
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if count > 0 else 0.0,
+    }
+
+
+def latency_histogram(latencies: list[float], width: int = 40) -> str:
+    counts = [0] * (len(_histogram_bounds) + 1)
+    for millis in latencies:
+        counts[bisect_left(_histogram_bounds, millis)] += 1
+    largest = max(counts) if len(latencies) > 0 else 1
+    labels = [f"<= {bound} ms" for bound in _histogram_bounds] + [f"> {_histogram_bounds[-1]} ms"]
+    lines = []
+    for label, count in zip(labels, counts):
+        if count == 0:
+            continue
+        bar = '#' * max(round(count * width / largest), 1)
+        lines.append(f"    {label:>11} {count:>7} {bar}")
+    return '\n'.join(lines)
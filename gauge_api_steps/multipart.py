@@ -0,0 +1,83 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import hashlib
+import mimetypes
+import os
+import uuid
+from collections.abc import Iterator
+
+_chunk_size = 64 * 1024
+
+
+class MultipartBody:
+    """ A multipart/form-data request body.
+    Files are read in chunks while the body is sent, so they are never loaded into memory.
+    The body can be iterated several times and its length is known in advance, so it is sent with a Content-Length header.
+    Parts are (name, value, None) for form fields and (name, None, file path) for files.
+    """
+
+    def __init__(self, parts: list[tuple[str, str | None, str | None]], boundary: str | None = None):
+        self.parts = parts
+        self.boundary = boundary or f"gauge-api-steps-{uuid.uuid4().hex}"
+        # bytes are sent as they are, strings are paths of files to be sent
+        self._segments: list[bytes | str] = []
+        for name, value, file_path in parts:
+            if file_path is None:
+                self._segments.append(self._part_head(name) + value.encode() + b'\r\n')
+                continue
+            file_name = os.path.basename(file_path)
+            content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            self._segments.append(self._part_head(name, file_name, content_type))
+            self._segments.append(file_path)
+            self._segments.append(b'\r\n')
+        self._segments.append(f"--{self.boundary}--\r\n".encode())
+        self.content_length = sum(len(s) if isinstance(s, bytes) else os.path.getsize(s) for s in self._segments)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def digest(self) -> str:
+        """ A hash of the content, that does not depend on the random boundary. """
+        sha256 = hashlib.sha256()
+        for chunk in MultipartBody(self.parts, boundary="gauge-api-steps"):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def __iter__(self) -> Iterator[bytes]:
+        for segment in self._segments:
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            with open(segment, 'rb') as f:
+                while chunk := f.read(_chunk_size):
+                    yield chunk
+
+    def __len__(self) -> int:
+        return self.content_length
+
+    def __str__(self) -> str:
+        lines = [self.content_type]
+        for name, value, file_path in self.parts:
+            if file_path is None:
+                lines.append(f"{name}: {value}")
+            else:
+                lines.append(f"{name}: {file_path} ({os.path.getsize(file_path)} bytes)")
+        return '\n'.join(lines)
+
+    def _part_head(self, name: str, file_name: str | None = None, content_type: str | None = None) -> bytes:
+        disposition = f'form-data; name="{_quote(name)}"'
+        if file_name is not None:
+            disposition += f'; filename="{_quote(file_name)}"'
+        head = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type is not None:
+            head += f"Content-Type: {content_type}\r\n"
+        return f"{head}\r\n".encode()
+
+
+def _quote(value: str) -> str:
+    # like browsers do it for form-data
+    return value.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
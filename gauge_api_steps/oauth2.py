@@ -0,0 +1,135 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from urllib.parse import quote, urlencode
+from urllib.request import Request
+
+from .file_util import locked_file
+
+# tokens of this process by (token url, client id, scope): (access token, expiry as epoch seconds)
+_tokens: dict[tuple[str, str, str], tuple[str, float]] = {}
+_refresh_locks: dict[tuple[str, str, str], threading.Lock] = {}
+_refresh_locks_lock = threading.Lock()
+_token_fields = ("access_token", "refresh_token", "id_token")
+
+
+def token_cache_file() -> str:
+    """ The property `oauth2_token_cache`, or a file in the cache directory of the user.
+    Tokens are secrets, so they are not placed inside the project by default.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get("oauth2_token_cache") or os.path.join(cache_dir, "gauge-api-steps", "oauth2.tokens")
+
+
+def client_credentials_token(
+        token_url: str, cache_file: str, send: Callable[[Request], tuple[int, bytes]]) -> tuple[str, float]:
+    """ An access token of the OAuth2 client credentials grant and its expiry as epoch seconds.
+    The token request is sent with the given function, that returns status and body of the response.
+    Tokens are reused until shortly before they expire. They are shared with other runners through the cache file.
+    Only one thread of all runners requests a new token, the others wait for it.
+    """
+    client_id = os.environ.get("oauth2_client_id")
+    client_secret = os.environ.get("oauth2_client_secret")
+    if not client_id or not client_secret:
+        raise AssertionError("The properties oauth2_client_id and oauth2_client_secret must be set")
+    scope = os.environ.get("oauth2_scope", "")
+    key = (token_url, client_id, scope)
+    token = _tokens.get(key)
+    if _is_valid(token):
+        return token
+    with _refresh_lock(key):
+        token = _tokens.get(key)
+        if _is_valid(token):
+            return token
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        with locked_file(cache_file):
+            cache = _read_cache(cache_file)
+            cache_id = _cache_id(key)
+            cached = cache.get(cache_id)
+            token = (cached["access_token"], cached["expires_at"]) if cached is not None else None
+            if not _is_valid(token):
+                token = _request_token(token_url, client_id, client_secret, scope, send)
+                cache = {k: v for k, v in cache.items() if v["expires_at"] > time.time()}
+                cache[cache_id] = {"access_token": token[0], "expires_at": token[1]}
+                _write_cache(cache_file, cache)
+        _tokens[key] = token
+    return token
+
+
+def mask_tokens(body: bytes) -> bytes:
+    """ The body of a token response with masked tokens, so that it can be written into a file. """
+    try:
+        content = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(content, dict):
+        return body
+    return json.dumps({name: "********" if name in _token_fields else value for name, value in content.items()}).encode()
+
+
+def _is_valid(token: tuple[str, float] | None) -> bool:
+    margin = float(os.environ.get("oauth2_expiry_margin", "30"))
+    return token is not None and token[1] - margin > time.time()
+
+
+def _refresh_lock(key: tuple[str, str, str]) -> threading.Lock:
+    with _refresh_locks_lock:
+        return _refresh_locks.setdefault(key, threading.Lock())
+
+
+def _cache_id(key: tuple[str, str, str]) -> str:
+    # the client id does not appear in the file
+    return hashlib.sha256('\n'.join(key).encode()).hexdigest()
+
+
+def _request_token(
+        token_url: str, client_id: str, client_secret: str, scope: str,
+        send: Callable[[Request], tuple[int, bytes]]) -> tuple[str, float]:
+    form = {"grant_type": "client_credentials"}
+    if scope:
+        form["scope"] = scope
+    credentials = base64.b64encode(f"{quote(client_id, safe='')}:{quote(client_secret, safe='')}".encode()).decode()
+    req = Request(token_url, method="POST", data=urlencode(form).encode(), headers={
+        "Authorization": f"Basic {credentials}",
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Accept": "application/json",
+    })
+    requested = time.time()
+    (status, body) = send(req)
+    if status >= 400:
+        raise AssertionError(
+            f"OAuth2 token request to {token_url} failed with status {status}: {body.decode(errors='replace')}"
+        )
+    content = json.loads(body)
+    if "access_token" not in content:
+        raise AssertionError(f"OAuth2 token response of {token_url} does not contain an access_token")
+    # without expires_in, the token is only used once
+    expires_in = float(content.get("expires_in", 0))
+    return content["access_token"], requested + expires_in
+
+
+def _read_cache(cache_file: str) -> dict[str, dict]:
+    if not os.path.exists(cache_file):
+        return {}
+    with open(cache_file) as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def _write_cache(cache_file: str, cache: dict[str, dict]) -> None:
+    tmp = f"{cache_file}.tmp"
+    # the tokens are secrets
+    with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, cache_file)
@@ -0,0 +1,114 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import tracemalloc
+from collections.abc import Callable
+from time import perf_counter
+
+# cumulative timings of the runner process by name: [calls, total seconds, max seconds]
+_timings: dict[str, list[float]] = {}
+_enabled = False
+_profiler: cProfile.Profile | None = None
+_snapshot: tracemalloc.Snapshot | None = None
+_step_start = 0.0
+
+
+def profiled(func: Callable) -> Callable:
+    """ Records the time of each call of the function, when profiling is enabled with the property `profile_steps`. """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_timing(name, perf_counter() - start)
+    return wrapper
+
+
+def record_timing(name: str, seconds: float) -> None:
+    timing = _timings.setdefault(name, [0, 0.0, 0.0])
+    timing[0] += 1
+    timing[1] += seconds
+    timing[2] = max(timing[2], seconds)
+
+
+def start_profiling() -> None:
+    """ Reads the profiling properties and starts cProfile and tracemalloc for the scenario, if configured. """
+    global _enabled, _profiler, _snapshot
+    _enabled = _is_true("profile_steps")
+    if _enabled and _is_true("profile_cprofile"):
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if _enabled and _is_true("profile_tracemalloc"):
+        tracemalloc.start()
+        _snapshot = tracemalloc.take_snapshot()
+
+
+def stop_profiling(limit: int = 15) -> list[str]:
+    """ Stops cProfile and tracemalloc for the scenario and returns their reports. """
+    global _profiler, _snapshot
+    reports = []
+    if _profiler is not None:
+        _profiler.disable()
+        stream = io.StringIO()
+        pstats.Stats(_profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        reports.append(f"cProfile of the scenario:\n{stream.getvalue().strip()}")
+        _profiler = None
+    if _snapshot is not None:
+        differences = tracemalloc.take_snapshot().compare_to(_snapshot, "lineno")[0:limit]
+        tracemalloc.stop()
+        reports.append("Memory allocations of the scenario:\n" + '\n'.join(f"    {d}" for d in differences))
+        _snapshot = None
+    return reports
+
+
+def step_started() -> None:
+    global _step_start
+    _step_start = perf_counter()
+
+
+def step_finished(step_text: str) -> None:
+    if _enabled:
+        record_timing(f"step: {step_text}", perf_counter() - _step_start)
+
+
+def profiling_enabled() -> bool:
+    return _enabled
+
+
+def hot_spot_table(limit: int = 20) -> str:
+    """ The recorded timings as table, ranked by total time. """
+    ranked = sorted(_timings.items(), key=lambda item: item[1][1], reverse=True)[0:limit]
+    width = max((len(name) for name, _ in ranked), default=4)
+    lines = [f"Profile hot spots (ms):\n    {'name':<{width}} {'calls':>8} {'total':>10} {'mean':>10} {'max':>10}"]
+    for name, (calls, total, maximum) in ranked:
+        lines.append(
+            f"    {name:<{width}} {calls:>8} {total * 1000:>10.2f} {total * 1000 / calls:>10.3f} {maximum * 1000:>10.3f}"
+        )
+    return '\n'.join(lines)
+
+
+def write_profile_report(file_path: str) -> None:
+    report = {
+        name: {"calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls, "max_ms": maximum * 1000}
+        for name, (calls, total, maximum) in sorted(_timings.items(), key=lambda item: item[1][1], reverse=True)
+    }
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w') as r:
+        json.dump(report, r, indent=4)
+
+
+def _is_true(prop: str) -> bool:
+    return os.environ.get(prop, "false").strip().lower() in ("true", "1")
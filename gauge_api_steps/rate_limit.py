@@ -0,0 +1,121 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import re
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from .file_util import locked_file
+from .transport import retry_after_seconds
+
+_rate_pattern = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(s|sec|m|min|h)\s*$', re.IGNORECASE)
+_rate_units = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600}
+# after a 429, the rate is halved, but not below this fraction of the configured rate
+_min_rate_fraction = 1 / 32
+# each successful response increases a reduced rate by this fraction of the configured rate
+_rate_increase_fraction = 1 / 100
+# a reduced rate is forgotten, when the host has not been used for this many seconds
+_idle_reset_seconds = 60
+
+# the current rates of hosts, as last seen in the state file
+_current_rates: dict[str, float] = {}
+
+
+def host_rate_limit(url: str) -> tuple[str, float] | None:
+    """ The host and its maximum number of requests per second from the property `rate_limit.<host>`,
+    f.i. `rate_limit.api.example.com = 50/s`. A port can be part of the host.
+    """
+    parts = urlsplit(url)
+    for host in (parts.netloc.rpartition('@')[2], parts.hostname):
+        value = os.environ.get(f"rate_limit.{host}")
+        if value:
+            return host, _parse_rate(value)
+    return None
+
+
+def acquire_rate_limit(url: str) -> float:
+    """ Waits until a request to the host of the URL is allowed by its rate limit. Returns the seconds waited.
+    The token bucket is kept as the theoretical arrival time of the next request (GCRA) in a state file, that all runners share.
+    The bucket holds one second of requests at the current rate, so short bursts are allowed.
+    """
+    limit = host_rate_limit(url)
+    if limit is None:
+        return 0.0
+    host, max_rate = limit
+    with locked_file(_state_file()):
+        state = _read_state()
+        now = time.time()
+        bucket = state.get(host)
+        if bucket is None or now - bucket["tat"] > _idle_reset_seconds:
+            bucket = {"tat": now, "rate": max_rate}
+        rate = min(bucket["rate"], max_rate)
+        burst_tolerance = (max(rate, 1.0) - 1) / rate
+        tat = max(bucket["tat"], now)
+        send_at = max(now, tat - burst_tolerance)
+        state[host] = {"tat": tat + 1 / rate, "rate": rate}
+        _write_state(state)
+    _current_rates[host] = rate
+    wait = send_at - now
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+def adapt_rate(url: str, status: int | None, headers: list[tuple[str, str]]) -> None:
+    """ Adapts the rate of the host to the response, additive increase and multiplicative decrease.
+    A 429 halves the rate and pauses all requests to the host for the time of its Retry-After header.
+    """
+    limit = host_rate_limit(url)
+    if limit is None:
+        return
+    host, max_rate = limit
+    if status != 429 and _current_rates.get(host, max_rate) >= max_rate:
+        return
+    with locked_file(_state_file()):
+        state = _read_state()
+        now = time.time()
+        bucket = state.get(host, {"tat": now, "rate": max_rate})
+        if status == 429:
+            rate = max(bucket["rate"] / 2, max_rate * _min_rate_fraction)
+            retry_after = next((retry_after_seconds(value) for name, value in headers if name.lower() == "retry-after"), None)
+            # the first request after the pause is sent at its end, the following ones at the reduced rate
+            burst_tolerance = (max(rate, 1.0) - 1) / rate
+            tat = max(bucket["tat"], now + (retry_after or 0) + burst_tolerance)
+        else:
+            rate = min(bucket["rate"] + max_rate * _rate_increase_fraction, max_rate)
+            tat = bucket["tat"]
+        state[host] = {"tat": tat, "rate": rate}
+        _write_state(state)
+    _current_rates[host] = rate
+
+
+def _parse_rate(value: str) -> float:
+    match = _rate_pattern.match(value)
+    if match is None or float(match.group(1)) <= 0:
+        raise ValueError(f"rate limits must look like 50/s, 100/min or 1000/h, not {value}")
+    return float(match.group(1)) / _rate_units[match.group(2).lower()]
+
+
+def _state_file() -> str:
+    """ Rate limits belong to hosts, so by default all projects of a machine share the state. """
+    return os.environ.get("rate_limit_state_file") or os.path.join(tempfile.gettempdir(), "gauge-api-steps-rate-limits.json")
+
+
+def _read_state() -> dict[str, dict[str, float]]:
+    try:
+        with open(_state_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(state: dict[str, dict[str, float]]) -> None:
+    tmp = f"{_state_file()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, _state_file())
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 #
 
+import functools
 import os
 import re
 
@@ -10,6 +11,12 @@ from http.client import HTTPResponse, responses
 from getgauge.python import Messages
 from urllib.error import HTTPError
 from urllib.request import Request
+from .body import ResponseBody
+from .profiling import profiled
+
+
+# messages of the running step, that are reported together when the step has finished. None outside of steps.
+_step_messages: list[str] | None = None
 
 
 def report_request_info(req: Request) -> None:
@@ -21,11 +28,12 @@ def report_request_info(req: Request) -> None:
         print_and_report(f"> {header_name}: {header_value}")
     if req.data is not None:
         print_and_report(">")
-        print_and_report(f"> {req.data.decode('unicode_escape')}")
+        body_text = req.data.decode('unicode_escape') if isinstance(req.data, bytes) else str(req.data)
+        print_and_report(f"> {body_text}")
     print_and_report(">")
 
 
-def report_response_info(resp: HTTPResponse|HTTPError, resp_body: bytes) -> None:
+def report_response_info(resp: HTTPResponse|HTTPError, resp_body: bytes|ResponseBody) -> None:
     do_report = os.environ.get('report_response', 'false').strip().lower() in ('true', '1')
     if not do_report:
         return
@@ -38,11 +46,34 @@ def report_response_info(resp: HTTPResponse|HTTPError, resp_body: bytes) -> None
         print_and_report(f"< {header_name}: {header_value}")
     if len(resp_body) > 0:
         print_and_report("<")
-        print_and_report(f"< {resp_body.decode('unicode_escape')}")
+        body_text = resp_body.preview(None) if isinstance(resp_body, ResponseBody) else resp_body.decode('unicode_escape')
+        print_and_report(f"< {body_text}")
     print_and_report("<")
 
 
+def start_step_report() -> None:
+    """ Collects the messages of a step, instead of reporting them one by one. """
+    global _step_messages
+    _step_messages = []
+
+
+def flush_step_report() -> None:
+    """ Reports the collected messages of a step as one console output and one report message. """
+    global _step_messages
+    messages, _step_messages = _step_messages, None
+    if messages:
+        _print_and_report('\n'.join(messages))
+
+
+@profiled
 def print_and_report(message: str) -> None:
+    if _step_messages is not None:
+        _step_messages.append(message)
+        return
+    _print_and_report(message)
+
+
+def _print_and_report(message: str) -> None:
     masked_message = mask_secrets(message)
     replace_whitespace = os.environ.get("replace_whitespace_in_console")
     console_message = masked_message
@@ -65,11 +96,13 @@ def mask_secrets(message: str) -> str:
     if not mask_secrets_prop:
         return message
     secret_props = re.split(r'[\s,;]+', mask_secrets_prop)
-    secret_values = []
-    for prop in secret_props:
-        value = os.environ.get(prop)
-        if value is not None:
-            secret_values.append(value)
-    for sv in secret_values:
-        message = message.replace(sv, '********')
-    return message
+    secret_values = tuple(os.environ.get(prop) for prop in secret_props if os.environ.get(prop))
+    if len(secret_values) == 0:
+        return message
+    return _secrets_pattern(secret_values).sub('********', message)
+
+
+@functools.lru_cache(maxsize=16)
+def _secrets_pattern(secret_values: tuple[str, ...]) -> re.Pattern:
+    # longer secrets first, so that a secret containing another one is masked completely
+    return re.compile('|'.join(re.escape(value) for value in sorted(set(secret_values), key=len, reverse=True)))
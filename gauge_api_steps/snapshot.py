@@ -0,0 +1,103 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import copy
+import functools
+import hashlib
+import json
+import os
+import re
+from typing import Any
+
+from jsonpath_ng import JSONPath
+from jsonpath_ng.ext import parse as parse_json_path
+
+from .file_util import assert_file_is_in_project
+
+ignored_value = "<ignored>"
+
+
+def normalize_snapshot(value: Any) -> Any:
+    """ A copy of the JSON value, in which the values at the paths of the property `snapshot_ignore_paths` are replaced. """
+    expressions = _ignore_path_expressions(os.environ.get("snapshot_ignore_paths", ""))
+    if len(expressions) == 0:
+        return value
+    value = copy.deepcopy(value)
+    for expression in expressions:
+        value = expression.update(value, ignored_value)
+    return value
+
+
+def compare_snapshot(name: str, value: Any) -> tuple[str, Any]:
+    """ Compares the normalized JSON value with the snapshot of the given name.
+    Returns `matched`, `written`, `missing` or `mismatch` together with the value of the snapshot.
+    The hash of the canonical form is compared first, the snapshot itself is only loaded, if the hashes differ,
+    or if the snapshot has been changed since the hash was stored.
+    Snapshots are only written with the property `snapshot_update`.
+    """
+    snapshot_file, hash_file = _snapshot_files(name)
+    digest = hashlib.sha256(_canonical_json(value).encode()).hexdigest()
+    update = os.environ.get("snapshot_update", "false").lower() in ("true", "1")
+    if update:
+        _write_snapshot(snapshot_file, hash_file, value, digest)
+        return "written", value
+    if not os.path.exists(snapshot_file):
+        return "missing", None
+    if _stored_hash(snapshot_file, hash_file) == digest:
+        return "matched", value
+    with open(snapshot_file) as s:
+        expected = json.load(s)
+    if expected != value:
+        return "mismatch", expected
+    # the snapshot has been edited, or the hash file is missing
+    _write_hash(snapshot_file, hash_file, digest)
+    return "matched", value
+
+
+@functools.lru_cache(maxsize=16)
+def _ignore_path_expressions(ignore_paths: str) -> list[JSONPath]:
+    return [parse_json_path(path) for path in re.split(r'\s*,\s*', ignore_paths.strip()) if path]
+
+
+def _snapshot_files(name: str) -> tuple[str, str]:
+    snapshot_dir = os.environ.get("snapshot_dir", "snapshots")
+    snapshot_file = assert_file_is_in_project(os.path.join(snapshot_dir, f"{name}.json"))
+    return snapshot_file, f"{snapshot_file[0:-len('.json')]}.sha256"
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _write_snapshot(snapshot_file: str, hash_file: str, value: Any, digest: str) -> None:
+    os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+    _write_file(snapshot_file, json.dumps(value, indent=4, sort_keys=True, ensure_ascii=False) + '\n')
+    _write_hash(snapshot_file, hash_file, digest)
+
+
+def _write_hash(snapshot_file: str, hash_file: str, digest: str) -> None:
+    """ The hash is stored together with the modification time and size of the snapshot, that it belongs to. """
+    stat = os.stat(snapshot_file)
+    _write_file(hash_file, f"{digest} {stat.st_mtime_ns} {stat.st_size}\n")
+
+
+def _stored_hash(snapshot_file: str, hash_file: str) -> str | None:
+    """ The stored hash, if the snapshot has not been changed since. """
+    if not os.path.exists(hash_file):
+        return None
+    with open(hash_file) as h:
+        fields = h.read().split()
+    stat = os.stat(snapshot_file)
+    if len(fields) != 3 or fields[1:] != [str(stat.st_mtime_ns), str(stat.st_size)]:
+        return None
+    return fields[0]
+
+
+def _write_file(file_path: str, content: str) -> None:
+    # parallel runners may write the same snapshot
+    tmp = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(content)
+    os.replace(tmp, file_path)
@@ -4,21 +4,37 @@
 #
 
 import base64
+import itertools
 import json
 import numexpr
 import os
+import random
+import re
+import string
 import uuid
 
+from collections.abc import Callable, Iterable
 from datetime import datetime
 from getgauge.python import data_store
 from numpy import array2string
 from string import Template
-from typing import Callable
 from urllib import parse as urlcodec
 from .file_util import assert_file_is_in_project
+from .profiling import profiled
 from .session import session_properties
 
 
+_braces = re.compile(r'[{}]')
+_index_placeholder = "{index}"
+_random_characters = string.ascii_letters + string.digits
+# random bytes are mapped to the characters,
+# bytes above the last multiple of their number would make some characters more likely
+_random_table = bytes(ord(_random_characters[b % len(_random_characters)]) for b in range(256))
+_biased_bytes = bytes(range(256 - 256 % len(_random_characters), 256))
+_random = random.Random()
+
+
+@profiled
 def substitute(gauge_param: str) -> str:
     """Substitutes placeholders in a step parameter with values from environment variables
     and evaluates mathematical expressions.
@@ -49,19 +65,43 @@ def substitute(gauge_param: str) -> str:
     return substituted
 
 
+def seed_random() -> None:
+    """ Starts the random values of a scenario with the property `random_seed`, so that generated payloads can be reproduced.
+    Without the property, the values differ in every run.
+    """
+    seed = os.environ.get("random_seed")
+    _random.seed(seed if seed else None)
+
+
 def _substitute_expressions(marker_char: str, text: str, evaluator: Callable[[str], str]) -> str:
-    substituted = text
-    while True:
-        start = substituted.find(marker_char + '{')
-        end = substituted.find('}', start)
-        if start < 0 or end < 0:
-            break
-        expression = substituted[start + 2:end]
-        before = substituted[0:start]
-        after = substituted[end + 1:len(substituted)]
-        value = evaluator(expression)
-        substituted = before + value + after
-    return substituted
+    parts: list[str] = []
+    position = 0
+    while (found := _find_expression(marker_char, text, position)) is not None:
+        (start, end) = found
+        parts.append(text[position:start])
+        value = evaluator(text[start + 2:end])
+        # values can contain expressions themselves, f.i. the contents of files
+        if marker_char + '{' in value:
+            value = _substitute_expressions(marker_char, value, evaluator)
+        parts.append(value)
+        position = end + 1
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def _find_expression(marker_char: str, text: str, position: int) -> tuple[int, int] | None:
+    """ The start of the marker and the position of the closing brace. Braces inside of the expression must be balanced. """
+    start = text.find(marker_char + '{', position)
+    if start < 0:
+        return None
+    depth = 0
+    for brace in _braces.finditer(text, start + 1):
+        depth += 1 if brace.group() == '{' else -1
+        if depth == 0:
+            return start, brace.start()
+    # with unbalanced braces, the expression ends at the first closing brace
+    end = text.find('}', start)
+    return (start, end) if end >= 0 else None
 
 
 def _evaluate_expression(expression: str) -> str:
@@ -88,6 +128,12 @@ def _evaluate_expression(expression: str) -> str:
         return _evaluate_file(value)
     elif cmd in ("gql", "graphql"):
         return _evaluate_gql(value)
+    elif cmd == "repeat":
+        return _evaluate_repeat(value)
+    elif cmd == "range":
+        return _evaluate_range(value)
+    elif cmd == "random":
+        return _evaluate_random(value)
     else:
         raise ValueError(f"unsupported substitute {expression}")
 
@@ -142,3 +188,102 @@ def _evaluate_gql(value: str) -> str:
         operation_name = values[2]
         gql_json["operationName"] = operation_name
     return json.dumps(gql_json)
+
+
+def _evaluate_repeat(value: str | None) -> str:
+    """ The template repeated and separated by commas.
+    `{index}` is replaced with the index, nested expressions are evaluated for each repetition.
+    The template is parsed once into columns of values for all repetitions, which are joined at once.
+    """
+    (count_value, template) = _split_arguments("repeat", value, 2, "repeat:<count>:<template>", maxsplit=1)
+    count = _int_argument("repeat", count_value)
+    # literal texts and expressions alternate
+    columns: list[Iterable[str]] = []
+    position = 0
+    while (found := _find_expression('!', template, position)) is not None:
+        (start, end) = found
+        columns.append(_literal_column(template[position:start], count))
+        columns.append(_expression_column(template[start + 2:end], count))
+        position = end + 1
+    columns.append(_literal_column(template[position:], count))
+    if len(columns) == 1:
+        return ','.join(columns[0])
+    return ','.join(map(''.join, zip(*columns)))
+
+
+def _literal_column(text: str, count: int) -> Iterable[str]:
+    if _index_placeholder not in text:
+        return itertools.repeat(text, count)
+    parts = text.split(_index_placeholder)
+    return [str(index).join(parts) for index in range(count)]
+
+
+def _expression_column(expression: str, count: int) -> list[str]:
+    if _index_placeholder in expression:
+        parts = expression.split(_index_placeholder)
+        return [_evaluate_expression(str(index).join(parts)) for index in range(count)]
+    (cmd, _, value) = expression.partition(':')
+    if cmd.lower() == "random":
+        return _random_values(value, count)
+    return [_evaluate_expression(expression) for _ in range(count)]
+
+
+def _evaluate_range(value: str | None) -> str:
+    arguments = _split_arguments("range", value, (2, 3), "range:<start>:<stop>[:<step>]")
+    return ','.join(map(str, range(*(_int_argument("range", argument) for argument in arguments))))
+
+
+def _evaluate_random(value: str | None) -> str:
+    return _random_values(value, 1)[0]
+
+
+def _random_values(value: str | None, count: int) -> list[str]:
+    """ Generates the random values for all repetitions at once. """
+    kind = value.split(':', 1)[0].lower() if value is not None else None
+    if kind == "int":
+        (_, minimum, maximum) = _split_arguments("random", value, 3, "random:int:<min>:<max>")
+        numbers = range(_int_argument("random", minimum), _int_argument("random", maximum) + 1)
+        if len(numbers) == 0:
+            raise ValueError(f"random needs a minimum, that is not greater than the maximum, not {minimum} and {maximum}")
+        return list(map(str, _random.choices(numbers, k=count)))
+    elif kind == "float":
+        (_, minimum, maximum) = _split_arguments("random", value, 3, "random:float:<min>:<max>")
+        try:
+            (low, high) = (float(minimum), float(maximum))
+        except ValueError:
+            raise ValueError(f"random needs numbers, not {minimum} and {maximum}")
+        return [str(_random.uniform(low, high)) for _ in range(count)]
+    elif kind == "string":
+        (_, length_value) = _split_arguments("random", value, 2, "random:string:<length>")
+        length = _int_argument("random", length_value)
+        if length <= 0:
+            return [''] * count
+        characters = _random_string(length * count)
+        return [characters[start:start + length] for start in range(0, length * count, length)]
+    else:
+        raise ValueError(
+            "random expressions must look like "
+            "!{random:int:<min>:<max>}, !{random:float:<min>:<max>} or !{random:string:<length>}"
+        )
+
+
+def _random_string(length: int) -> str:
+    characters = b''
+    while len(characters) < length:
+        missing = length - len(characters)
+        characters += _random.randbytes(missing + missing // 16 + 8).translate(_random_table, _biased_bytes)
+    return characters[0:length].decode()
+
+
+def _split_arguments(cmd: str, value: str | None, counts: int | tuple[int, ...], usage: str, maxsplit: int = -1) -> list[str]:
+    arguments = value.split(':', maxsplit) if value is not None else []
+    if len(arguments) not in (counts if isinstance(counts, tuple) else (counts,)):
+        raise ValueError(f"{cmd} expressions must look like !{{{usage}}}")
+    return arguments
+
+
+def _int_argument(cmd: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{cmd} needs integers, not {value}")
@@ -0,0 +1,230 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import socket
+import threading
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from http.client import HTTPConnection, HTTPMessage, HTTPResponse, HTTPSConnection
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import HTTPHandler, HTTPSHandler
+
+# resolved addresses by (host, port), together with the time they expire
+_dns_cache: dict[tuple[str, int], tuple[float, list]] = {}
+_dns_cache_lock = threading.Lock()
+
+
+class PhaseTimeout(TimeoutError):
+    """ A request took longer than the timeout of a phase: connect, read or total. """
+
+    def __init__(self, phase: str, seconds: float):
+        super().__init__(f"{phase} timeout of {seconds:g} s exceeded")
+        self.phase = phase
+        self.seconds = seconds
+
+
+class Timeouts:
+    """ The timeouts of a request in seconds. None means no timeout.
+    The total timeout includes redirects and the download of the body. It starts, when the timeouts are created.
+    """
+
+    def __init__(self, connect: float | None = None, read: float | None = None, total: float | None = None):
+        self.connect = connect
+        self.read = read
+        self.total = total
+        self.deadline = perf_counter() + total if total is not None else None
+
+    def phase(self, phase: str) -> tuple[str, float | None]:
+        """ Returns the phase, that would time out first, and the seconds until then. """
+        seconds = getattr(self, phase)
+        if self.deadline is not None:
+            remaining = max(self.deadline - perf_counter(), 0.001)
+            if seconds is None or remaining < seconds:
+                return "total", remaining
+        return phase, seconds
+
+    def check(self) -> None:
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise self.error("total")
+
+    def error(self, phase: str) -> PhaseTimeout:
+        return PhaseTimeout(phase, getattr(self, phase))
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """ Measures the phases of a request in milliseconds: dns, connect, tls (HTTPS only) and ttfb (time to first byte).
+    Connect and read timeouts are applied separately, if they are defined.
+    """
+
+    def __init__(self, *args, timeouts: Timeouts | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings: dict[str, float] = {}
+        self.timeouts = timeouts
+        self._sent: float = 0.0
+        # http.client sets this as instance attribute, so it cannot be overridden as a method.
+        self._create_connection = self._timed_create_connection
+
+    def _timed_create_connection(self, address, timeout, source_address) -> socket.socket:
+        host, port = address
+        start = perf_counter()
+        addr_infos = resolve_address(host, port)
+        resolved = perf_counter()
+        self.timings["dns"] = _millis(start, resolved)
+        phase = "connect"
+        if self.timeouts is not None:
+            phase, timeout = self.timeouts.phase("connect")
+        error = None
+        for family, socktype, proto, _, sockaddr in addr_infos:
+            sock = socket.socket(family, socktype, proto)
+            try:
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                self.timings["connect"] = _millis(resolved, perf_counter())
+                return sock
+            except TimeoutError as e:
+                error = self.timeouts.error(phase) if self.timeouts is not None else e
+                sock.close()
+            except OSError as e:
+                error = e
+                sock.close()
+        # the address might have changed
+        forget_address(host, port)
+        raise error
+
+    def request(self, *args, **kwargs) -> None:
+        super().request(*args, **kwargs)
+        self._sent = perf_counter()
+
+    def getresponse(self) -> HTTPResponse:
+        phase = "read"
+        if self.timeouts is not None and self.sock is not None:
+            phase, timeout = self.timeouts.phase("read")
+            self.sock.settimeout(timeout)
+        try:
+            response = super().getresponse()
+        except TimeoutError as e:
+            self.close()
+            if self.timeouts is None:
+                raise
+            raise self.timeouts.error(phase) from e
+        self.timings["ttfb"] = _millis(self._sent, perf_counter())
+        response.timings = self.timings
+        return response
+
+
+class TimedHTTPSConnection(HTTPSConnection, TimedHTTPConnection):
+
+    def __init__(self, *args, timeouts: Timeouts | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeouts = timeouts
+
+    def connect(self) -> None:
+        start = perf_counter()
+        super().connect()
+        handshake = _millis(start, perf_counter()) - self.timings.get("dns", 0.0) - self.timings.get("connect", 0.0)
+        self.timings["tls"] = max(handshake, 0.0)
+
+
+class TimedHTTPHandler(HTTPHandler):
+
+    def http_open(self, req):
+        return self.do_open(TimedHTTPConnection, req, timeouts=getattr(req, 'timeouts', None))
+
+
+class TimedHTTPSHandler(HTTPSHandler):
+
+    def https_open(self, req):
+        return self.do_open(TimedHTTPSConnection, req, context=self._context, timeouts=getattr(req, 'timeouts', None))
+
+
+class BufferedResponse:
+    """ A response with the body already in memory, that can be used in place of an HTTPResponse. """
+    # the body stays readable, also as file of an HTTPError
+    closed = False
+
+    def __init__(self, url: str, status: int, reason: str, headers: list[tuple[str, str]], body: bytes):
+        self.url = url
+        self.status = self.code = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def getheaders(self) -> list[tuple[str, str]]:
+        return self.headers
+
+    def geturl(self) -> str:
+        return self.url
+
+    def info(self) -> HTTPMessage:
+        message = HTTPMessage()
+        for name, value in self.headers:
+            message[name] = value
+        return message
+
+    def read(self) -> bytes:
+        return self.body
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "BufferedResponse":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def resolve_address(host: str, port: int) -> list:
+    """ Resolves the address with getaddrinfo. Results are cached for the runner process for `dns_cache_ttl` seconds. """
+    ttl = float(os.environ.get("dns_cache_ttl", "30"))
+    key = (host, port)
+    if ttl > 0:
+        with _dns_cache_lock:
+            cached = _dns_cache.get(key)
+        if cached is not None and cached[0] > perf_counter():
+            return cached[1]
+    addr_infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    if len(addr_infos) == 0:
+        raise OSError(f"getaddrinfo returns an empty list for {host}")
+    if ttl > 0:
+        with _dns_cache_lock:
+            _dns_cache[key] = (perf_counter() + ttl, addr_infos)
+    return addr_infos
+
+
+def forget_address(host: str, port: int) -> None:
+    with _dns_cache_lock:
+        _dns_cache.pop((host, port), None)
+
+
+def response_timings(resp: HTTPResponse|HTTPError) -> dict[str, float]:
+    """ Returns the phase timings of a response, that has been opened with a timed handler. """
+    timings = getattr(resp, "timings", None)
+    if timings is None and isinstance(resp, HTTPError):
+        timings = getattr(resp.fp, "timings", None)
+    return dict(timings) if timings is not None else {}
+
+
+def retry_after_seconds(value: str) -> float | None:
+    """ Parses a Retry-After header value, which is either a number of seconds or an HTTP date. """
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def _millis(start: float, end: float) -> float:
+    return (end - start) * 1000
@@ -0,0 +1,136 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import functools
+import os
+
+from lxml import etree
+
+from .body import _clear_namespaces
+
+_max_differences = 20
+_max_value_length = 80
+
+
+def xml_whitespace() -> str:
+    """ `strict` compares texts exactly, `normalize` ignores leading, trailing and repeated whitespace. """
+    whitespace = os.environ.get("xml_whitespace", "strict").strip().lower()
+    if whitespace not in ("strict", "normalize"):
+        raise ValueError(f"xml_whitespace must be strict or normalize, not {whitespace}")
+    return whitespace
+
+
+def normalize_text(text: str | None, whitespace: str) -> str | None:
+    if text is None or whitespace == "strict":
+        return text
+    return ' '.join(text.split()) or None
+
+
+def canonical_xml(elem: etree._Element, whitespace: str) -> str:
+    """ A canonical form of the element,
+    that does not depend on the order of attributes, namespace declarations or the text after the element.
+    lxml's C14N cannot be used, because the namespaces of response documents are removed.
+    """
+    parts: list[str] = []
+    _write_canonical(elem, whitespace, parts)
+    return ''.join(parts)
+
+
+def xml_equals(actual: etree._Element, expected_value: str, whitespace: str) -> bool:
+    """ Compares the canonical forms. The canonical form of the expected value is parsed only once. """
+    return canonical_xml(actual, whitespace) == _expected_xml(expected_value, whitespace)[1]
+
+
+def diff_xml(actual: etree._Element, expected_value: str, whitespace: str) -> list[str]:
+    """ The differences as XPaths of the actual document with the expected and actual values.
+    The number of differences is bounded.
+    """
+    expected = _expected_xml(expected_value, whitespace)[0]
+    tree = actual.getroottree()
+    differences: list[str] = []
+    _diff_elements(tree, actual, expected, tree.getpath(actual), whitespace, differences)
+    if len(differences) > _max_differences:
+        differences = differences[0:_max_differences]
+        differences.append("... further differences are not shown")
+    return differences
+
+
+@functools.lru_cache(maxsize=64)
+def _expected_xml(value: str, whitespace: str) -> tuple[etree._Element, str]:
+    expected = etree.XML(value)
+    _clear_namespaces(expected)
+    return expected, canonical_xml(expected, whitespace)
+
+
+def _write_canonical(elem: etree._Element, whitespace: str, parts: list[str]) -> None:
+    text = normalize_text(elem.text, whitespace) or ''
+    if elem.tag is etree.Comment:
+        parts.append(f"<!--{text}-->")
+        return
+    if elem.tag is etree.ProcessingInstruction:
+        parts.append(f"<?{elem.target} {text}?>")
+        return
+    parts.append(f"<{elem.tag}")
+    for name, value in sorted(elem.attrib.items()):
+        parts.append(f' {name}="{_escape_attribute(value)}"')
+    parts.append(f">{_escape_text(text)}")
+    for child in elem:
+        _write_canonical(child, whitespace, parts)
+        parts.append(_escape_text(normalize_text(child.tail, whitespace) or ''))
+    parts.append(f"</{elem.tag}>")
+
+
+def _diff_elements(
+        tree: etree._ElementTree, actual: etree._Element, expected: etree._Element, path: str, whitespace: str,
+        differences: list[str]) -> None:
+    if len(differences) > _max_differences:
+        return
+    if actual.tag != expected.tag:
+        differences.append(f"{path}: expected {_describe(expected)}, got {_describe(actual)}")
+        return
+    for name in sorted(set(actual.attrib) | set(expected.attrib)):
+        if actual.get(name) != expected.get(name):
+            differences.append(f"{path}/@{name}: expected {_quote(expected.get(name))}, got {_quote(actual.get(name))}")
+    actual_text = normalize_text(actual.text, whitespace)
+    expected_text = normalize_text(expected.text, whitespace)
+    if actual_text != expected_text:
+        differences.append(f"{path}/text(): expected {_quote(expected_text)}, got {_quote(actual_text)}")
+    for actual_child, expected_child in zip(actual, expected):
+        child_path = tree.getpath(actual_child)
+        _diff_elements(tree, actual_child, expected_child, child_path, whitespace, differences)
+        actual_tail = normalize_text(actual_child.tail, whitespace)
+        expected_tail = normalize_text(expected_child.tail, whitespace)
+        if actual_tail != expected_tail:
+            differences.append(
+                f"{child_path}/following-sibling::text()[1]: expected {_quote(expected_tail)}, got {_quote(actual_tail)}"
+            )
+    for actual_child in actual[len(expected):]:
+        differences.append(f"{tree.getpath(actual_child)}: unexpected {_describe(actual_child)}")
+    for expected_child in expected[len(actual):]:
+        differences.append(f"{path}: missing {_describe(expected_child)}")
+
+
+def _describe(elem: etree._Element) -> str:
+    if elem.tag is etree.Comment:
+        return "comment"
+    if elem.tag is etree.ProcessingInstruction:
+        return "processing instruction"
+    return f"element <{elem.tag}>"
+
+
+def _quote(value: str | None) -> str:
+    if value is None:
+        return "nothing"
+    if len(value) > _max_value_length:
+        value = f"{value[0:_max_value_length]}..."
+    return f"'{value}'"
+
+
+def _escape_text(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#xD;')
+
+
+def _escape_attribute(value: str) -> str:
+    return _escape_text(value).replace('"', '&quot;').replace('\t', '&#x9;').replace('\n', '&#xA;')
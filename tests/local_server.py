@@ -0,0 +1,63 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalServer:
+    """ Runs an HTTP server on a free local port in a background thread.
+    Responses are defined as a dict of path to (status, headers, body).
+    Instead of the tuple or the body, a function can be defined, that gets the request handler as argument.
+    Received requests are recorded as (method, path, headers, body).
+    With protocol_version HTTP/1.1, connections are kept alive.
+    """
+
+    def __init__(self, responses: dict[str, tuple[int, dict[str, str], bytes]], protocol_version: str = "HTTP/1.0"):
+        self.responses = responses
+        self.requests: list[tuple[str, str, dict[str, str], bytes]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length > 0 else b""
+                server.requests.append((self.command, self.path, dict(self.headers), body))
+                response = server.responses.get(self.path, (404, {}, b""))
+                status, headers, resp_body = response(self) if callable(response) else response
+                if callable(resp_body):
+                    resp_body = resp_body(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(resp_body)))
+                self.end_headers()
+                self.wfile.write(resp_body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+
+            def handle_error(self, request, client_address):
+                # clients, that time out, close the connection before the response is written
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        Handler.protocol_version = protocol_version
+        self._httpd = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self) -> "LocalServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
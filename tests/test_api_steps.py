@@ -4,19 +4,34 @@
 #
 
 import contextlib
+import gzip
 import io
+import json
 import os
+import shutil
+import tempfile
+import time
 import unittest
 
 from colorama import Fore
 from getgauge.python import data_store
 from unittest.mock import Mock, mock_open, patch
 from tests import TEST_DIR, TEST_RESOURCES_DIR, TEST_OUT_DIR
+from tests.local_server import LocalServer
+from gauge_api_steps.async_engine import close_engine
+from gauge_api_steps.file_util import close_appended, flush_appended
 from gauge_api_steps.api_steps import (
-    opener_key, body_key, response_key, sent_request_headers_key,
-    add_body, append_to_file, assert_response_jsonpath_equals, assert_response_jsonpath_type, assert_response_xpath_type,
-    base64_decode, base64_encode, beforescenario, load_from_file, pretty_print, print_headers, print_status, print_body,
-    save_file, simulate_response,
+    opener_key, body_key, load_test_key, poll_key, response_key, sent_request_headers_key,
+    add_body, add_body_compression, add_file_part, assert_body_matches, add_form_field, add_header, append_to_file,
+    assert_header, assert_header_matches, assert_header_value, assert_load_test,
+    assert_response_jsonpath_equals, assert_response_jsonpath_type, assert_response_matches_schema,
+    assert_response_matches_snapshot, assert_response_time,
+    assert_response_xpath_equals, assert_response_xpath_type, afterscenario, await_request, base64_decode, base64_encode,
+    beforescenario, load_from_file, load_test, make_request,
+    poll_until_jsonpath_equals, pretty_print, print_headers, print_status, print_body, req_csrf_header, resp_csrf_header,
+    save_file,
+    save_body_regex, save_response, simulate_response, start_request_as, use_oauth2_client_credentials, use_response,
+    _schema_validators,
 )
 
 
@@ -30,6 +45,12 @@ class TestApiSteps(unittest.TestCase):
         os.environ["session_properties"] = f"{TEST_DIR}/session.properties"
         if not os.path.exists(TEST_OUT_DIR):
             os.mkdir(TEST_OUT_DIR)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+
+    def tearDown(self):
+        close_engine()
+        close_appended()
+        shutil.rmtree(self.out_dir)
 
     def test_beforescenario(self):
         beforescenario(self.app_context)
@@ -55,10 +76,21 @@ class TestApiSteps(unittest.TestCase):
             os.remove(out_file)
         append_to_file(out_file, "a,b,c")
         append_to_file(out_file, "aa,bb,cc")
+        self.assertFalse(os.path.isfile(out_file))
+        flush_appended()
         with open(out_file) as f:
             contents = f.read()
         self.assertEqual("a,b,c\naa,bb,cc\n", contents, f"got unexpected content in output file {out_file}")
 
+    def test_append_and_send_as_file_part(self):
+        out_file = f"{self.out_dir}/part.csv"
+        beforescenario(self.app_context)
+        append_to_file(out_file, "a,b,c")
+        add_file_part("data", out_file)
+        with LocalServer({"/upload": (201, {}, b"")}) as server:
+            make_request("POST", f"{server.url}/upload")
+        self.assertIn(b"\r\n\r\na,b,c\n\r\n", server.requests[0][3])
+
     def test_append_fails(self):
         out_file = "notvalid/output.csv"
         self.assertRaises(AssertionError, lambda: append_to_file(out_file, "a,b,c"))
@@ -71,11 +103,17 @@ class TestApiSteps(unittest.TestCase):
 
     def test_print_headers(self):
         data_store.scenario[sent_request_headers_key] = {'req': 'reqheader'}
-        data_store.scenario.setdefault(response_key, {})["headers"] = [('resp', 'respheader')]
+        data_store.scenario.setdefault(response_key, {})["headers"] = [
+            ('Resp', 'respheader'), ('Vary', 'Accept, Origin'), ('resp', 'second')
+        ]
         with io.StringIO() as buf, contextlib.redirect_stdout(buf):
             print_headers()
             result = buf.getvalue()
-            self.assertEqual('Request headers:\n\n    req: reqheader\nResponse headers:\n\n    resp: respheader\n', result)
+            self.assertEqual(
+                'Request headers:\n\n    req: reqheader\nResponse headers:\n\n'
+                '    resp: respheader\n    resp: second\n    vary: Accept, Origin\n',
+                result
+            )
 
     def test_print_status(self):
         data_store.scenario.setdefault(response_key, {})["status"] = '200'
@@ -91,6 +129,371 @@ class TestApiSteps(unittest.TestCase):
             result = buf.getvalue()
             self.assertEqual('Response body:\n\n    {\n        "a": "b",\n        "c": 1\n    }\n', result)
 
+    def test_assertion_error_shows_body_preview(self):
+        simulate_response('{"items": [' + ','.join(['"x"'] * 1000) + ']}')
+        with patch.dict(os.environ, {"body_preview_length": "20"}), self.assertRaises(AssertionError) as error:
+            assert_response_jsonpath_equals("$.missing", '"x"')
+        self.assertEqual(
+            'Assertion failed: No value found at $.missing in {"items": ["x","x","... (4012 bytes)', str(error.exception)
+        )
+
+    def test_assert_header(self):
+        data_store.scenario[response_key] = {'headers': [('Content-Type', 'text/html'), ('Vary', 'Accept, Origin')]}
+        params = [("content-type", "text/html"), ("CONTENT-TYPE", "text/html"), ("Vary", "Accept, Origin"), ("vary", "Origin")]
+        for header, value in params:
+            with self.subTest(header=header, value=value):
+                assert_header(header, value)
+        self.assertRaises(AssertionError, lambda: assert_header("Content-Type", "text/plain"))
+        self.assertRaises(AssertionError, lambda: assert_header("Accept", "text/html"))
+
+    def test_assert_header_matches(self):
+        data_store.scenario[response_key] = {'headers': [('Content-Type', 'application/json; charset=utf-8')]}
+        assert_header_matches("content-type", "^application/json")
+        self.assertRaises(AssertionError, lambda: assert_header_matches("content-type", "^text/"))
+
+    def test_assert_header_value(self):
+        data_store.scenario[response_key] = {'headers': [('Content-Length', '2048'), ('Content-Type', 'text/html')]}
+        params = ["< 1MB", "> 2KB", "== 2KiB", ">= 2048"]
+        for expr in params:
+            with self.subTest(expr=expr):
+                assert_header_value("content-length", expr)
+        self.assertRaises(AssertionError, lambda: assert_header_value("content-length", "< 1KB"))
+        self.assertRaises(AssertionError, lambda: assert_header_value("content-type", "< 1KB"))
+
+    def test_make_request(self):
+        beforescenario(self.app_context)
+        add_body('{"a": 1}')
+        with LocalServer({"/users": (201, {"X-Id": "1"}, b'{"id": 1}')}) as server:
+            make_request("POST", f"{server.url}/users")
+        self.assertEqual(("POST", "/users"), server.requests[0][0:2])
+        self.assertEqual(b'{"a": 1}', server.requests[0][3])
+        response = data_store.scenario[response_key]
+        self.assertEqual(201, response["status"])
+        self.assertEqual(b'{"id": 1}', response["body"])
+        self.assertEqual(["1"], response["header_index"]["x-id"])
+        self.assertTrue({"dns", "connect", "ttfb", "download", "total"}.issubset(response["timings"].keys()))
+
+    def test_make_request_with_multipart_body(self):
+        beforescenario(self.app_context)
+        add_form_field("title", "Fox")
+        add_file_part("upload", f"{TEST_RESOURCES_DIR}/file.txt")
+        with LocalServer({"/upload": (201, {}, b"")}) as server:
+            make_request("POST", f"{server.url}/upload")
+        _, _, headers, body = server.requests[0]
+        boundary = headers["Content-Type"].split("boundary=")[1]
+        self.assertTrue(headers["Content-Type"].startswith("multipart/form-data"))
+        self.assertEqual(str(len(body)), headers["Content-Length"])
+        self.assertIn(b'name="upload"; filename="file.txt"\r\nContent-Type: text/plain\r\n\r\nTest file\n\r\n', body)
+        self.assertTrue(body.endswith(f"--{boundary}--\r\n".encode()))
+        add_body("body")
+        add_form_field("title", "Fox")
+        self.assertRaises(AssertionError, lambda: make_request("POST", f"{server.url}/upload"))
+
+    def test_save_and_use_response(self):
+        beforescenario(self.app_context)
+        with LocalServer({"/a": (200, {}, b'{"id": "a"}'), "/b": (404, {}, b'{"id": "b"}')}) as server:
+            make_request("GET", f"{server.url}/a")
+            save_response("first")
+            make_request("GET", f"{server.url}/b")
+        use_response("first")
+        self.assertEqual(200, data_store.scenario[response_key]["status"])
+        assert_response_jsonpath_equals("$.id", '"a"')
+        use_response("~0")
+        self.assertEqual(404, data_store.scenario[response_key]["status"])
+        self.assertRaises(AssertionError, lambda: use_response("unknown"))
+
+    def test_start_and_await_requests(self):
+        beforescenario(self.app_context)
+
+        def slow(handler):
+            time.sleep(0.3)
+            return 200, {}, handler.path.encode()
+
+        with LocalServer({"/a": slow, "/b": slow}, protocol_version="HTTP/1.1") as server:
+            start = time.perf_counter()
+            start_request_as("GET", f"{server.url}/a", "a")
+            start_request_as("GET", f"{server.url}/b", "b")
+            await_request("b")
+            self.assertEqual(b"/b", data_store.scenario[response_key]["body"])
+            await_request("a")
+            elapsed = time.perf_counter() - start
+        self.assertEqual(b"/a", data_store.scenario[response_key]["body"])
+        self.assertLess(elapsed, 0.55)
+        self.assertRaises(AssertionError, lambda: await_request("a"))
+
+    def test_make_request_with_asyncio_engine(self):
+        beforescenario(self.app_context)
+        resp_csrf_header("X-CSRF-Token")
+        req_csrf_header("X-CSRF-Token")
+        responses = {
+            "/login": (302, {"Location": "/home", "Set-Cookie": "session=abc; Path=/", "X-CSRF-Token": "t1"}, b""),
+            "/home": (200, {}, b"home"),
+        }
+        with patch.dict(os.environ, {"http_engine": "asyncio"}), LocalServer(responses, protocol_version="HTTP/1.1") as server:
+            make_request("GET", f"{server.url}/login")
+            self.assertEqual(302, data_store.scenario[response_key]["status"])
+            data_store.scenario["follow_redirects"] = "true"
+            make_request("GET", f"{server.url}/login")
+        self.assertEqual(200, data_store.scenario[response_key]["status"])
+        self.assertEqual(b"home", data_store.scenario[response_key]["body"])
+        headers = server.requests[-1][2]
+        self.assertEqual("session=abc", headers["Cookie"])
+        self.assertEqual("t1", headers["X-csrf-token"])
+
+    def test_make_request_stops_redirect_loops_like_urllib(self):
+        beforescenario(self.app_context)
+        data_store.scenario["follow_redirects"] = "true"
+        with LocalServer({"/loop": (302, {"Location": "/loop"}, b"loop")}) as server:
+            for engine in ("urllib", "asyncio"):
+                with self.subTest(engine=engine), patch.dict(os.environ, {"http_engine": engine}):
+                    make_request("GET", f"{server.url}/loop")
+                    response = data_store.scenario[response_key]
+                    self.assertEqual(302, response["status"])
+                    self.assertEqual(b"loop", response["body"])
+                    self.assertTrue(response["reason"].startswith("The HTTP server returned a redirect error"))
+            start_request_as("GET", f"{server.url}/loop", "loop")
+            await_request("loop")
+            self.assertEqual(302, data_store.scenario[response_key]["status"])
+
+    def test_persisted_cookies_are_reused_in_the_next_scenario(self):
+        session_file = f"{self.out_dir}/persisted.properties"
+        responses = {
+            "/login": (200, {"Set-Cookie": "session=abc; Path=/"}, b""),
+            "/home": (200, {}, b"home"),
+        }
+        properties = {"persist_cookies": "true", "session_properties": session_file}
+        with patch.dict(os.environ, properties), LocalServer(responses) as server:
+            beforescenario(self.app_context)
+            make_request("GET", f"{server.url}/login")
+            afterscenario(self.app_context)
+            data_store.scenario.clear()
+            beforescenario(self.app_context)
+            make_request("GET", f"{server.url}/home")
+            afterscenario(self.app_context)
+        self.assertEqual("session=abc", server.requests[-1][2]["Cookie"])
+
+    def test_use_oauth2_client_credentials(self):
+        beforescenario(self.app_context)
+        cache_file = f"{self.out_dir}/oauth2_steps.tokens"
+        properties = {"oauth2_client_id": "id-for-steps", "oauth2_client_secret": "secret", "oauth2_token_cache": cache_file}
+        responses = {"/token": (200, {}, b'{"access_token": "abc", "token_type": "Bearer", "expires_in": 300}')}
+        with LocalServer(responses) as server, patch.dict(os.environ, properties):
+            use_oauth2_client_credentials(f"{server.url}/token", "token")
+        self.assertEqual("abc", data_store.scenario["token"])
+        self.assertEqual("Basic aWQtZm9yLXN0ZXBzOnNlY3JldA==", server.requests[0][2]["Authorization"])
+
+    def test_use_oauth2_client_credentials_is_replayed(self):
+        beforescenario(self.app_context)
+        cache_file = f"{self.out_dir}/oauth2_replay.tokens"
+        cassette_file = f"{self.out_dir}/cassettes/oauth2.cassette"
+        properties = {
+            "oauth2_client_id": "id-for-replay", "oauth2_client_secret": "secret",
+            "oauth2_token_cache": cache_file, "http_cassette": cassette_file,
+        }
+        responses = {"/token": (200, {}, b'{"access_token": "abc", "expires_in": 0}')}
+        with LocalServer(responses) as server, patch.dict(os.environ, properties):
+            with patch.dict(os.environ, {"http_mode": "record"}):
+                use_oauth2_client_credentials(f"{server.url}/token", "token")
+            data_store.scenario.pop("token")
+            with open(cassette_file) as c:
+                self.assertNotIn("abc", c.read())
+            with patch.dict(os.environ, {"http_mode": "replay"}):
+                use_oauth2_client_credentials(f"{server.url}/token", "token")
+        self.assertEqual("********", data_store.scenario["token"])
+        self.assertEqual(1, len(server.requests))
+
+    def test_make_request_adapts_the_rate_limit(self):
+        beforescenario(self.app_context)
+        state_file = f"{self.out_dir}/rate_limits.json"
+        responses = {"/busy": (429, {"Retry-After": "0"}, b"")}
+        properties = {"rate_limit.127.0.0.1": "100/s", "rate_limit_state_file": state_file}
+        with LocalServer(responses) as server, patch.dict(os.environ, properties):
+            make_request("GET", f"{server.url}/busy")
+        with open(state_file) as f:
+            self.assertEqual(50.0, json.load(f)["127.0.0.1"]["rate"])
+
+    def test_make_request_waits_for_the_rate_limit_outside_of_the_total_timeout(self):
+        beforescenario(self.app_context)
+        state_file = f"{self.out_dir}/rate_limits.json"
+        properties = {"rate_limit.127.0.0.1": "1/s", "rate_limit_state_file": state_file}
+        with LocalServer({"/limited": (200, {}, b"ok")}) as server, patch.dict(os.environ, properties):
+            data_store.scenario["total_timeout"] = "0.5"
+            for engine in ("urllib", "urllib", "asyncio"):
+                with patch.dict(os.environ, {"http_engine": engine}):
+                    make_request("GET", f"{server.url}/limited")
+                self.assertEqual(200, data_store.scenario[response_key]["status"])
+            del data_store.scenario["total_timeout"]
+        self.assertEqual(3, len(server.requests))
+
+    def test_make_request_response_time_excludes_the_wait_for_the_rate_limit(self):
+        beforescenario(self.app_context)
+        properties = {"rate_limit.127.0.0.1": "1/s", "rate_limit_state_file": f"{self.out_dir}/rate_limits.json"}
+        started = time.perf_counter()
+        with LocalServer({"/limited": (200, {}, b"ok")}) as server, patch.dict(os.environ, properties):
+            for engine in ("urllib", "urllib", "asyncio"):
+                with self.subTest(engine=engine), patch.dict(os.environ, {"http_engine": engine}):
+                    make_request("GET", f"{server.url}/limited")
+                    self.assertLess(data_store.scenario[response_key]["timings"]["total"], 500)
+            start_request_as("GET", f"{server.url}/limited", "limited")
+            await_request("limited")
+            self.assertLess(data_store.scenario[response_key]["timings"]["total"], 500)
+            load_test("GET", f"{server.url}/limited", "2", "1")
+            self.assertLess(data_store.scenario[load_test_key]["max"], 500)
+        # the requests waited for the rate limit
+        self.assertGreater(time.perf_counter() - started, 3)
+
+    def test_make_request_with_compressed_body(self):
+        beforescenario(self.app_context)
+        raw = b'{"name": "fox"}' * 1000
+        with LocalServer({"/ingest": (202, {}, b"")}) as server:
+            for engine in ("urllib", "asyncio"):
+                with self.subTest(engine=engine), patch.dict(os.environ, {"http_engine": engine}):
+                    add_body(raw.decode())
+                    add_body_compression("gzip")
+                    make_request("POST", f"{server.url}/ingest")
+                    _, _, headers, body = server.requests[-1]
+                    headers = {name.lower(): value for name, value in headers.items()}
+                    self.assertEqual("gzip", headers["content-encoding"])
+                    self.assertEqual(str(len(body)), headers["content-length"])
+                    self.assertEqual(raw, gzip.decompress(body))
+
+    def test_make_request_compresses_large_bodies(self):
+        beforescenario(self.app_context)
+        with LocalServer({"/ingest": (202, {}, b"")}) as server, patch.dict(os.environ, {"compress_request_body_over": "10"}):
+            add_body("small")
+            make_request("POST", f"{server.url}/ingest")
+            add_body("large enough")
+            make_request("POST", f"{server.url}/ingest")
+        self.assertNotIn("content-encoding", (name.lower() for name in server.requests[0][2]))
+        self.assertEqual(b"small", server.requests[0][3])
+        self.assertEqual(b"large enough", gzip.decompress(server.requests[1][3]))
+
+    def test_make_request_record_and_replay(self):
+        beforescenario(self.app_context)
+        cassette_file = f"{self.out_dir}/cassettes/api_steps.cassette"
+        with patch.dict(os.environ, {"http_mode": "record", "http_cassette": cassette_file}):
+            with LocalServer({"/users": (200, {"X-Id": "1"}, b'{"id": 1}')}) as server:
+                make_request("GET", f"{server.url}/users")
+            data_store.scenario.pop(response_key)
+            os.environ["http_mode"] = "replay"
+            make_request("GET", f"{server.url}/users")
+        response = data_store.scenario[response_key]
+        self.assertEqual(200, response["status"])
+        self.assertEqual(b'{"id": 1}', response["body"])
+        self.assertEqual(["1"], response["header_index"]["x-id"])
+
+    def test_make_request_timeouts(self):
+        beforescenario(self.app_context)
+
+        def slow(handler):
+            time.sleep(0.5)
+            return 200, {}, b"slow"
+
+        with LocalServer({"/slow": slow}) as server:
+            for engine in ("urllib", "asyncio"):
+                with self.subTest(engine=engine), patch.dict(os.environ, {"http_engine": engine, "read_timeout": "0.1"}):
+                    with self.assertRaises(AssertionError) as error:
+                        make_request("GET", f"{server.url}/slow")
+                    self.assertEqual(
+                        f"Timeout: GET {server.url}/slow was aborted after the read timeout of 0.1 s exceeded",
+                        str(error.exception)
+                    )
+                    data_store.scenario["total_timeout"] = "0.05"
+                    with self.assertRaises(AssertionError) as error:
+                        make_request("GET", f"{server.url}/slow")
+                    self.assertIn("total timeout of 0.05 s exceeded", str(error.exception))
+                    del data_store.scenario["total_timeout"]
+
+    def test_make_request_with_http_cache(self):
+        beforescenario(self.app_context)
+
+        def catalog(handler):
+            if handler.headers.get("If-None-Match") == '"v1"':
+                return 304, {"ETag": '"v1"'}, b""
+            return 200, {"ETag": '"v1"', "Content-Type": "application/json"}, b'{"items": [1, 2]}'
+
+        with patch.dict(os.environ, {"http_cache": "true"}), LocalServer({"/catalog": catalog}) as server:
+            make_request("GET", f"{server.url}/catalog")
+            self.assertEqual(200, data_store.scenario[response_key]["status"])
+            self.assertFalse(data_store.scenario[response_key]["from_cache"])
+            make_request("GET", f"{server.url}/catalog")
+            response = data_store.scenario[response_key]
+            self.assertEqual(304, response["status"])
+            self.assertTrue(response["from_cache"])
+            self.assertEqual(b'{"items": [1, 2]}', response["body"])
+            self.assertEqual(["application/json"], response["header_index"]["content-type"])
+            add_header("Authorization", "Bearer other")
+            make_request("GET", f"{server.url}/catalog")
+        self.assertEqual(200, data_store.scenario[response_key]["status"])
+        self.assertFalse(data_store.scenario[response_key]["from_cache"])
+        self.assertNotIn("if-none-match", (name.lower() for name in server.requests[2][2]))
+
+    def test_make_request_records_not_modified_responses_as_sent(self):
+        beforescenario(self.app_context)
+
+        def catalog(handler):
+            if handler.headers.get("If-None-Match") == '"v2"':
+                return 304, {"ETag": '"v2"'}, b""
+            return 200, {"ETag": '"v2"'}, b'{"items": [3]}'
+
+        properties = {"http_cache": "true", "http_mode": "record", "http_cassette": f"{self.out_dir}/api_steps.cassette"}
+        with LocalServer({"/catalog": catalog}) as server, patch.dict(os.environ, properties):
+            make_request("GET", f"{server.url}/catalog")
+            make_request("GET", f"{server.url}/catalog")
+        self.assertTrue(data_store.scenario[response_key]["from_cache"])
+        with open(f"{self.out_dir}/api_steps.cassette", encoding="utf-8") as c:
+            recorded = [json.loads(line.split("\t", 1)[1]) for line in c]
+        self.assertEqual([200, 304], [entry["status"] for entry in recorded])
+        self.assertEqual("", recorded[1]["body"])
+
+    def test_load_test(self):
+        beforescenario(self.app_context)
+        add_header("X-Test", "load")
+        with LocalServer({"/ok": (200, {}, b"ok")}) as server, io.StringIO() as buf, contextlib.redirect_stdout(buf):
+            load_test("GET", f"{server.url}/ok", "20", "4")
+            load_test("GET", f"{server.url}/missing", "5", "2")
+            output = buf.getvalue()
+        self.assertEqual(25, len(server.requests))
+        self.assertTrue(all(r[2].get("X-Test") == "load" for r in server.requests[0:20]))
+        self.assertIn("Latency histogram", output)
+        stats = data_store.scenario[load_test_key]
+        self.assertEqual(5, stats["requests"])
+        self.assertEqual(100.0, stats["error_rate"])
+
+    def test_assert_load_test(self):
+        data_store.scenario[load_test_key] = {"p95": 150.0, "error_rate": 0.0, "throughput": 80.0}
+        assert_load_test("p95", "< 200ms")
+        assert_load_test("error_rate", "== 0%")
+        assert_load_test("throughput", ">= 50/s")
+        self.assertRaises(AssertionError, lambda: assert_load_test("p95", "< 100ms"))
+        self.assertRaises(AssertionError, lambda: assert_load_test("p42", "< 100ms"))
+
+    def test_poll_until_jsonpath_equals(self):
+        beforescenario(self.app_context)
+        states = iter((b'<html>Busy</html>', b'{"state": "running"}', b'{"state": "done"}'))
+        with patch.dict(os.environ, {"poll_initial_delay": "0.01"}),\
+                LocalServer({"/job": (200, {"Retry-After": "0"}, lambda handler: next(states))}) as server,\
+                io.StringIO() as buf, contextlib.redirect_stdout(buf):
+            poll_until_jsonpath_equals("GET", f"{server.url}/job", "$.state", '"done"', "5")
+        self.assertEqual(3, data_store.scenario[poll_key]["attempts"])
+        self.assertEqual(b'{"state": "done"}', data_store.scenario[response_key]["body"])
+
+    def test_poll_until_jsonpath_equals__times_out(self):
+        beforescenario(self.app_context)
+        responses = {"/job": (200, {}, b'{"state": "running"}')}
+        with patch.dict(os.environ, {"poll_initial_delay": "0.05"}), LocalServer(responses) as server:
+            self.assertRaises(
+                AssertionError, lambda: poll_until_jsonpath_equals("GET", f"{server.url}/job", "$.state", '"done"', "0.2")
+            )
+        poll = data_store.scenario[poll_key]
+        self.assertGreater(poll["attempts"], 1)
+        self.assertLess(poll["elapsed"], 0.5)
+
+    def test_assert_response_time(self):
+        data_store.scenario[response_key] = {'timings': {'ttfb': 80.0, 'total': 100.0}}
+        assert_response_time("< 200")
+        self.assertRaises(AssertionError, lambda: assert_response_time("< 50"))
+
     def test_assert_response_jsonpath_equals_with_json_stucture(self):
         json_str = '{"a": {"b": "value"}}'
         data_store.scenario[response_key] = {'body': json_str.encode()}
@@ -188,6 +591,24 @@ class TestApiSteps(unittest.TestCase):
             with self.subTest(jsonpath=jsonpath, json_type=json_type):
                 self.assertRaises(AssertionError, lambda: assert_response_jsonpath_type(jsonpath, json_type))
 
+    def test_assert_response_xpath_equals(self):
+        data_store.scenario[response_key] = {'body': b"<root>\n  <fox>\n    <jumps height='2'>fence</jumps>\n  </fox>\n</root>"}
+        assert_response_xpath_equals("/root/fox/jumps", "<jumps height='2'>fence</jumps>")
+        assert_response_xpath_equals("string(/root/fox/jumps)", "fence")
+        with patch('os.environ', {"xml_whitespace": "normalize"}):
+            assert_response_xpath_equals("/root/fox", "<fox><jumps height='2'>fence</jumps></fox>")
+        self.assertRaises(
+            AssertionError, lambda: assert_response_xpath_equals("/root/fox", "<fox><jumps height='2'>fence</jumps></fox>")
+        )
+
+    def test_assert_response_xpath_equals__reports_differences(self):
+        data_store.scenario[response_key] = {'body': b"<root><fox><jumps>fence</jumps></fox></root>"}
+        with patch('builtins.print') as mock_print:
+            self.assertRaises(
+                AssertionError, lambda: assert_response_xpath_equals("/root/fox", "<fox><jumps>wall</jumps></fox>")
+            )
+        self.assertIn("/root/fox/jumps/text(): expected 'wall', got 'fence'", str(mock_print.mock_calls))
+
     def test_assert_response_xpath_type(self):
         response = """
         <root attribute="attribute_value">
@@ -226,6 +647,72 @@ class TestApiSteps(unittest.TestCase):
             with self.subTest(xpath=xpath, xml_type=xml_type):
                 self.assertRaises(AssertionError, lambda: assert_response_xpath_type(xpath, xml_type))
 
+    def test_assert_body_matches(self):
+        data_store.scenario[response_key] = {
+            'body': b"id;name\n1;Gr\xc3\xbc\xc3\x9fe\n2;b\n", 'headers': [("Content-Type", "text/csv")]
+        }
+        assert_body_matches("^2;b$")
+        assert_body_matches("Grüße")
+        self.assertRaises(AssertionError, lambda: assert_body_matches("^3;"))
+
+    def test_save_body_regex(self):
+        data_store.scenario[response_key] = {'body': b"INFO started\nERROR code=42 reason=timeout\n"}
+        save_body_regex("code=(\\d+) reason=(?P<reason>\\w+)", "1", "code")
+        save_body_regex("code=(\\d+) reason=(?P<reason>\\w+)", "reason", "reason")
+        self.assertEqual("42", data_store.scenario["code"])
+        self.assertEqual("timeout", data_store.scenario["reason"])
+        self.assertRaises(AssertionError, lambda: save_body_regex("code=(\\d+)", "2", "code"))
+        self.assertRaises(AssertionError, lambda: save_body_regex("WARN (.*)", "1", "code"))
+        data_store.scenario[response_key] = {'body': "user=Jürgen\n".encode(), 'headers': [("Content-Type", "text/plain")]}
+        save_body_regex("user=(\\w+)", "1", "user")
+        self.assertEqual("Jürgen", data_store.scenario["user"])
+
+    def test_body_regex_on_memory_mapped_response(self):
+        with patch.dict(os.environ, {"response_history_bytes": "0", "body_mmap_threshold": "1024"}):
+            data_store.scenario[response_key] = {'body': b"x" * 2048 + b"\nend=1\n"}
+            save_response("big")
+            # saving another response moves the big body into a temporary file
+            data_store.scenario[response_key] = {'body': b"small"}
+            save_response("small")
+            use_response("big")
+        self.assertNotIsInstance(data_store.scenario[response_key]["body"], bytes)
+        save_body_regex("^end=(\\d)$", "1", "end")
+        self.assertEqual("1", data_store.scenario["end"])
+
+    def test_assert_response_matches_snapshot(self):
+        properties = {"snapshot_dir": f"{self.out_dir}/snapshots", "snapshot_ignore_paths": "$.updated"}
+        with patch.dict(os.environ, properties), patch('builtins.print') as mock_print:
+            data_store.scenario[response_key] = {'body': b'{"id": 1, "name": "a", "updated": "10:00"}'}
+            self.assertRaisesRegex(AssertionError, "snapshot_update=true", lambda: assert_response_matches_snapshot("user"))
+            with patch.dict(os.environ, {"snapshot_update": "true"}):
+                assert_response_matches_snapshot("user")
+            data_store.scenario[response_key] = {'body': b'{"id": 1, "name": "a", "updated": "11:00"}'}
+            assert_response_matches_snapshot("user")
+            data_store.scenario[response_key] = {'body': b'{"id": 1, "name": "b", "updated": "11:00"}'}
+            self.assertRaises(AssertionError, lambda: assert_response_matches_snapshot("user"))
+        self.assertIn('"name": "a"', str(mock_print.mock_calls))
+
+    def test_assert_response_matches_schema(self):
+        data_store.scenario[response_key] = {'body': '{"id": 1, "name": "a", "tags": ["b"]}'.encode()}
+        assert_response_matches_schema(f"{TEST_RESOURCES_DIR}/schema.json")
+
+    def test_assert_response_matches_schema__reports_all_violations(self):
+        data_store.scenario[response_key] = {'body': '{"id": "1", "tags": ["a", 2]}'.encode()}
+        with self.assertRaises(AssertionError) as ctx:
+            assert_response_matches_schema(f"{TEST_RESOURCES_DIR}/schema.json")
+        message = str(ctx.exception)
+        self.assertIn("#: 'name' is a required property", message)
+        self.assertIn("#/id: '1' is not of type 'integer'", message)
+        self.assertIn("#/tags/1: 2 is not of type 'string'", message)
+
+    def test_assert_response_matches_schema__caches_validator(self):
+        schema_file = f"{TEST_RESOURCES_DIR}/schema.json"
+        data_store.scenario[response_key] = {'body': '{"id": 1, "name": "a", "tags": []}'.encode()}
+        assert_response_matches_schema(schema_file)
+        validator = _schema_validators[schema_file][1]
+        assert_response_matches_schema(schema_file)
+        self.assertIs(validator, _schema_validators[schema_file][1])
+
     def test_save_file(self):
         body = b'abc'
         data_store.scenario.setdefault(response_key, {})['body'] = body
@@ -0,0 +1,131 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import asyncio
+import os
+import socket
+import unittest
+from http.cookiejar import CookieJar
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import Request
+
+from gauge_api_steps.async_engine import _read_body, close_engine, http_engine, start_request
+from tests.local_server import LocalServer
+
+
+class TestAsyncEngine(unittest.TestCase):
+
+    def tearDown(self):
+        close_engine()
+
+    def test_connections_are_kept_alive(self):
+        ports = []
+
+        def ok(handler):
+            ports.append(handler.client_address[1])
+            return 200, {"Content-Type": "text/plain"}, b"ok"
+
+        with LocalServer({"/ok": ok}, protocol_version="HTTP/1.1") as server:
+            responses = [start_request(Request(f"{server.url}/ok"), CookieJar(), False).result(5) for _ in range(3)]
+        self.assertEqual([(200, b"ok")] * 3, [(resp.status, resp.read()) for resp in responses])
+        self.assertEqual(3, len(ports))
+        self.assertEqual(1, len(set(ports)))
+        self.assertEqual({"dns", "connect", "ttfb", "download", "total"}, set(responses[0].timings.keys()))
+        self.assertEqual({"ttfb", "download", "total"}, set(responses[2].timings.keys()))
+
+    def test_post_body(self):
+        with LocalServer({"/users": (201, {}, b'{"id": 1}')}) as server:
+            req = Request(f"{server.url}/users", method="POST", headers={"Content-Type": "application/json"}, data=b'{"a": 1}')
+            resp = start_request(req, CookieJar(), False).result(5)
+        self.assertEqual(201, resp.status)
+        self.assertEqual(b'{"id": 1}', resp.read())
+        method, path, headers, body = server.requests[0]
+        self.assertEqual(("POST", "/users", b'{"a": 1}'), (method, path, body))
+        self.assertEqual("application/json", headers["Content-type"])
+        self.assertEqual("8", headers["Content-Length"])
+
+    def test_redirects_and_cookies(self):
+        responses = {
+            "/login": (303, {"Location": "/home", "Set-Cookie": "session=abc; Path=/"}, b""),
+            "/home": (200, {}, b"home"),
+        }
+        with LocalServer(responses) as server:
+            jar = CookieJar()
+            not_followed = start_request(Request(f"{server.url}/login", method="POST", data=b"user"), jar, False).result(5)
+            req = Request(f"{server.url}/login", method="POST", data=b"user")
+            followed = start_request(req, jar, True).result(5)
+        self.assertEqual(303, not_followed.status)
+        self.assertEqual(200, followed.status)
+        self.assertEqual(b"home", followed.read())
+        self.assertEqual({f"{server.url}/home": 1}, req.redirect_dict)
+        method, path, headers, body = server.requests[-1]
+        self.assertEqual(("GET", "/home", b""), (method, path, body))
+        self.assertEqual("session=abc", headers["Cookie"])
+
+    def test_redirect_loop_raises_http_error(self):
+        with LocalServer({"/loop": (302, {"Location": "/loop"}, b"loop")}) as server, self.assertRaises(HTTPError) as error:
+            start_request(Request(f"{server.url}/loop"), CookieJar(), True).result(5)
+        self.assertEqual(302, error.exception.code)
+        self.assertEqual(b"loop", error.exception.read())
+        self.assertIn("infinite loop", error.exception.reason)
+
+    def test_only_idempotent_requests_are_sent_again_after_the_connection_was_closed(self):
+        def drop(handler):
+            # the request has been received, but the connection is closed without a response
+            raise ConnectionAbortedError()
+
+        with LocalServer({"/ok": (200, {}, b"ok"), "/drop": drop}, protocol_version="HTTP/1.1") as server:
+            for method in ("POST", "PUT"):
+                start_request(Request(f"{server.url}/ok"), CookieJar(), False).result(5)
+                with self.assertRaises(ConnectionError):
+                    start_request(Request(f"{server.url}/drop", method=method, data=b"x"), CookieJar(), False).result(5)
+        sent = [method for method, path, _, _ in server.requests if path == "/drop"]
+        self.assertEqual(["POST", "PUT", "PUT"], sent)
+
+    def test_read_chunked_body(self):
+        async def read() -> tuple[bytes, bool]:
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"4\r\nWiki\r\n5;ext=1\r\npedia\r\n0\r\n\r\n")
+            reader.feed_eof()
+            return await _read_body(reader, "GET", "HTTP/1.1", 200, [("Transfer-Encoding", "chunked")])
+        self.assertEqual((b"Wikipedia", True), asyncio.run(read()))
+
+    def test_read_timeout_applies_to_each_read(self):
+        async def read(pause: float) -> tuple[bytes, bool]:
+            reader = asyncio.StreamReader()
+
+            async def feed() -> None:
+                for _ in range(4):
+                    await asyncio.sleep(pause)
+                    reader.feed_data(b"x" * 100)
+            feeding = asyncio.ensure_future(feed())
+            try:
+                return await _read_body(reader, "GET", "HTTP/1.1", 200, [("Content-Length", "400")], 0.25)
+            finally:
+                feeding.cancel()
+        self.assertEqual((b"x" * 400, True), asyncio.run(read(0.1)))
+        self.assertRaises(TimeoutError, lambda: asyncio.run(read(0.5)))
+
+    def test_connect_falls_back_to_other_addresses(self):
+        with LocalServer({"/": (200, {}, b"ok")}) as server:
+            port = int(server.url.rsplit(':', 1)[1])
+            addr_infos = [
+                (socket.AF_INET, socket.SOCK_STREAM, 6, '', ("256.0.0.1", port)),
+                (socket.AF_INET, socket.SOCK_STREAM, 6, '', ("127.0.0.1", port)),
+            ]
+            with patch("gauge_api_steps.async_engine.resolve_address", return_value=addr_infos):
+                resp = start_request(Request(f"{server.url}/"), CookieJar(), False).result()
+        self.assertEqual(b"ok", resp.read())
+
+    def test_http_engine(self):
+        with patch.dict(os.environ, {"http_engine": "asyncio"}):
+            self.assertEqual("asyncio", http_engine())
+        with patch.dict(os.environ, {"http_engine": "curl"}):
+            self.assertRaises(ValueError, http_engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gauge_api_steps.body import ResponseBody, response_body
+
+
+class TestBody(unittest.TestCase):
+
+    def test_charset_from_content_type(self):
+        params = [
+            (None, "utf-8"), ("application/json", "utf-8"), ("text/plain; charset=ISO-8859-1", "iso8859-1"),
+            ('text/plain; charset="utf-16"', "utf-16"), ("text/plain; charset=unknown", "utf-8"),
+        ]
+        for content_type, charset in params:
+            with self.subTest(content_type=content_type):
+                self.assertEqual(charset, ResponseBody(b"", content_type).charset)
+
+    def test_text_is_decoded_once(self):
+        body = ResponseBody("Grüße".encode("latin-1"), "text/plain; charset=latin-1")
+        self.assertEqual("Grüße", body.text)
+        self.assertIs(body.text, body.text)
+
+    def test_json_and_xml_are_parsed_once(self):
+        body = ResponseBody(b'{"a": [1, 2]}')
+        self.assertEqual({"a": [1, 2]}, body.json())
+        self.assertIs(body.json(), body.json())
+        xml = ResponseBody(b'<root xmlns="urn:x"><a>1</a></root>')
+        self.assertEqual("1", xml.xml().xpath("/root/a")[0].text)
+        self.assertIs(xml.xml(), xml.xml())
+
+    def test_preview(self):
+        body = ResponseBody(b"0123456789")
+        self.assertEqual("0123456789", body.preview(10))
+        self.assertEqual("01234... (10 bytes)", body.preview(5))
+        self.assertEqual("0123456789", body.preview(None))
+        with patch.dict(os.environ, {"body_preview_length": "3"}):
+            self.assertEqual("012... (10 bytes)", body.preview())
+        self.assertEqual("a�", ResponseBody(b"a\xff").preview())
+
+    def test_response_body_is_cached_until_the_body_changes(self):
+        response = {"body": b'{"a": 1}', "headers": [("Content-Type", "application/json; charset=utf-8")]}
+        body = response_body(response)
+        self.assertIs(body, response_body(response))
+        response["body"] = b'{"a": 2}'
+        self.assertEqual({"a": 2}, response_body(response).json())
+
+
+    def test_search_without_decoding(self):
+        body = ResponseBody(b"a;1\nb;2\n", "text/csv; charset=latin-1")
+        self.assertEqual(b"2", body.search("^b;(\\d)$").group(1))
+        self.assertIsNone(body.search("^c;"))
+        self.assertNotIn("text", body.__dict__)
+
+    def test_search_non_ascii(self):
+        body = ResponseBody("name=Jürgen\nä;2\n".encode(), "text/plain; charset=utf-8")
+        self.assertEqual("Jürgen", body.search("J\\w+").group())
+        self.assertEqual("Jürgen", body.search("J.rgen").group())
+        self.assertEqual("ü", body.search("[üö]").group())
+        self.assertEqual("2", body.search("^ä;(\\d)$").group(1))
+        latin = ResponseBody("Preis: 5 Euro, Größe: M".encode("latin-1"), "text/plain; charset=ISO-8859-1")
+        self.assertIsNone(latin.search("€"))
+        self.assertEqual("Größe", latin.search("Gr..e").group())
+        utf16 = ResponseBody("id=1\nname=Jürgen".encode("utf-16"), "text/plain; charset=utf-16")
+        self.assertEqual("1", utf16.search("^id=(\\d)$").group(1))
+        self.assertEqual("Jürgen", utf16.search("^name=(.+)$").group(1))
+
+    def test_memory_mapped_body(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'{"a": [1, 2]}')
+            f.flush()
+            body = ResponseBody(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            self.assertEqual({"a": [1, 2]}, body.json())
+            self.assertEqual('{"a"... (13 bytes)', body.preview(4))
+            self.assertIsNotNone(body.search(r"\[1, 2\]"))
+            body.raw.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.request import Request
+
+from gauge_api_steps.cassette import cassette_key, http_mode, record_response, replay_response
+from tests import TEST_DIR, TEST_OUT_DIR
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        os.makedirs(TEST_OUT_DIR, exist_ok=True)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.cassette_file = f"{self.out_dir}/cassettes/test.cassette"
+        self.env = dict(os.environ)
+        os.environ["GAUGE_PROJECT_ROOT"] = TEST_DIR
+        os.environ["http_cassette"] = self.cassette_file
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.env)
+        shutil.rmtree(self.out_dir)
+
+    def test_http_mode(self):
+        os.environ.pop("http_mode", None)
+        self.assertEqual("passthrough", http_mode())
+        os.environ["http_mode"] = "Replay"
+        self.assertEqual("replay", http_mode())
+        os.environ["http_mode"] = "rewind"
+        self.assertRaises(ValueError, http_mode)
+
+    def test_cassette_key_is_normalized(self):
+        key1 = cassette_key("get", "HTTP://Example.com/a?b=2&a=1", None)
+        key2 = cassette_key("GET", "http://example.com/a?a=1&b=2", b"")
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, cassette_key("GET", "http://example.com/a?a=1&b=2", b"body"))
+
+    def test_record_and_replay(self):
+        os.environ["mask_secrets"] = "password"
+        os.environ["password"] = "s3cr3t"
+        req = Request("http://localhost/login", method="POST", data=b'{"user": "u"}')
+        record_response(req, 200, "OK", [("Set-Cookie", "session=s3cr3t")], b'{"token": "s3cr3t"}')
+        record_response(Request("http://localhost/other"), 404, "Not Found", [], b'')
+        with open(self.cassette_file) as c:
+            self.assertNotIn("s3cr3t", c.read())
+        resp = replay_response(Request("http://localhost/login", method="POST", data=b'{"user": "u"}'))
+        self.assertEqual(200, resp.status)
+        self.assertEqual([("Set-Cookie", "session=********")], resp.getheaders())
+        self.assertEqual(b'{"token": "********"}', resp.read())
+        self.assertEqual(404, replay_response(Request("http://localhost/other")).status)
+
+    def test_cookie_values_are_masked(self):
+        record_response(Request("http://localhost/login"), 200, "OK", [("Set-Cookie", "sid=SESSION; Path=/; HttpOnly")], b'')
+        with open(self.cassette_file) as c:
+            self.assertNotIn("SESSION", c.read())
+        resp = replay_response(Request("http://localhost/login"))
+        self.assertEqual([("Set-Cookie", "sid=********; Path=/; HttpOnly")], resp.getheaders())
+
+    def test_secrets_in_urls_are_masked(self):
+        os.environ["mask_secrets"] = "api_key"
+        os.environ["api_key"] = "T0PS3CR3T"
+        self.assertEqual("GET http://h/x?key=********", cassette_key("GET", "http://h/x?key=T0PS3CR3T", None).rsplit(' ', 1)[0])
+        record_response(Request("http://h/x?key=T0PS3CR3T"), 200, "OK", [], b'a')
+        with open(self.cassette_file) as c:
+            self.assertNotIn("T0PS3CR3T", c.read())
+        self.assertEqual(b'a', replay_response(Request("http://h/x?key=T0PS3CR3T")).read())
+
+    def test_replay_fails_without_recording(self):
+        record_response(Request("http://localhost/a"), 200, "OK", [], b'a')
+        self.assertRaises(AssertionError, lambda: replay_response(Request("http://localhost/b")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import gzip
+import os
+import unittest
+import zlib
+from unittest.mock import patch
+
+from gauge_api_steps import compression
+from gauge_api_steps.compression import CompressedBody, content_encoding
+from gauge_api_steps.multipart import MultipartBody
+from tests import TEST_RESOURCES_DIR
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_gzip(self):
+        raw = b'{"items": [' + b'{"name": "fox"},' * 100000 + b'{}]}'
+        body = CompressedBody(raw, "gzip")
+        self.assertEqual(raw, gzip.decompress(b''.join(body)))
+        self.assertEqual(len(b''.join(body)), len(body))
+        self.assertEqual(len(raw), body.raw_length)
+        self.assertGreater(len(body.chunks), 1)
+        self.assertLess(len(body) * 10, len(raw))
+        self.assertEqual(f"{len(raw)} bytes compressed with gzip to {len(body)} bytes", str(body))
+
+    def test_deflate_with_level(self):
+        raw = b"abc" * 1000
+        with patch.dict(os.environ, {"request_compression_level": "1"}):
+            body = CompressedBody(raw, "Deflate")
+        self.assertEqual("deflate", body.encoding)
+        self.assertEqual(raw, zlib.decompress(b''.join(body)))
+
+    def test_multipart_body(self):
+        multipart = MultipartBody([("upload", None, f"{TEST_RESOURCES_DIR}/file.txt")], boundary="b")
+        body = CompressedBody(multipart, "gzip")
+        self.assertEqual(b''.join(multipart), gzip.decompress(b''.join(body)))
+        self.assertEqual(multipart.digest(), body.digest())
+
+    def test_content_encoding(self):
+        self.assertEqual("gzip", content_encoding(" GZIP "))
+        self.assertRaises(AssertionError, lambda: content_encoding("lzma"))
+        with patch.object(compression, "brotli", None), patch.object(compression, "zstandard", None):
+            self.assertRaises(AssertionError, lambda: content_encoding("brotli"))
+            self.assertRaises(AssertionError, lambda: content_encoding("zstd"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from http.cookiejar import Cookie, CookieJar, LWPCookieJar
+from unittest.mock import patch
+
+from getgauge.python import data_store
+
+from gauge_api_steps.cookies import cookie_file, load_cookies, persisted_cookies_key, save_cookies
+from tests import TEST_OUT_DIR
+
+
+def _cookie(name: str, value: str, expires: int | None = None) -> Cookie:
+    return Cookie(
+        0, name, value, None, False, "example.com", False, False, "/", True, False, expires, expires is None, None, None, {}
+    )
+
+
+class TestCookies(unittest.TestCase):
+
+    def setUp(self):
+        data_store.scenario.clear()
+        if not os.path.exists(TEST_OUT_DIR):
+            os.mkdir(TEST_OUT_DIR)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.session_file = f"{self.out_dir}/cookie_session.properties"
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def _load(self) -> CookieJar:
+        data_store.scenario.clear()
+        with patch.dict(os.environ, {"persist_cookies": "true"}):
+            return load_cookies(self.session_file)
+
+    def test_cookie_file(self):
+        self.assertEqual("env/default/session.cookies", cookie_file("env/default/session.properties"))
+
+    def test_cookies_are_not_persisted_by_default(self):
+        with patch.dict(os.environ, {"persist_cookies": "false"}):
+            cookie_jar = load_cookies(self.session_file)
+            cookie_jar.set_cookie(_cookie("session", "abc"))
+            save_cookies(cookie_jar)
+        self.assertNotIsInstance(cookie_jar, LWPCookieJar)
+        self.assertFalse(os.path.exists(cookie_file(self.session_file)))
+
+    def test_cookies_are_persisted(self):
+        cookie_jar = self._load()
+        cookie_jar.set_cookie(_cookie("session", "abc"))
+        cookie_jar.set_cookie(_cookie("remember", "me", int(time.time()) + 3600))
+        cookie_jar.set_cookie(_cookie("expired", "x", int(time.time()) - 1))
+        save_cookies(cookie_jar)
+        loaded = self._load()
+        self.assertEqual({"session": "abc", "remember": "me"}, {c.name: c.value for c in loaded})
+
+    def test_cookies_of_parallel_scenarios_are_merged(self):
+        cookie_jar = self._load()
+        cookie_jar.set_cookie(_cookie("a", "1"))
+        cookie_jar.set_cookie(_cookie("b", "1"))
+        save_cookies(cookie_jar)
+        first = self._load()
+        first_loaded = data_store.scenario[persisted_cookies_key]
+        second = self._load()
+        first.set_cookie(_cookie("c", "1"))
+        first.clear("example.com", "/", "a")
+        second.set_cookie(_cookie("b", "2"))
+        save_cookies(second)
+        data_store.scenario[persisted_cookies_key] = first_loaded
+        save_cookies(first)
+        loaded = self._load()
+        self.assertEqual({"b": "2", "c": "1"}, {c.name: c.value for c in loaded})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,10 +4,15 @@
 #
 
 import os
+import shutil
+import tempfile
 import unittest
 
-from gauge_api_steps.file_util import assert_file_is_in_project
-from tests import TEST_DIR, TEST_RESOURCES_DIR
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from gauge_api_steps import file_util
+from gauge_api_steps.file_util import append_line, assert_file_is_in_project, close_appended, flush_appended
+from tests import TEST_DIR, TEST_OUT_DIR, TEST_RESOURCES_DIR
 
 
 class TestFileUtil(unittest.TestCase):
@@ -22,6 +27,70 @@ class TestFileUtil(unittest.TestCase):
     def test_assert_file_is_in_project_fails(self):
         self.assertRaises(AssertionError, lambda: assert_file_is_in_project("/root/file.txt"))
 
+    def _out_file(self, name: str) -> str:
+        if not os.path.exists(TEST_OUT_DIR):
+            os.mkdir(TEST_OUT_DIR)
+        out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.addCleanup(shutil.rmtree, out_dir)
+        # appended files stay open, they are closed before they are removed
+        self.addCleanup(close_appended)
+        return f"{out_dir}/{name}"
+
+    def test_append_line_is_buffered(self):
+        out_file = self._out_file("buffered.txt")
+        with patch("gauge_api_steps.file_util.assert_file_is_in_project", wraps=assert_file_is_in_project) as mock_assert:
+            append_line(out_file, "a")
+            append_line(out_file, "b")
+        self.assertEqual(1, mock_assert.call_count)
+        self.assertFalse(os.path.isfile(out_file))
+        flush_appended(out_file)
+        flush_appended(out_file)
+        with open(out_file) as f:
+            self.assertEqual("a\nb\n", f.read())
+
+    def test_append_line_writes_full_buffers(self):
+        out_file = self._out_file("full.txt")
+        with patch.object(file_util, "_max_buffered_chars", 4):
+            append_line(out_file, "a")
+            append_line(out_file, "b")
+            with open(out_file) as f:
+                self.assertEqual("a\nb\n", f.read())
+            append_line(out_file, "c")
+        flush_appended()
+        with open(out_file) as f:
+            self.assertEqual("a\nb\nc\n", f.read())
+
+    def test_parallel_appends_are_not_lost(self):
+        out_file = self._out_file("parallel.txt")
+        with patch.object(file_util, "_max_buffered_chars", 100), ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda i: append_line(out_file, f"line {i:04d}"), range(2000)))
+        flush_appended()
+        with open(out_file) as f:
+            self.assertEqual([f"line {i:04d}" for i in range(2000)], sorted(f.read().splitlines()))
+
+    def test_appended_files_stay_open(self):
+        out_file = self._out_file("open.txt")
+        with patch("builtins.open", wraps=open) as mock_open:
+            append_line(out_file, "a")
+            flush_appended()
+            append_line(out_file, "b")
+            flush_appended()
+        self.assertEqual(1, mock_open.call_count)
+        os.remove(out_file)
+        append_line(out_file, "c")
+        flush_appended()
+        with open(out_file) as f:
+            self.assertEqual("c\n", f.read())
+
+    def test_assert_file_is_in_project_writes_buffered_lines(self):
+        out_file = self._out_file("read.txt")
+        append_line(out_file, "a")
+        with open(assert_file_is_in_project(out_file)) as f:
+            self.assertEqual("a\n", f.read())
+
+    def test_append_line_fails_outside_of_the_project(self):
+        self.assertRaises(AssertionError, lambda: append_line("/root/file.txt", "a"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import mmap
+import os
+import unittest
+from unittest.mock import patch
+
+from getgauge.python import data_store
+
+from gauge_api_steps.history import ResponseHistory, clear_response_history, history_key, remember_response, saved_response
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        data_store.scenario.clear()
+
+    def test_history_size_is_bounded(self):
+        history = ResponseHistory(2, 1000)
+        for body in (b"a", b"b", b"c"):
+            history.add({"body": body})
+        self.assertEqual([b"b", b"c"], [e.response["body"] for e in history.responses])
+        self.assertEqual(b"b", history.get("~1")["body"])
+        self.assertRaises(AssertionError, lambda: history.get("~2"))
+
+    def test_saved_responses_outlive_the_history(self):
+        history = ResponseHistory(1, 1000)
+        first = {"body": b"first", "status": 200}
+        history.add(first)
+        history.save("first", first)
+        history.add({"body": b"second"})
+        self.assertEqual({"body": b"first", "status": 200}, history.get("first"))
+        self.assertRaises(AssertionError, lambda: history.get("unknown"))
+
+    def test_bodies_over_budget_are_spilled(self):
+        history = ResponseHistory(10, 5)
+        responses = [{"body": body} for body in (b"aaaa", b"bbbb", b"cccc")]
+        for response in responses:
+            history.add(response)
+        entries = list(history.responses)
+        self.assertIsNotNone(entries[0].body_file)
+        self.assertNotIn("body", entries[0].response)
+        self.assertEqual(b"bbbb", entries[1].response["body"])
+        self.assertEqual(b"cccc", entries[2].response["body"])
+        self.assertEqual(b"aaaa", history.get("~2")["body"])
+        body_file = entries[0].body_file
+        history.clear()
+        self.assertFalse(os.path.exists(body_file))
+
+    def test_spilling_keeps_the_responses_of_the_scenario(self):
+        history = ResponseHistory(10, 0)
+        responses = [{"body": body, "body_view": body.decode()} for body in (b"a", b"b")]
+        for response in responses:
+            history.add(response)
+        history.save("first", responses[0])
+        self.assertEqual({"body": b"a", "body_view": "a"}, responses[0])
+        self.assertEqual(b"a", history.get("first")["body"])
+        self.assertNotIn("body_view", history.get("first"))
+        history.clear()
+
+    def test_evicted_body_files_are_removed(self):
+        history = ResponseHistory(2, 0)
+        for body in (b"a", b"b", b"c"):
+            history.add({"body": body})
+        entries = list(history.responses)
+        body_file = entries[0].body_file
+        self.assertIsNone(entries[1].body_file)
+        history.add({"body": b"d"})
+        self.assertFalse(os.path.exists(body_file))
+        history.clear()
+
+    def test_mapped_bodies_are_closed_before_the_file_is_removed(self):
+        history = ResponseHistory(1, 0)
+        response = {"body": b"x" * 64}
+        history.add(response)
+        history.save("large", response)
+        history.add({"body": b"y"})
+        with patch.dict(os.environ, {"body_mmap_threshold": "16"}):
+            body = history.get("large")["body"]
+        self.assertIsInstance(body, mmap.mmap)
+        self.assertEqual(b"x" * 64, body[:])
+        history.clear()
+        self.assertTrue(body.closed)
+
+    def test_scenario_history(self):
+        with patch.dict(os.environ, {"response_history_size": "3", "response_history_bytes": "100"}):
+            remember_response({"body": b"a"})
+            remember_response({"body": b"b"})
+        self.assertEqual(3, data_store.scenario[history_key].max_responses)
+        self.assertEqual(b"a", saved_response("~1")["body"])
+        clear_response_history()
+        self.assertNotIn(history_key, data_store.scenario)
+
+
+if __name__ == '__main__':
+    unittest.main()
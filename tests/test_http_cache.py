@@ -0,0 +1,65 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import unittest
+from unittest.mock import patch
+from urllib.request import Request
+
+from gauge_api_steps.http_cache import ConditionalRequestHandler, _entries, cache_response, cached_response
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        _entries.clear()
+
+    def test_conditional_request_handler(self):
+        cache_response(Request("http://localhost/a"), [("ETag", '"v1"'), ("Last-Modified", "Wed, 21 Oct 2015 07:28:00 GMT")], b"a")
+        handler = ConditionalRequestHandler()
+        with patch.dict(os.environ, {"http_cache": "true"}):
+            req = handler.http_request(Request("http://localhost/a"))
+            post = handler.http_request(Request("http://localhost/a", method="POST"))
+            other = handler.http_request(Request("http://localhost/b"))
+        self.assertEqual('"v1"', req.get_header("If-none-match"))
+        self.assertEqual("Wed, 21 Oct 2015 07:28:00 GMT", req.get_header("If-modified-since"))
+        self.assertFalse(post.has_header("If-none-match"))
+        self.assertFalse(other.has_header("If-none-match"))
+
+    def test_conditional_request_handler_disabled(self):
+        cache_response(Request("http://localhost/a"), [("ETag", '"v1"')], b"a")
+        with patch.dict(os.environ, {"http_cache": "false"}):
+            req = ConditionalRequestHandler().http_request(Request("http://localhost/a"))
+        self.assertFalse(req.has_header("If-none-match"))
+
+    def test_cache_response_without_validators(self):
+        cache_response(Request("http://localhost/a"), [("Content-Type", "text/plain")], b"a")
+        self.assertIsNone(cached_response(Request("http://localhost/a"), []))
+
+    def test_cached_response_updates_headers(self):
+        cache_response(Request("http://localhost/a"), [("ETag", '"v1"'), ("Date", "old"), ("Content-Type", "text/plain")], b"a")
+        headers, body = cached_response(Request("http://localhost/a"), [("Date", "new")])
+        self.assertEqual([("ETag", '"v1"'), ("Content-Type", "text/plain"), ("Date", "new")], headers)
+        self.assertEqual(b"a", body)
+
+    def test_cache_size_is_bounded(self):
+        with patch.dict(os.environ, {"http_cache_size": "2"}):
+            for path in ("a", "b", "c"):
+                cache_response(Request(f"http://localhost/{path}"), [("ETag", path)], path.encode())
+        self.assertEqual([("http://localhost/b", None), ("http://localhost/c", None)], list(_entries.keys()))
+
+    def test_responses_are_cached_per_authorization(self):
+        cache_response(Request("http://localhost/a", headers={"Authorization": "Bearer alice"}), [("ETag", '"alice"')], b"alice")
+        handler = ConditionalRequestHandler()
+        with patch.dict(os.environ, {"http_cache": "true"}):
+            alice = handler.http_request(Request("http://localhost/a", headers={"Authorization": "Bearer alice"}))
+            bob = handler.http_request(Request("http://localhost/a", headers={"Authorization": "Bearer bob"}))
+        self.assertEqual('"alice"', alice.get_header("If-none-match"))
+        self.assertFalse(bob.has_header("If-none-match"))
+        self.assertIsNone(cached_response(Request("http://localhost/a", headers={"Authorization": "Bearer bob"}), []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gauge_api_steps.http_trace import _TraceWriter, close_trace, trace_entry, trace_request
+from tests import TEST_DIR, TEST_OUT_DIR
+
+
+class TestHttpTrace(unittest.TestCase):
+
+    def setUp(self):
+        os.environ["GAUGE_PROJECT_ROOT"] = TEST_DIR
+        os.makedirs(TEST_OUT_DIR, exist_ok=True)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def _entry(self, url: str) -> dict:
+        return trace_entry(
+            0.0, "GET", url, {"X-Api-Key": "key-s3cr3t"}, 0, 200, "OK", [("Content-Type", "text/plain")], 5,
+            {"dns": 1.0, "connect": 2.0, "ttfb": 3.0, "download": 4.0, "total": 10.0}, {}, False
+        )
+
+    def test_trace_ndjson(self):
+        trace_file = f"{self.out_dir}/traces/trace.ndjson"
+        with patch.dict(os.environ, {"trace_file": trace_file, "mask_secrets": "token", "token": "s3cr3t"}):
+            trace_request(self._entry("http://localhost/a?token=s3cr3t"))
+            trace_request(self._entry("http://localhost/b"))
+            self.assertEqual(0, close_trace())
+        with open(trace_file) as t:
+            entries = [json.loads(line) for line in t]
+        self.assertEqual(["http://localhost/a?token=********", "http://localhost/b"], [e["url"] for e in entries])
+        self.assertEqual("1970-01-01T00:00:00+00:00", entries[0]["started"])
+        self.assertEqual([["X-Api-Key", "key-********"]], entries[0]["request_headers"])
+
+    def test_trace_entry_redacts_credential_headers(self):
+        entry = trace_entry(
+            0.0, "GET", "http://localhost/a", {"Authorization": "Bearer s3cr3t", "Cookie": "sid=abc", "Accept": "*/*"}, 0,
+            200, "OK", [("Set-Cookie", "sid=def; Path=/"), ("Content-Type", "text/plain")], 5, {"total": 1.0}, {}, False
+        )
+        self.assertEqual(
+            [("Authorization", "********"), ("Cookie", "********"), ("Accept", "*/*")], entry["request_headers"]
+        )
+        self.assertEqual([("Set-Cookie", "********"), ("Content-Type", "text/plain")], entry["response_headers"])
+        with patch.dict(os.environ, {"trace_redacted_headers": "Accept"}):
+            entry = trace_entry(
+                0.0, "GET", "http://localhost/a", {"Cookie": "sid=abc", "Accept": "*/*"}, 0,
+                200, "OK", [], 5, {"total": 1.0}, {}, False
+            )
+        self.assertEqual([("Cookie", "sid=abc"), ("Accept", "********")], entry["request_headers"])
+
+    def test_trace_har(self):
+        trace_file = f"{self.out_dir}/traces/trace-{os.getpid()}.har"
+        with patch.dict(os.environ, {"trace_file": f"{self.out_dir}/traces/trace.har"}):
+            trace_request(self._entry("http://localhost/a"))
+            trace_request(self._entry("http://localhost/b"))
+            close_trace()
+        self.assertFalse(os.path.exists(f"{trace_file}.ndjson"))
+        with open(trace_file) as t:
+            har = json.load(t)
+        self.assertEqual("1.2", har["log"]["version"])
+        self.assertEqual(2, len(har["log"]["entries"]))
+        entry = har["log"]["entries"][0]
+        self.assertEqual("http://localhost/a", entry["request"]["url"])
+        self.assertEqual(200, entry["response"]["status"])
+        self.assertEqual("text/plain", entry["response"]["content"]["mimeType"])
+        self.assertEqual(3.0, entry["timings"]["wait"])
+        self.assertEqual(10.0, entry["time"])
+
+    def test_trace_writer_drops_entries_when_full(self):
+        writer = _TraceWriter(f"{self.out_dir}/traces/unused.ndjson", 2)
+        for path in ("a", "b", "c"):
+            writer.submit(self._entry(f"http://localhost/{path}"))
+        self.assertEqual(1, writer.dropped)
+
+
+if __name__ == '__main__':
+    unittest.main()
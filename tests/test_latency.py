@@ -0,0 +1,62 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import unittest
+
+from getgauge.python import data_store
+
+from gauge_api_steps.latency import (
+    latency_histogram,
+    latency_stats,
+    latency_summary,
+    percentile,
+    record_latency,
+    scenario_latencies,
+)
+
+
+class TestLatency(unittest.TestCase):
+
+    def setUp(self):
+        data_store.scenario.clear()
+
+    def test_percentile(self):
+        ordered = [float(i) for i in range(1, 101)]
+        self.assertEqual(50.0, percentile(ordered, 50))
+        self.assertEqual(95.0, percentile(ordered, 95))
+        self.assertEqual(100.0, percentile(ordered, 100))
+        self.assertEqual(1.0, percentile(ordered, 0))
+        self.assertEqual(0.0, percentile([], 50))
+
+    def test_record_latency(self):
+        record_latency("GET ${url}", 3.0)
+        record_latency("GET ${url}", 1.0)
+        self.assertEqual({"GET ${url}": [3.0, 1.0]}, scenario_latencies())
+
+    def test_latency_summary(self):
+        summary = latency_summary({"GET ${url}": [3.0, 1.0, 2.0]})
+        self.assertEqual("Latency summary (ms):\n    GET ${url}: n=3 p50=2.0 p95=3.0 p99=3.0 max=3.0", summary)
+
+    def test_latency_stats(self):
+        stats = latency_stats([10.0, 30.0, 20.0, 40.0], 1, 2.0)
+        self.assertEqual(4, stats["requests"])
+        self.assertEqual(25.0, stats["error_rate"])
+        self.assertEqual(2.0, stats["throughput"])
+        self.assertEqual(10.0, stats["min"])
+        self.assertEqual(25.0, stats["mean"])
+        self.assertEqual(20.0, stats["p50"])
+        self.assertEqual(40.0, stats["p95"])
+
+    def test_latency_histogram(self):
+        histogram = latency_histogram([0.5, 3.0, 4.0, 20000.0], width=4)
+        self.assertEqual(
+            "        <= 1 ms       1 ##\n"
+            "        <= 5 ms       2 ####\n"
+            "     > 10000 ms       1 ##",
+            histogram)
+
+
+if __name__ == '__main__':
+    unittest.main()
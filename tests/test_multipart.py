@@ -0,0 +1,35 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import unittest
+
+from gauge_api_steps.multipart import MultipartBody
+from tests import TEST_RESOURCES_DIR
+
+
+class TestMultipart(unittest.TestCase):
+
+    def test_multipart_body(self):
+        body = MultipartBody([("title", "Fox", None), ('up"load', None, f"{TEST_RESOURCES_DIR}/file.txt")], boundary="b")
+        expected = (
+            b'--b\r\nContent-Disposition: form-data; name="title"\r\n\r\nFox\r\n'
+            b'--b\r\nContent-Disposition: form-data; name="up%22load"; filename="file.txt"\r\nContent-Type: text/plain\r\n\r\n'
+            b'Test file\n\r\n'
+            b'--b--\r\n'
+        )
+        self.assertEqual(expected, b''.join(body))
+        self.assertEqual(expected, b''.join(body))
+        self.assertEqual(len(expected), len(body))
+        self.assertEqual("multipart/form-data; boundary=b", body.content_type)
+
+    def test_digest_does_not_depend_on_the_boundary(self):
+        parts = [("title", "Fox", None), ("upload", None, f"{TEST_RESOURCES_DIR}/file.txt")]
+        self.assertNotEqual(MultipartBody(parts).boundary, MultipartBody(parts).boundary)
+        self.assertEqual(MultipartBody(parts).digest(), MultipartBody(parts).digest())
+        self.assertNotEqual(MultipartBody(parts).digest(), MultipartBody(parts[0:1]).digest())
+
+
+if __name__ == '__main__':
+    unittest.main()
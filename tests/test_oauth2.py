@@ -0,0 +1,115 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from gauge_api_steps import oauth2
+from gauge_api_steps.oauth2 import client_credentials_token, mask_tokens, token_cache_file
+from tests import TEST_OUT_DIR
+from tests.local_server import LocalServer
+
+
+def _token_response(expires_in: int = 3600, delay: float = 0):
+    def respond(handler):
+        time.sleep(delay)
+        return 200, {"Content-Type": "application/json"}, json.dumps({"access_token": "t1", "expires_in": expires_in}).encode()
+    return respond
+
+
+def _send(req: Request) -> tuple[int, bytes]:
+    try:
+        with urlopen(req) as resp:
+            return resp.status, resp.read()
+    except HTTPError as e:
+        with e:
+            return e.code, e.read()
+
+
+class TestOAuth2(unittest.TestCase):
+
+    def setUp(self):
+        oauth2._tokens.clear()
+        if not os.path.exists(TEST_OUT_DIR):
+            os.mkdir(TEST_OUT_DIR)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.cache_file = f"{self.out_dir}/oauth2.tokens"
+        self.env = patch.dict(
+            os.environ, {"oauth2_client_id": "client", "oauth2_client_secret": "s3cret", "oauth2_scope": "read write"}
+        )
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        oauth2._tokens.clear()
+        shutil.rmtree(self.out_dir)
+
+    def test_token_cache_file(self):
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": "/cache"}):
+            self.assertEqual("/cache/gauge-api-steps/oauth2.tokens", token_cache_file())
+            with patch.dict(os.environ, {"oauth2_token_cache": "tokens.json"}):
+                self.assertEqual("tokens.json", token_cache_file())
+
+    def test_token_is_requested_once(self):
+        with LocalServer({"/token": _token_response()}) as server:
+            token, expires_at = client_credentials_token(f"{server.url}/token", self.cache_file, _send)
+            self.assertEqual("t1", client_credentials_token(f"{server.url}/token", self.cache_file, _send)[0])
+            # another runner reads the token from the cache file
+            oauth2._tokens.clear()
+            self.assertEqual("t1", client_credentials_token(f"{server.url}/token", self.cache_file, _send)[0])
+        self.assertEqual("t1", token)
+        self.assertAlmostEqual(time.time() + 3600, expires_at, delta=5)
+        self.assertEqual(1, len(server.requests))
+        method, _, headers, body = server.requests[0]
+        self.assertEqual("POST", method)
+        self.assertEqual("Basic Y2xpZW50OnMzY3JldA==", headers["Authorization"])
+        self.assertEqual(b"grant_type=client_credentials&scope=read+write", body)
+        with open(self.cache_file) as f:
+            self.assertNotIn("client", f.read())
+
+    def test_token_is_refreshed_before_expiry(self):
+        responses = {"/token": _token_response(expires_in=20)}
+        with LocalServer(responses) as server, patch.dict(os.environ, {"oauth2_expiry_margin": "30"}):
+            client_credentials_token(f"{server.url}/token", self.cache_file, _send)
+            client_credentials_token(f"{server.url}/token", self.cache_file, _send)
+        self.assertEqual(2, len(server.requests))
+
+    def test_concurrent_refresh_is_a_single_flight(self):
+        with LocalServer({"/token": _token_response(delay=0.2)}) as server, ThreadPoolExecutor(8) as executor:
+            token_url = f"{server.url}/token"
+            tokens = list(executor.map(lambda _: client_credentials_token(token_url, self.cache_file, _send)[0], range(8)))
+        self.assertEqual(["t1"] * 8, tokens)
+        self.assertEqual(1, len(server.requests))
+
+    def test_failed_token_request(self):
+        with LocalServer({"/token": (401, {}, b"invalid_client")}) as server, self.assertRaises(AssertionError) as ctx:
+            client_credentials_token(f"{server.url}/token", self.cache_file, _send)
+        self.assertIn("status 401: invalid_client", str(ctx.exception))
+
+    def test_mask_tokens(self):
+        body = b'{"access_token": "t1", "refresh_token": "r1", "token_type": "Bearer", "expires_in": 60}'
+        self.assertEqual(
+            {"access_token": "********", "refresh_token": "********", "token_type": "Bearer", "expires_in": 60},
+            json.loads(mask_tokens(body))
+        )
+        self.assertEqual(b"invalid_client", mask_tokens(b"invalid_client"))
+
+    def test_credentials_are_required(self):
+        with patch.dict(os.environ, {"oauth2_client_secret": ""}):
+            self.assertRaises(
+                AssertionError, lambda: client_credentials_token("http://localhost/token", self.cache_file, _send)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gauge_api_steps import profiling
+from gauge_api_steps.profiling import (
+    hot_spot_table,
+    profiled,
+    start_profiling,
+    step_finished,
+    step_started,
+    stop_profiling,
+    write_profile_report,
+)
+
+
+@profiled
+def _profiled_function(value: int) -> int:
+    return value * 2
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        profiling._timings.clear()
+
+    def tearDown(self):
+        with patch.dict(os.environ, {"profile_steps": "false"}):
+            start_profiling()
+        profiling._timings.clear()
+
+    def test_profiled_disabled(self):
+        with patch.dict(os.environ, {"profile_steps": "false"}):
+            start_profiling()
+        self.assertEqual(4, _profiled_function(2))
+        self.assertEqual({}, profiling._timings)
+
+    def test_profiled(self):
+        with patch.dict(os.environ, {"profile_steps": "true"}):
+            start_profiling()
+        _profiled_function(1)
+        _profiled_function(2)
+        step_started()
+        step_finished("Print \"a\"")
+        self.assertEqual(2, profiling._timings["test_profiling._profiled_function"][0])
+        table = hot_spot_table()
+        self.assertTrue(table.startswith("Profile hot spots (ms):"))
+        self.assertIn("test_profiling._profiled_function", table)
+        self.assertIn("step: Print \"a\"", table)
+
+    def test_write_profile_report(self):
+        with patch.dict(os.environ, {"profile_steps": "true"}):
+            start_profiling()
+        _profiled_function(1)
+        with tempfile.TemporaryDirectory() as out_dir:
+            report_file = f"{out_dir}/profile/report.json"
+            write_profile_report(report_file)
+            with open(report_file) as r:
+                report = json.load(r)
+        self.assertEqual(1, report["test_profiling._profiled_function"]["calls"])
+
+    def test_stop_profiling_reports_cprofile_and_tracemalloc(self):
+        with patch.dict(os.environ, {"profile_steps": "true", "profile_cprofile": "true", "profile_tracemalloc": "true"}):
+            start_profiling()
+        _profiled_function(1)
+        reports = stop_profiling()
+        self.assertEqual(2, len(reports))
+        self.assertTrue(reports[0].startswith("cProfile of the scenario"))
+        self.assertTrue(reports[1].startswith("Memory allocations of the scenario"))
+        self.assertEqual([], stop_profiling())
+
+
+if __name__ == '__main__':
+    unittest.main()
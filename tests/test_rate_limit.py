@@ -0,0 +1,71 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gauge_api_steps import rate_limit
+from gauge_api_steps.rate_limit import acquire_rate_limit, adapt_rate, host_rate_limit
+from tests import TEST_OUT_DIR
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        rate_limit._current_rates.clear()
+        if not os.path.exists(TEST_OUT_DIR):
+            os.mkdir(TEST_OUT_DIR)
+        self.out_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.state_file = f"{self.out_dir}/rate_limits.json"
+        self.env = patch.dict(os.environ, {"rate_limit_state_file": self.state_file, "rate_limit.api.test": "10/s"})
+        self.env.start()
+        # time does not pass while waiting
+        self.sleep = patch('gauge_api_steps.rate_limit.time.sleep')
+        self.sleep.start()
+
+    def tearDown(self):
+        self.sleep.stop()
+        self.env.stop()
+        rate_limit._current_rates.clear()
+        shutil.rmtree(self.out_dir)
+
+    def _waits(self, count: int) -> list[float]:
+        return [round(acquire_rate_limit("https://api.test/items"), 1) for _ in range(count)]
+
+    def test_host_rate_limit(self):
+        with patch.dict(os.environ, {"rate_limit.localhost:8080": "120/min", "rate_limit.other": "fast"}):
+            self.assertEqual(("api.test", 10.0), host_rate_limit("https://user@api.test/items"))
+            self.assertEqual(("localhost:8080", 2.0), host_rate_limit("http://localhost:8080/"))
+            self.assertIsNone(host_rate_limit("http://localhost:8081/"))
+            self.assertRaises(ValueError, lambda: host_rate_limit("http://other/"))
+
+    def test_hosts_without_rate_limit_are_not_tracked(self):
+        self.assertEqual(0.0, acquire_rate_limit("https://example.com/"))
+        adapt_rate("https://example.com/", 429, [("Retry-After", "1")])
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def test_requests_are_paced_after_a_burst(self):
+        self.assertEqual([0.0] * 10 + [0.1, 0.2, 0.3], self._waits(13))
+
+    def test_too_many_requests_halve_the_rate_and_pause(self):
+        adapt_rate("https://api.test/items", 429, [("Retry-After", "2")])
+        self.assertEqual([2.0, 2.2, 2.4], self._waits(3))
+        with open(self.state_file) as f:
+            self.assertEqual(5.0, json.load(f)["api.test"]["rate"])
+
+    def test_successful_responses_increase_the_rate(self):
+        adapt_rate("https://api.test/items", 429, [])
+        adapt_rate("https://api.test/items", 200, [])
+        adapt_rate("https://api.test/items", 200, [])
+        with open(self.state_file) as f:
+            self.assertAlmostEqual(5.2, json.load(f)["api.test"]["rate"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,9 @@ from getgauge.registry import MessagesStore
 from textwrap import dedent
 from unittest.mock import call, patch, Mock
 from urllib.request import Request
-from gauge_api_steps.reporting import print_and_report, report_request_info, report_response_info
+from gauge_api_steps.reporting import (
+    flush_step_report, print_and_report, report_request_info, report_response_info, start_step_report
+)
 
 
 class TestReporting(unittest.TestCase):
@@ -45,6 +47,31 @@ class TestReporting(unittest.TestCase):
         self.assertEqual([call(expected)], mock_print.mock_calls)
         self.assertEqual([expected.replace(' ', '&nbsp;')], MessagesStore.pending_messages())
 
+    def test_print_and_report__overlapping_secrets(self):
+        environ = {"mask_secrets": "short,long,empty", "short": "abc", "long": "abcdef", "empty": ""}
+        with patch('builtins.print') as mock_print, patch('os.environ', environ):
+            print_and_report("abcdef abc")
+        self.assertEqual([call("******** ********")], mock_print.mock_calls)
+
+    def test_print_and_report__step(self):
+        environ = {"replace_whitespace_in_console": "-", "mask_secrets": "sec", "sec": "aaa"}
+        with patch('builtins.print') as mock_print, patch('os.environ', environ):
+            start_step_report()
+            print_and_report("a b")
+            print_and_report("<aaa>")
+            self.assertEqual([], mock_print.mock_calls)
+            flush_step_report()
+            print_and_report("after")
+        self.assertEqual([call("a-b\n<********>"), call("after")], mock_print.mock_calls)
+        self.assertEqual(["a&nbsp;b\n&lt;********&gt;", "after"], MessagesStore.pending_messages())
+
+    def test_flush_step_report__nothing_reported(self):
+        with patch('builtins.print') as mock_print:
+            start_step_report()
+            flush_step_report()
+        mock_print.assert_not_called()
+        self.assertEqual([], MessagesStore.pending_messages())
+
     def test_report_request_info(self):
         req = Request(url="http://localhost", method="POST", headers={"Content-Type": "image/png"}, data=b"abc\ndef")
         with patch('builtins.print') as mock_print, patch('os.environ', {"report_request": "true"}):
@@ -0,0 +1,86 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gauge_api_steps.snapshot import compare_snapshot, normalize_snapshot
+from tests import TEST_DIR, TEST_OUT_DIR
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        os.environ["GAUGE_PROJECT_ROOT"] = TEST_DIR
+        os.makedirs(TEST_OUT_DIR, exist_ok=True)
+        self.snapshot_dir = tempfile.mkdtemp(dir=TEST_OUT_DIR)
+        self.env = patch.dict(os.environ, {"snapshot_dir": self.snapshot_dir})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_normalize_snapshot(self):
+        value = {"id": 7, "items": [{"created": "2024-01-01", "name": "a"}]}
+        with patch.dict(os.environ, {"snapshot_ignore_paths": "$.id, $..created"}):
+            normalized = normalize_snapshot(value)
+        self.assertEqual({"id": "<ignored>", "items": [{"created": "<ignored>", "name": "a"}]}, normalized)
+        self.assertEqual(7, value["id"])
+        self.assertIs(value, normalize_snapshot(value))
+
+    def test_snapshot_is_written_and_matched(self):
+        with patch.dict(os.environ, {"snapshot_update": "true"}):
+            self.assertEqual(("written", {"a": [1, "ü"]}), compare_snapshot("users/list", {"a": [1, "ü"]}))
+        with open(f"{self.snapshot_dir}/users/list.json") as s:
+            self.assertEqual('{\n    "a": [\n        1,\n        "ü"\n    ]\n}\n', s.read())
+        self.assertEqual("matched", compare_snapshot("users/list", {"a": [1, "ü"]})[0])
+        self.assertEqual(("mismatch", {"a": [1, "ü"]}), compare_snapshot("users/list", {"a": [2, "ü"]}))
+
+    def test_missing_snapshot_is_not_written(self):
+        self.assertEqual(("missing", None), compare_snapshot("user", {"a": 1}))
+        self.assertFalse(os.path.exists(f"{self.snapshot_dir}/user.json"))
+
+    def test_snapshot_is_loaded_only_if_the_hash_differs(self):
+        self._write("user", {"a": 1})
+        with patch("gauge_api_steps.snapshot.json.load") as mock_load:
+            self.assertEqual("matched", compare_snapshot("user", {"a": 1})[0])
+        mock_load.assert_not_called()
+
+    def test_edited_snapshot_is_compared(self):
+        self._write("user", {"name": "a"})
+        with open(f"{self.snapshot_dir}/user.json", 'w') as s:
+            json.dump({"name": "b"}, s)
+        self.assertEqual(("mismatch", {"name": "b"}), compare_snapshot("user", {"name": "a"}))
+
+    def test_edited_snapshot_updates_the_hash(self):
+        self._write("user", {"a": 1})
+        with open(f"{self.snapshot_dir}/user.json", 'w') as s:
+            json.dump({"a": 2}, s)
+        self.assertEqual("matched", compare_snapshot("user", {"a": 2})[0])
+        with patch("gauge_api_steps.snapshot.json.load") as mock_load:
+            self.assertEqual("matched", compare_snapshot("user", {"a": 2})[0])
+        mock_load.assert_not_called()
+
+    def test_snapshot_update(self):
+        self._write("user", {"a": 1})
+        with patch.dict(os.environ, {"snapshot_update": "true"}):
+            self.assertEqual("written", compare_snapshot("user", {"a": 2})[0])
+        self.assertEqual("matched", compare_snapshot("user", {"a": 2})[0])
+
+    def test_snapshot_must_be_inside_the_project(self):
+        self.assertRaises(AssertionError, lambda: compare_snapshot("../../../../outside", {}))
+
+    def _write(self, name: str, value: dict) -> None:
+        with patch.dict(os.environ, {"snapshot_update": "true"}):
+            compare_snapshot(name, value)
+
+
+if __name__ == '__main__':
+    unittest.main()
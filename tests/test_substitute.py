@@ -4,13 +4,15 @@
 #
 
 import os
+import json
 import re
+import time
 import unittest
 
 from datetime import datetime
 from getgauge.python import data_store
 from gauge_api_steps.session import store_in_session
-from gauge_api_steps.substitute import substitute
+from gauge_api_steps.substitute import seed_random, substitute
 from tests import TEST_DIR, TEST_RESOURCES_DIR
 
 
@@ -18,6 +20,7 @@ class TestSubstitute(unittest.TestCase):
 
     def setUp(self):
         os.environ["GAUGE_PROJECT_ROOT"] = TEST_DIR
+        os.environ.pop("random_seed", None)
 
     def test_substitute_replace(self):
         tableflip = "(ノಠ益ಠ)ノ彡┻━┻"
@@ -152,6 +155,61 @@ class TestSubstitute(unittest.TestCase):
         result = substitute("${param}")
         self.assertEqual("session", result)
 
+    def test_substitute_with_nested_braces(self):
+        result = substitute('!{base64:{"a": {"b": 1}}}')
+        self.assertEqual('{"a": {"b": 1}}', substitute(f"!{{base64decode:{result}}}"))
+
+    def test_substitute_with_repeat(self):
+        result = substitute('[!{repeat:3:{"id": {index}}}]')
+        self.assertEqual('[{"id": 0},{"id": 1},{"id": 2}]', result)
+
+    def test_substitute_with_repeat_zero_times(self):
+        result = substitute("[!{repeat:0:{index}}]")
+        self.assertEqual("[]", result)
+
+    def test_substitute_with_repeat_and_nested_expressions(self):
+        result = substitute('[!{repeat:2:{"id": "!{base64:id{index}}", "n": !{random:int:5:5}}}]')
+        self.assertEqual([{"id": "aWQw", "n": 5}, {"id": "aWQx", "n": 5}], json.loads(result))
+
+    def test_substitute_with_large_repeat(self):
+        started = time.perf_counter()
+        template = '{"id": {index}, "name": "item {index}", "key": "!{random:string:8}", "n": !{random:int:1:9}}'
+        result = substitute(f"[!{{repeat:100000:{template}}}]")
+        duration = time.perf_counter() - started
+        items = json.loads(result)
+        self.assertEqual(100000, len(items))
+        self.assertEqual({"id": 99999, "name": "item 99999"}, {k: items[-1][k] for k in ("id", "name")})
+        self.assertRegex(items[-1]["key"], "^[A-Za-z0-9]{8}$")
+        self.assertNotEqual(items[0]["key"], items[1]["key"])
+        self.assertTrue(all(1 <= item["n"] <= 9 for item in items))
+        self.assertLess(duration, 0.5)
+
+    def test_substitute_with_range(self):
+        self.assertEqual("0,1,2", substitute("!{range:0:3}"))
+        self.assertEqual("10,8,6", substitute("!{range:10:5:-2}"))
+
+    def test_substitute_raises_with_invalid_range(self):
+        self.assertRaises(ValueError, lambda: substitute("!{range:1}"))
+        self.assertRaises(ValueError, lambda: substitute("!{range:a:b}"))
+
+    def test_substitute_with_random(self):
+        self.assertTrue(1 <= int(substitute("!{random:int:1:6}")) <= 6)
+        self.assertTrue(0.5 <= float(substitute("!{random:float:0.5:1.5}")) <= 1.5)
+        self.assertRegex(substitute("!{random:string:12}"), "^[A-Za-z0-9]{12}$")
+
+    def test_substitute_raises_with_invalid_random(self):
+        self.assertRaises(ValueError, lambda: substitute("!{random:bool}"))
+        self.assertRaises(ValueError, lambda: substitute("!{random:int:1}"))
+        self.assertRaises(ValueError, lambda: substitute("!{random:int:9:1}"))
+
+    def test_substitute_random_with_seed(self):
+        os.environ["random_seed"] = "42"
+        seed_random()
+        first = substitute("!{random:string:16} !{random:int:0:1000000}")
+        seed_random()
+        second = substitute("!{random:string:16} !{random:int:0:1000000}")
+        self.assertEqual(first, second)
+
     def _datetime_valid(self, dt_str: str) -> bool:
         try:
             datetime.fromisoformat(dt_str)
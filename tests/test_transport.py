@@ -0,0 +1,85 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import socket
+import time
+import unittest
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import build_opener
+
+from gauge_api_steps.transport import (
+    TimedHTTPHandler,
+    Timeouts,
+    _dns_cache,
+    forget_address,
+    resolve_address,
+    response_timings,
+    retry_after_seconds,
+)
+from tests.local_server import LocalServer
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_timed_http_handler(self):
+        with LocalServer({"/ok": (200, {}, b"ok")}) as server:
+            opener = build_opener(TimedHTTPHandler())
+            with opener.open(f"{server.url}/ok") as resp:
+                body = resp.read()
+                timings = response_timings(resp)
+        self.assertEqual(b"ok", body)
+        self.assertEqual({"dns", "connect", "ttfb"}, set(timings.keys()))
+        self.assertTrue(all(millis >= 0 for millis in timings.values()))
+
+    def test_response_timings_of_http_error(self):
+        with LocalServer({}) as server:
+            opener = build_opener(TimedHTTPHandler())
+            with self.assertRaises(HTTPError) as ctx:
+                opener.open(f"{server.url}/missing")
+            timings = response_timings(ctx.exception)
+            ctx.exception.close()
+        self.assertIn("ttfb", timings)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(120.0, retry_after_seconds("120"))
+        in_a_minute = format_datetime(datetime.now(UTC) + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(60.0, retry_after_seconds(in_a_minute), delta=2.0)
+        self.assertEqual(0.0, retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"))
+        self.assertIsNone(retry_after_seconds("soon"))
+
+    def test_resolve_address_is_cached(self):
+        _dns_cache.clear()
+        addr_info = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ("127.0.0.1", 80))]
+        with patch("socket.getaddrinfo", return_value=addr_info) as getaddrinfo, \
+                patch.dict(os.environ, {"dns_cache_ttl": "30"}):
+            self.assertEqual(addr_info, resolve_address("example.org", 80))
+            self.assertEqual(addr_info, resolve_address("example.org", 80))
+            self.assertEqual(1, getaddrinfo.call_count)
+            forget_address("example.org", 80)
+            resolve_address("example.org", 80)
+            self.assertEqual(2, getaddrinfo.call_count)
+            os.environ["dns_cache_ttl"] = "0"
+            resolve_address("example.org", 80)
+            self.assertEqual(3, getaddrinfo.call_count)
+
+    def test_timeouts(self):
+        timeouts = Timeouts(connect=1.0, read=5.0, total=2.0)
+        self.assertEqual(("connect", 1.0), timeouts.phase("connect"))
+        phase, seconds = timeouts.phase("read")
+        self.assertEqual("total", phase)
+        self.assertAlmostEqual(2.0, seconds, delta=0.1)
+        self.assertEqual(("read", None), Timeouts().phase("read"))
+        self.assertEqual("read timeout of 5 s exceeded", str(timeouts.error("read")))
+        expired = Timeouts(total=0.01)
+        time.sleep(0.02)
+        self.assertRaises(TimeoutError, expired.check)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#
+# Copyright IBM Corp. 2019-
+# SPDX-License-Identifier: MIT
+#
+
+import unittest
+from unittest.mock import patch
+
+from lxml import etree
+
+from gauge_api_steps.body import ResponseBody
+from gauge_api_steps.xml_compare import canonical_xml, diff_xml, xml_equals, xml_whitespace
+
+
+class TestXmlCompare(unittest.TestCase):
+
+    def _match(self, xml: str, xpath: str) -> etree._Element:
+        return ResponseBody(xml.encode()).xml().xpath(xpath)[0]
+
+    def test_canonical_xml(self):
+        match = self._match('<root xmlns="urn:x"><a z="1" b="&quot;2&quot;">x &amp; y<!--c--><b/></a> tail</root>', "/root/a")
+        self.assertEqual('<a b="&quot;2&quot;" z="1">x &amp; y<!--c--><b></b></a>', canonical_xml(match, "strict"))
+
+    def test_xml_equals(self):
+        match = self._match("<root>\n  <fox>\n    <jumps a='1' b='2'>over</jumps>\n  </fox>\n</root>", "/root/fox")
+        self.assertTrue(xml_equals(match, '<fox>\n    <jumps b="2" a="1">over</jumps>\n  </fox>', "strict"))
+        self.assertFalse(xml_equals(match, '<fox><jumps a="1" b="2">over</jumps></fox>', "strict"))
+        self.assertTrue(xml_equals(match, '<fox><jumps a="1" b="2"> over </jumps></fox>', "normalize"))
+        self.assertFalse(xml_equals(match, '<fox><jumps a="1" b="3">over</jumps></fox>', "normalize"))
+
+    def test_diff_xml(self):
+        match = self._match("<root><fox><jumps a='1'>over</jumps><runs/><sleeps/></fox></root>", "/root/fox")
+        expected = '<fox><jumps a="2" b="3">under</jumps><walks/></fox>'
+        self.assertEqual([
+            "/root/fox/jumps/@a: expected '2', got '1'",
+            "/root/fox/jumps/@b: expected '3', got nothing",
+            "/root/fox/jumps/text(): expected 'under', got 'over'",
+            "/root/fox/runs: expected element <walks>, got element <runs>",
+            "/root/fox/sleeps: unexpected element <sleeps>",
+        ], diff_xml(match, expected, "strict"))
+
+    def test_diff_xml__is_bounded(self):
+        match = self._match(f"<root>{'<item>a</item>' * 50}</root>", "/root")
+        expected = f"<root>{'<item>b</item>' * 50}</root>"
+        differences = diff_xml(match, expected, "normalize")
+        self.assertEqual(21, len(differences))
+        self.assertEqual("/root/item[1]/text(): expected 'b', got 'a'", differences[0])
+        self.assertEqual("... further differences are not shown", differences[-1])
+
+    def test_xml_whitespace(self):
+        with patch('os.environ', {}):
+            self.assertEqual("strict", xml_whitespace())
+        with patch('os.environ', {"xml_whitespace": "Normalize"}):
+            self.assertEqual("normalize", xml_whitespace())
+        with patch('os.environ', {"xml_whitespace": "ignore"}):
+            self.assertRaises(ValueError, xml_whitespace)
+
+
+if __name__ == '__main__':
+    unittest.main()